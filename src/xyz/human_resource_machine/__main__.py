@@ -1,46 +1,112 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
 import logging
 import os
-from dataclasses import dataclass
-
-import yaml
+import sys
+from collections.abc import Callable, Iterable, Sequence
 
+import xyz.human_resource_machine.parse_cache as parse_cache
 import xyz.human_resource_machine.parser as parser
+from xyz.human_resource_machine.engines import ENGINES
 from xyz.human_resource_machine.interpreter import (
+    Instruction,
     Interpreter,
     Value,
-    int_or_str,
+    log_event,
 )
+from xyz.human_resource_machine.level import Level
+
+# Modules only some options need are imported where they are used, so that
+# running a single level starts quickly. `test_lazy_imports` checks this.
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+
+def run_all(directories: list[str], args: argparse.Namespace) -> int:
+    """Run every level in the given directories, printing a results table."""
+    import xyz.human_resource_machine.runner as runner
+
+    root = os.path.commonpath(directories)
+    print(runner.format_header(), flush=True)
+    failures = 0
+    results = runner.run_all(
+        runner.discover(directories),
+        workers=args.workers,
+        engine=args.engine,
+        max_executions=args.max_executions,
+        timeout=args.timeout,
+        detect_cycles=args.detect_cycles,
+        cache_directory=None if args.no_cache else args.cache_dir,
+    )
+    for result in results:
+        failures += not result.passed
+        print(runner.format_result(result, root), flush=True)
+    print(f"{failures} failed" if failures else "All levels passed")
+    return 1 if failures else 0
 
 
-@dataclass
-class Level:
-    """A class representing a level in the Human Resource Machine game."""
+def serve(args: argparse.Namespace) -> int:
+    """Evaluate JSON-lines requests until the input ends or the server is stopped."""
+    import xyz.human_resource_machine.server as server
 
-    source: str
-    input: list[Value]
-    registers: dict[Value, Value]
-    speed_challenge: int
-    size_challenge: int
+    evaluator = server.Server(
+        engine=args.engine or "step",
+        max_executions=args.max_executions,
+        timeout=args.timeout,
+        detect_cycles=args.detect_cycles,
+    )
+    if args.socket is None:
+        evaluator.serve(sys.stdin, sys.stdout)
+    else:
+        logging.info("Listening on %s", args.socket)
+        with contextlib.suppress(KeyboardInterrupt):
+            server.serve_unix(evaluator, args.socket)
+    return 0
 
-    @staticmethod
-    def from_yaml(path: str) -> Level:
-        """Load a level from a YAML file."""
 
-        with open(path) as i:
-            data = yaml.safe_load(i)
+def fuzz(level: Level, args: argparse.Namespace) -> int:
+    """Fuzz the engines, and any other solutions, printing the first divergence."""
+    import xyz.human_resource_machine.fuzzer as fuzzer
 
-        return Level(
-            source=data["source"],
-            input=[int_or_str(x) for x in data.get("input", "").splitlines() if x],
-            registers={
-                int_or_str(k): int_or_str(v) for k, v in data["registers"].items()
-            },
-            speed_challenge=data["speed-challenge"],
-            size_challenge=data["size-challenge"],
+    results = [fuzzer.fuzz_engines(level, args.fuzz, workers=args.workers)]
+    if args.fuzz_solution:
+        others = [Level.from_yaml(path) for path in args.fuzz_solution]
+        results.append(
+            fuzzer.fuzz_solutions([level, *others], args.fuzz, workers=args.workers)
         )
+    failed = False
+    for kind, result in zip(["engines", "solutions"], results):
+        if result.divergence is None:
+            print(f"The {kind} agree on {result.cases} cases")
+        else:
+            failed = True
+            print(f"The {kind} diverge after {result.cases} cases, on:")
+            print(result.divergence.format())
+    return 1 if failed else 0
+
+
+def create_interpreter(
+    level: Level,
+    instructions: Sequence[Instruction],
+    args: argparse.Namespace,
+    *,
+    input: Iterable[Value] | None = None,
+    outbox: Callable[[Value], object] | None = None,
+) -> Interpreter:
+    """Create an interpreter for a level's program from the command line options."""
+    return Interpreter(
+        instructions=instructions,
+        registers=level.registers,
+        input=level.input if input is None else input,
+        outbox=outbox,
+        engine=ENGINES[args.engine],
+        max_executions=args.max_executions,
+        timeout=args.timeout,
+        detect_cycles=args.detect_cycles,
+        tracer=log_event if args.debug_logging else None,
+    )
 
 
 def main():
@@ -50,12 +116,166 @@ def main():
     arg_parser.add_argument(
         "path",
         type=str,
-        help="Level to execute",
+        nargs="?",
+        help="Level to execute, as a YAML file or a precompiled .hrmc file",
+    )
+    arg_parser.add_argument(
+        "--run-all",
+        action="store_true",
+        help="Run every level in the challenges directory in parallel",
+    )
+    arg_parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Evaluate JSON-lines requests from standard input, or from --socket, "
+        "keeping parsed programs in memory between them",
+    )
+    arg_parser.add_argument(
+        "--socket",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Listen for --serve requests on a Unix socket at PATH",
+    )
+    arg_parser.add_argument(
+        "--solutions",
+        type=str,
+        action="append",
+        default=[],
+        help="Additional directory of level files to run with --run-all",
+    )
+    arg_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes for --run-all and --search "
+        "(default: CPU count)",
+    )
+    arg_parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default=None,
+        help="Execution engine to run the program with "
+        "(default: step, or bytecode for .hrmc files)",
+    )
+    arg_parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="Run the program after peephole optimization and report the change",
+    )
+    arg_parser.add_argument(
+        "--specialize",
+        type=int,
+        default=None,
+        metavar="BUDGET",
+        help="Run the program after specializing it to the level's registers "
+        "and unrolling loops, adding about BUDGET instructions, and report "
+        "the change",
+    )
+    arg_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Annotate the listing with how often each instruction ran, "
+        "overriding --engine and tracing by --debug-logging",
+    )
+    arg_parser.add_argument(
+        "--search",
+        type=int,
+        default=None,
+        metavar="MAX_SIZE",
+        help="Run the shortest program of at most MAX_SIZE instructions that "
+        "produces the level's expected output",
+    )
+    arg_parser.add_argument(
+        "--compile",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="Write the level and its parsed program to FILE in the binary "
+        ".hrmc format, then run it as usual",
+    )
+    arg_parser.add_argument(
+        "--typecheck",
+        action="store_true",
+        help="Report type errors the program may meet on inputs like the "
+        "level's before running it, and with --engine generated, run programs "
+        "proven free of them without checking types",
+    )
+    arg_parser.add_argument(
+        "--estimate",
+        action="store_true",
+        help="Bound the execution count of any run producing the level's "
+        "output, without running the program, and compare it to the speed "
+        "challenge",
+    )
+    arg_parser.add_argument(
+        "--fuzz",
+        type=int,
+        default=None,
+        metavar="CASES",
+        help="Check every engine agrees on CASES random programs using the "
+        "level's registers and random inboxes like the level's, instead of "
+        "running the level",
+    )
+    arg_parser.add_argument(
+        "--fuzz-solution",
+        type=str,
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="With --fuzz, also check this level file's solution produces the "
+        "same output as the level's own on random inboxes; may be repeated",
+    )
+    arg_parser.add_argument(
+        "--inbox",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="Read the inbox one value per line from FILE, or - for standard "
+        "input, in place of the level's input",
+    )
+    arg_parser.add_argument(
+        "--outbox",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="Write the outbox one value per line to FILE, or - for standard "
+        "output, as the program runs",
+    )
+    arg_parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=parse_cache.default_directory(),
+        metavar="DIR",
+        help="Directory to keep parsed programs in (default: %(default)s)",
+    )
+    arg_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse every program from its source, without reading or writing "
+        "the cache",
+    )
+    arg_parser.add_argument(
+        "--max-executions",
+        type=int,
+        default=None,
+        help="Stop programs that run more than this many instructions",
+    )
+    arg_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Stop programs that run for longer than this many seconds",
+    )
+    arg_parser.add_argument(
+        "--detect-cycles",
+        action="store_true",
+        help="Stop programs that are stuck in an infinite loop",
     )
     arg_parser.add_argument(
         "--debug-logging",
         action="store_true",
-        help="Enable debug logging",
+        help="Enable debug logging, tracing every instruction executed",
     )
     arg_parser.add_argument(
         "--logging-format",
@@ -70,6 +290,16 @@ def main():
         help="Date format for logging output",
     )
     args = arg_parser.parse_args()
+    if args.socket is not None:
+        args.serve = True
+    if args.path is None and not (args.run_all or args.serve):
+        arg_parser.error(
+            "a level path is required unless --run-all or --serve is given"
+        )
+    if args.inbox is not None and args.optimize:
+        arg_parser.error("--inbox cannot be read twice to compare with --optimize")
+    if args.inbox is not None and args.specialize is not None:
+        arg_parser.error("--inbox cannot be read twice to compare with --specialize")
 
     logging.basicConfig(
         level=logging.DEBUG if args.debug_logging else logging.INFO,
@@ -78,19 +308,118 @@ def main():
     )
     logging.info("Starting Human Resource Machine Interpreter")
 
+    if args.run_all:
+        return run_all([CHALLENGES, *args.solutions], args)
+    if args.serve:
+        return serve(args)
+
     if not os.path.isabs(args.path):
-        args.path = os.path.join(os.path.dirname(__file__), "challenges", args.path)
-    level = Level.from_yaml(args.path)
+        args.path = os.path.join(CHALLENGES, args.path)
+    instructions: Sequence[Instruction]
+    if args.path.endswith(".hrmc"):
+        import xyz.human_resource_machine.hrmc as hrmc
 
-    interpreter = Interpreter(
-        instructions=parser.Parser(level.source).parse(),
-        registers=level.registers,
-        input=level.input,
-    )
-    output = interpreter.execute_program()
-    print(interpreter.to_str(), "\n")
-    print("Input: ", ", ".join(str(x) for x in interpreter._input))
-    print("Output:", ", ".join(str(x) for x in output))
+        level, instructions = hrmc.load(args.path)
+    elif args.no_cache:
+        level = Level.from_yaml(args.path)
+        instructions = parser.Parser(level.source).parse()
+    else:
+        index = parse_cache.LevelIndex(args.cache_dir)
+        level = index.load(args.path)
+        index.save()
+        instructions = parse_cache.ParseCache(args.cache_dir).parse(level.source)
+    if args.engine is None:
+        # Packed programs compile to bytecode straight from their columns,
+        # where the reference loop would build an instruction for every step.
+        args.engine = "bytecode" if args.path.endswith(".hrmc") else "step"
+    if args.compile is not None:
+        import xyz.human_resource_machine.hrmc as hrmc
+
+        hrmc.save(args.compile, level, instructions)
+    if args.fuzz is not None:
+        return fuzz(level, args)
+    if args.estimate:
+        import xyz.human_resource_machine.estimator as estimator
+
+        estimate = estimator.estimate(instructions, level)
+        print(estimate.format(level.speed_challenge))
+        return 0
+    if args.search is not None:
+        import xyz.human_resource_machine.search as search
+
+        found = search.search(level, args.search, workers=args.workers)
+        if found is None:
+            print(f"No program of at most {args.search} instructions found")
+            return 1
+        instructions = found
+    if args.optimize or args.specialize is not None:
+        original = create_interpreter(level, instructions, args)
+        original.execute_program()
+    if args.optimize:
+        import xyz.human_resource_machine.optimizer as optimizer
+
+        instructions = optimizer.optimize(list(instructions))
+    if args.specialize is not None:
+        import xyz.human_resource_machine.specializer as specializer
+
+        instructions = specializer.specialize(
+            instructions, level.registers, budget=args.specialize
+        )
+    unchecked = False
+    if args.typecheck:
+        import xyz.human_resource_machine.typecheck as typecheck
+
+        checked = typecheck.check_level(instructions, level)
+        print(checked.format(), "\n")
+        unchecked = checked.safe and args.engine == "generated"
+
+    with contextlib.ExitStack() as stack:
+        input = outbox = None
+        if args.inbox is not None or args.outbox is not None:
+            import xyz.human_resource_machine.streams as streams
+
+        if args.inbox is not None:
+            file = (
+                sys.stdin
+                if args.inbox == "-"
+                else stack.enter_context(open(args.inbox))
+            )
+            input = streams.read_values(file)
+        if args.outbox is not None:
+            file = (
+                sys.stdout
+                if args.outbox == "-"
+                else stack.enter_context(open(args.outbox, "w"))
+            )
+            outbox = streams.write_values(file)
+
+        interpreter = create_interpreter(
+            level, instructions, args, input=input, outbox=outbox
+        )
+        # Only the level's own input is known to be like the level's.
+        if unchecked and input is None:
+            import xyz.human_resource_machine.codegen as codegen
+
+            interpreter.engine = codegen.execute_unchecked
+        profile = None
+        if args.profile:
+            import xyz.human_resource_machine.profiler as profiler
+
+            profile = profiler.Profile()
+            interpreter.engine = profile.execute
+            interpreter.tracer = None
+        output = interpreter.execute_program()
+    if profile is not None:
+        print(interpreter.to_str(profile.annotations()), "\n")
+        print(profile.format_registers(), "\n")
+    else:
+        print(interpreter.to_str(), "\n")
+    if input is None:
+        print("Input: ", ", ".join(str(x) for x in interpreter._input))
+    if outbox is None:
+        print("Output:", ", ".join(str(x) for x in output))
+    if level.output is not None and input is None:
+        print("Expected:", ", ".join(str(x) for x in level.output))
     print("Registers used:", len(interpreter.registers))
 
     print(
@@ -100,7 +429,25 @@ def main():
         f"Size challenge: {interpreter.instruction_count} "
         f"target: {level.size_challenge}",
     )
+    if args.optimize or args.specialize is not None:
+        changes = [
+            change
+            for change, applied in [
+                ("optimized", args.optimize),
+                ("specialized", args.specialize is not None),
+            ]
+            if applied
+        ]
+        changed = " and ".join(changes).capitalize()
+        print(
+            f"{changed} execution count: {original.executions} -> "
+            f"{interpreter.executions} target: {level.speed_challenge}"
+        )
+        print(
+            f"{changed} size: {original.instruction_count} -> "
+            f"{interpreter.instruction_count} target: {level.size_challenge}"
+        )
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Run Human Resource Machine programs from asyncio code.
+
+`AsyncRunner.execute` runs an interpreter's program without blocking the
+event loop. The program runs in chunks of `chunk_executions` instructions,
+under one `Watchdog` whose execution limit stops it between chunks, which any
+engine resumes from exactly where it stopped. Between chunks the runner
+checks the job's deadline and gives other tasks a chance to run. Cancelling
+the job stops it after the chunk that is running.
+
+Chunks run on a thread pool by default, or on the event loop itself with
+`mode="inline"`. With `mode="process"`, `evaluate` runs whole programs in a
+process pool instead. Those run in parallel, but can only be stopped by
+their deadline once started.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Literal
+
+from xyz.human_resource_machine.engines import ENGINES
+from xyz.human_resource_machine.interpreter import (
+    AbortReason,
+    ExecutionAborted,
+    Instruction,
+    Interpreter,
+    Value,
+    Watchdog,
+)
+
+Mode = Literal["thread", "process", "inline"]
+
+
+@dataclass(frozen=True, slots=True)
+class Evaluation:
+    """The result of running a program to completion."""
+
+    output: list[Value]
+    executions: int
+    instruction_count: int
+
+
+def _evaluate(
+    instructions: list[Instruction],
+    registers: dict[Value, Value],
+    input: list[Value],
+    engine: str,
+    max_executions: int | None,
+    timeout: float | None,
+) -> Evaluation:
+    interpreter = Interpreter(
+        instructions=instructions,
+        registers=registers,
+        input=input,
+        engine=ENGINES[engine],
+        max_executions=max_executions,
+        timeout=timeout,
+    )
+    output = interpreter.execute_program()
+    return Evaluation(output, interpreter.executions, interpreter.instruction_count)
+
+
+def _run_chunk(
+    interpreter: Interpreter, watchdog: Watchdog, limit: int
+) -> list[Value] | None:
+    """Run up to `limit` executions, returning the output if the program ended."""
+    watchdog.max_executions = limit
+    try:
+        return interpreter.execute_program(watchdog)
+    except ExecutionAborted as e:
+        if e.reason is AbortReason.MAX_EXECUTIONS and (
+            interpreter.max_executions is None
+            or e.executions < interpreter.max_executions
+        ):
+            return None
+        raise
+
+
+class AsyncRunner:
+    """Runs programs for asyncio code on a bounded pool of workers.
+
+    Use it as an async context manager, or call `close`, to shut the pool
+    down.
+    """
+
+    def __init__(
+        self,
+        *,
+        mode: Mode = "thread",
+        max_workers: int | None = None,
+        chunk_executions: int = 100_000,
+    ):
+        self.mode = mode
+        self.chunk_executions = chunk_executions
+        self._executor: Executor | None = None
+        if mode == "thread":
+            self._executor = ThreadPoolExecutor(max_workers)
+        elif mode == "process":
+            self._executor = ProcessPoolExecutor(max_workers)
+        elif mode != "inline":
+            raise ValueError(f"Unknown mode {mode!r}")
+
+    async def __aenter__(self) -> AsyncRunner:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the pool, without waiting for jobs still running."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def execute(
+        self, interpreter: Interpreter, *, deadline: float | None = None
+    ) -> list[Value]:
+        """Run an interpreter's program to completion, returning its output.
+
+        Raises `TimeoutError` if the program runs for more than `deadline`
+        seconds, leaving the interpreter where it stopped, and any error the
+        program raises, as `execute_program` would. Not available with
+        `mode="process"`, as the interpreter must stay in this process.
+        """
+        if self.mode == "process":
+            raise ValueError("Interpreters cannot be run in a process pool")
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        end = None if deadline is None else start + deadline
+        # The interpreter's own timeout covers the whole run, not each chunk.
+        own_end = None if interpreter.timeout is None else start + interpreter.timeout
+        timeouts = [t for t in (deadline, interpreter.timeout) if t is not None]
+        # One watchdog runs the whole job, so its clock and cycle detection
+        # carry on across chunks; each chunk only moves its execution limit.
+        watchdog = Watchdog(
+            timeout=min(timeouts) if timeouts else None,
+            detect_cycles=interpreter.detect_cycles,
+        )
+        while True:
+            now = time.monotonic()
+            if end is not None and now >= end:
+                raise TimeoutError(f"Program ran for more than {deadline}s")
+            if own_end is not None and now >= own_end:
+                raise ExecutionAborted(AbortReason.TIMEOUT, interpreter.executions)
+            limit = interpreter.executions + self.chunk_executions
+            if interpreter.max_executions is not None:
+                limit = min(limit, interpreter.max_executions)
+            try:
+                if self._executor is None:
+                    output = _run_chunk(interpreter, watchdog, limit)
+                    await asyncio.sleep(0)
+                else:
+                    future = loop.run_in_executor(
+                        self._executor, _run_chunk, interpreter, watchdog, limit
+                    )
+                    try:
+                        output = await asyncio.shield(future)
+                    except asyncio.CancelledError:
+                        # Only return once nothing else is changing the
+                        # interpreter.
+                        await asyncio.wait([future])
+                        raise
+            except ExecutionAborted as e:
+                if e.reason is not AbortReason.TIMEOUT:
+                    raise
+                # Which limit ran out is decided at the top of the loop.
+                continue
+            if output is not None:
+                return output
+
+    async def evaluate(
+        self,
+        instructions: Sequence[Instruction],
+        registers: dict[Value, Value] | None = None,
+        input: list[Value] | None = None,
+        *,
+        engine: str = "bytecode",
+        max_executions: int | None = None,
+        deadline: float | None = None,
+    ) -> Evaluation:
+        """Run a program on an input to completion.
+
+        Raises `TimeoutError` if the program runs for more than `deadline`
+        seconds, and any error the program raises.
+        """
+        registers = {} if registers is None else registers
+        input = [] if input is None else input
+        if self.mode != "process":
+            interpreter = Interpreter(
+                instructions=list(instructions),
+                registers=registers,
+                input=input,
+                engine=ENGINES[engine],
+                max_executions=max_executions,
+            )
+            output = await self.execute(interpreter, deadline=deadline)
+            return Evaluation(
+                output, interpreter.executions, interpreter.instruction_count
+            )
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._executor,
+                _evaluate,
+                list(instructions),
+                registers,
+                input,
+                engine,
+                max_executions,
+                deadline,
+            )
+        except ExecutionAborted as e:
+            if e.reason is not AbortReason.TIMEOUT:
+                raise
+            raise TimeoutError(f"Program ran for more than {deadline}s") from e
@@ -0,0 +1,148 @@
+"""Tests for running Human Resource Machine programs from asyncio code."""
+
+import asyncio
+import os
+
+import pytest
+
+from xyz.human_resource_machine.async_runner import AsyncRunner, Evaluation
+from xyz.human_resource_machine.engines import ENGINES
+from xyz.human_resource_machine.interpreter import (
+    AbortReason,
+    ExecutionAborted,
+    Interpreter,
+)
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parser import Parser
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+LOOP = Parser("BEGIN:\nBUMPUP 0\nJUMP BEGIN").parse()
+
+
+def level_interpreter(engine: str, **kwargs) -> Interpreter:
+    level = Level.from_yaml(os.path.join(CHALLENGES, "level_38_speed.yaml"))
+    return Interpreter(
+        instructions=Parser(level.source).parse(),
+        registers=level.registers,
+        input=level.input,
+        engine=ENGINES[engine],
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("mode", ["thread", "inline"])
+@pytest.mark.parametrize("engine", ENGINES)
+def test_execute_in_chunks(mode: str, engine: str):
+    """Test a program run in small chunks ends exactly as when run at once."""
+    expected = level_interpreter(engine)
+    expected.execute_program()
+    interpreter = level_interpreter(engine)
+
+    async def main():
+        async with AsyncRunner(mode=mode, chunk_executions=7) as runner:
+            return await runner.execute(interpreter)
+
+    assert asyncio.run(main()) == expected.output
+    assert interpreter.executions == expected.executions
+    assert interpreter.registers == expected.registers
+    assert interpreter.max_executions is None
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_execution_limit(engine: str):
+    """Test the interpreter's own execution limit still applies."""
+    kwargs = dict(registers={0: 0}, engine=ENGINES[engine], max_executions=25)
+    expected = Interpreter(instructions=LOOP, **kwargs)
+    with pytest.raises(ExecutionAborted):
+        expected.execute_program()
+    interpreter = Interpreter(instructions=LOOP, **kwargs)
+
+    async def main():
+        async with AsyncRunner(chunk_executions=10) as runner:
+            await runner.execute(interpreter)
+
+    with pytest.raises(ExecutionAborted) as e:
+        asyncio.run(main())
+    assert e.value.reason is AbortReason.MAX_EXECUTIONS
+    assert interpreter.executions == expected.executions
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_cycle_detected_across_chunks(engine: str):
+    """Test a program stuck in a loop is caught even when chunks are short."""
+    interpreter = Interpreter(
+        instructions=Parser("BEGIN:\nJUMP BEGIN").parse(),
+        engine=ENGINES[engine],
+        max_executions=10_000,
+        detect_cycles=True,
+    )
+
+    async def main():
+        async with AsyncRunner(mode="inline", chunk_executions=1) as runner:
+            await runner.execute(interpreter)
+
+    with pytest.raises(ExecutionAborted) as e:
+        asyncio.run(main())
+    assert e.value.reason is AbortReason.CYCLE
+
+
+def test_deadline_and_timeout():
+    """Test a deadline raises `TimeoutError`, and a timeout aborts as usual."""
+    timed_out = Interpreter(instructions=LOOP, registers={0: 0}, timeout=0.05)
+
+    async def main():
+        async with AsyncRunner(chunk_executions=1000) as runner:
+            with pytest.raises(TimeoutError):
+                await runner.execute(
+                    Interpreter(instructions=LOOP, registers={0: 0}), deadline=0.05
+                )
+            with pytest.raises(ExecutionAborted) as e:
+                await runner.execute(timed_out)
+            assert e.value.reason is AbortReason.TIMEOUT
+
+    asyncio.run(main())
+    assert timed_out.executions > 0
+
+
+@pytest.mark.parametrize("mode", ["thread", "inline"])
+def test_cancel_without_blocking(mode: str):
+    """Test other tasks keep running, and a job stops when cancelled."""
+    interpreter = Interpreter(instructions=LOOP, registers={0: 0})
+
+    async def main():
+        async with AsyncRunner(mode=mode, chunk_executions=1000) as runner:
+            job = asyncio.create_task(runner.execute(interpreter))
+            ticks = 0
+            while ticks < 5:
+                await asyncio.sleep(0.001)
+                ticks += 1
+            job.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await job
+        return ticks
+
+    assert asyncio.run(main()) == 5
+    executions = interpreter.executions
+    assert executions > 0
+    # Nothing runs on the interpreter once the job is cancelled.
+    assert interpreter.registers[0] == (executions + 1) // 2
+
+
+@pytest.mark.parametrize("mode", ["thread", "process", "inline"])
+def test_evaluate(mode: str):
+    """Test programs given as instructions run in every mode."""
+    program = Parser("BEGIN:\nINBOX\nADD 0\nOUTBOX\nJUMP BEGIN").parse()
+
+    async def main():
+        async with AsyncRunner(mode=mode, max_workers=2) as runner:
+            results = await asyncio.gather(
+                *(runner.evaluate(program, {0: n}, [1, 2]) for n in range(3))
+            )
+            with pytest.raises(TimeoutError):
+                await runner.evaluate(LOOP, {0: 0}, deadline=0.05)
+            with pytest.raises(KeyError):
+                await runner.evaluate(program, {}, [1])
+        return results
+
+    assert asyncio.run(main()) == [Evaluation([n + 1, n + 2], 8, 4) for n in range(3)]
@@ -0,0 +1,68 @@
+"""Run one Human Resource Machine program over many independent inputs."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from xyz.human_resource_machine import codegen
+from xyz.human_resource_machine.bytecode import compile_program, hashable_program
+from xyz.human_resource_machine.interpreter import Instruction, Interpreter, Value
+
+
+@dataclass(frozen=True, slots=True)
+class BatchResult:
+    """The outcome of running a program on one input of a batch."""
+
+    output: list[Value]
+    executions: int
+    registers: dict[Value, Value]
+    # The error that stopped the program, if it did not run to completion.
+    error: Exception | None = None
+
+
+def run_batch(
+    program: list[Instruction],
+    registers: dict[Value, Value],
+    inputs: list[list[Value]],
+    *,
+    max_executions: int | None = None,
+    timeout: float | None = None,
+) -> list[BatchResult]:
+    """Run a program once for each input, starting from the same registers.
+
+    The program is compiled once and a single interpreter is reset between
+    inputs, so the cost per input is only that of executing the program. An
+    error on one input, including exceeding the per-input `max_executions` or
+    `timeout`, is recorded in its result and does not stop the batch.
+    """
+    run = codegen.compile_function(compile_program(hashable_program(program)))
+
+    def engine(interpreter: Interpreter) -> list[Value]:
+        # Every program starts at the first basic block.
+        run(interpreter, 0)
+        return interpreter._output
+
+    interpreter = Interpreter(
+        instructions=program,
+        engine=engine,
+        max_executions=max_executions,
+        timeout=timeout,
+    )
+
+    results: list[BatchResult] = []
+    for input in inputs:
+        interpreter.reset(registers=registers, input=input)
+        error = None
+        try:
+            interpreter.execute_program()
+        except Exception as e:
+            error = e
+        results.append(
+            BatchResult(
+                output=interpreter._output,
+                executions=interpreter.executions,
+                registers=interpreter.registers,
+                error=error,
+            )
+        )
+    return results
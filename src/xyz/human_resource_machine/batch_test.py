@@ -0,0 +1,52 @@
+"""Tests for running a Human Resource Machine program over a batch of inputs."""
+
+import os
+
+from xyz.human_resource_machine.batch import run_batch
+from xyz.human_resource_machine.interpreter import Interpreter
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parser import Parser
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+
+def test_batch_matches_individual_runs():
+    """Test each input in a batch behaves as if run on its own interpreter."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, "level_38_speed.yaml"))
+    program = Parser(level.source).parse()
+    inputs = [[0], [7, 999], [], [100, 10, 1]]
+
+    results = run_batch(program, level.registers, inputs)
+
+    assert len(results) == len(inputs)
+    for input, result in zip(inputs, results):
+        interpreter = Interpreter(
+            instructions=program, registers=level.registers, input=input
+        )
+        assert result.output == interpreter.execute_program()
+        assert result.executions == interpreter.executions
+        assert result.registers == interpreter.registers
+        assert result.error is None
+
+
+def test_batch_records_errors():
+    """Test an error on one input does not affect the rest of the batch."""
+    program = Parser("BEGIN:\nINBOX\nADD 0\nOUTBOX\nJUMP BEGIN").parse()
+
+    results = run_batch(program, {0: 1}, [[1, 2], ["A"], [3]])
+
+    assert [result.output for result in results] == [[2, 3], [], [4]]
+    assert isinstance(results[1].error, ValueError)
+    assert results[1].executions == 1
+    assert results[0].error is None and results[2].error is None
+
+
+def test_batch_does_not_modify_registers():
+    """Test the initial registers are shared by, but not changed by, a batch."""
+    registers = {"A": 0}
+    program = Parser("BUMPUP A").parse()
+
+    results = run_batch(program, registers, [[], []])
+
+    assert registers == {"A": 0}
+    assert [result.registers for result in results] == [{"A": 1}, {"A": 1}]
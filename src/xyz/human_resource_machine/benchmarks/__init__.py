@@ -0,0 +1 @@
+"""Benchmarks for the Human Resource Machine interpreter."""
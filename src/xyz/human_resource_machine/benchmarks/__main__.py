@@ -0,0 +1,94 @@
+"""Run the benchmark suite, or compare two saved runs of it."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+import xyz.human_resource_machine.benchmarks.suite as suite
+from xyz.human_resource_machine.engines import ENGINES
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(
+        prog="python -m xyz.human_resource_machine.benchmarks",
+        description="Benchmark the Human Resource Machine interpreter",
+    )
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the suite and save the results")
+    run.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default="benchmarks.json",
+        help="JSON file to write the results to (default: %(default)s)",
+    )
+    run.add_argument(
+        "--engine",
+        choices=ENGINES,
+        action="append",
+        default=None,
+        help="Engine to measure, which may be repeated (default: all)",
+    )
+    run.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiply the length of every workload by this factor",
+    )
+    run.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Take the best of this many runs of each measurement",
+    )
+    run.add_argument(
+        "--no-cli",
+        action="store_true",
+        help="Skip measuring the latency of the command line interface",
+    )
+
+    compare = commands.add_parser(
+        "compare", help="Compare two saved runs, failing on regressions"
+    )
+    compare.add_argument("baseline", type=str, help="Results of the earlier run")
+    compare.add_argument("current", type=str, help="Results of the later run")
+    compare.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Fraction by which a measurement may get worse before it counts "
+        "as a regression (default: %(default)s)",
+    )
+    args = arg_parser.parse_args()
+
+    if args.command == "run":
+        measurements = suite.run_suite(
+            engines=args.engine or ENGINES,
+            scale=args.scale,
+            repeat=args.repeat,
+            cli=not args.no_cli,
+        )
+        for measurement in measurements:
+            print(
+                f"{measurement.name:<50} {measurement.value:>14.4g} {measurement.unit}"
+            )
+        suite.save(measurements, args.output)
+        return 0
+
+    comparisons = suite.compare(
+        suite.load(args.baseline), suite.load(args.current), args.threshold
+    )
+    print(suite.format_comparisons(comparisons))
+    regressions = sum(comparison.regressed for comparison in comparisons)
+    print(
+        f"{regressions} regressed by more than {args.threshold:.0%}"
+        if regressions
+        else "No regressions"
+    )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
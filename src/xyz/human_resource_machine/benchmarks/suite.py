@@ -0,0 +1,211 @@
+"""Measure the interpreter and compare measurements between runs.
+
+Every measurement has a name such as `steps_per_second/bytecode/level_29`,
+made of the metric, then the engine where it applies, then the workload. A
+run of the suite is saved to JSON, and two saved runs are compared by name.
+A measurement has regressed when it got worse by more than a threshold
+fraction. Timings take the best of several repeats, which is the figure
+least disturbed by other load on the machine.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+
+from xyz.human_resource_machine.benchmarks.workloads import (
+    CHALLENGES,
+    Workload,
+    all_workloads,
+)
+from xyz.human_resource_machine.engines import ENGINES
+from xyz.human_resource_machine.interpreter import Interpreter
+from xyz.human_resource_machine.parser import Parser
+
+# The directory holding the `xyz` package, for running the CLI from this tree.
+_SOURCE_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Measurement:
+    """One measured figure."""
+
+    name: str
+    value: float
+    unit: str
+    higher_is_better: bool
+
+
+@dataclass(frozen=True, slots=True)
+class Comparison:
+    """A measurement in a baseline run and a later run."""
+
+    name: str
+    baseline: float
+    current: float
+    unit: str
+    # The relative change, positive when the measurement improved.
+    improvement: float
+    regressed: bool
+
+
+def measure_steps(workload: Workload, engine: str, repeat: int) -> Measurement:
+    """Measure how many instructions an engine executes per second."""
+    instructions = Parser(workload.source).parse()
+    best = float("inf")
+    executions = 0
+    for _ in range(repeat):
+        interpreter = Interpreter(
+            instructions=instructions,
+            registers=workload.registers,
+            input=workload.input,
+            engine=ENGINES[engine],
+        )
+        start = time.perf_counter()
+        interpreter.execute_program()
+        best = min(best, time.perf_counter() - start)
+        executions = interpreter.executions
+    return Measurement(
+        f"steps_per_second/{engine}/{workload.name}",
+        executions / best,
+        "steps/s",
+        True,
+    )
+
+
+def measure_parse(name: str, source: str, repeat: int, number: int) -> Measurement:
+    """Measure how long parsing a program takes."""
+    best = min(
+        timeit.repeat(lambda: Parser(source).parse(), number=number, repeat=repeat)
+    )
+    return Measurement(f"parse/{name}", best / number * 1e6, "us", False)
+
+
+def measure_cli(filename: str, repeat: int, *, cache: bool) -> Measurement:
+    """Measure how long the CLI takes to run a bundled challenge, start to end.
+
+    With `cache`, parsed levels and programs are cached by a first run that
+    is not measured.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, PYTHONPATH=_SOURCE_ROOT, XDG_CACHE_HOME=directory)
+        command = [sys.executable, "-m", "xyz.human_resource_machine", filename]
+        if not cache:
+            command.append("--no-cache")
+        best = float("inf")
+        for run in range(repeat + cache):
+            start = time.perf_counter()
+            subprocess.run(command, env=env, capture_output=True, check=True)
+            if run or not cache:
+                best = min(best, time.perf_counter() - start)
+    name = os.path.splitext(filename)[0]
+    return Measurement(
+        f"cli_latency/{'warm' if cache else 'cold'}/{name}", best * 1e3, "ms", False
+    )
+
+
+def run_suite(
+    *,
+    engines: Iterable[str] = tuple(ENGINES),
+    scale: float = 1.0,
+    repeat: int = 5,
+    cli: bool = True,
+) -> list[Measurement]:
+    """Take every measurement, returning them in a stable order."""
+    workloads = all_workloads(scale)
+    measurements = [
+        measure_steps(workload, engine, repeat)
+        for engine in engines
+        for workload in workloads
+    ]
+    number = max(1, int(200 * scale))
+    measurements.extend(
+        measure_parse(workload.name, workload.source, repeat, number)
+        for workload in workloads
+    )
+    everything = "\n".join(workload.source for workload in workloads)
+    measurements.append(
+        measure_parse("all_concatenated", everything * 20, repeat, max(1, number // 20))
+    )
+    if cli:
+        for filename in sorted(os.listdir(CHALLENGES)):
+            if filename.endswith(".yaml"):
+                measurements.append(measure_cli(filename, repeat, cache=False))
+                measurements.append(measure_cli(filename, repeat, cache=True))
+    return measurements
+
+
+def save(measurements: list[Measurement], path: str) -> None:
+    """Write measurements to a JSON file, with details of where they were taken."""
+    data = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "measurements": [asdict(measurement) for measurement in measurements],
+    }
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2)
+        file.write("\n")
+
+
+def load(path: str) -> list[Measurement]:
+    """Read measurements saved by `save`."""
+    with open(path) as file:
+        data = json.load(file)
+    return [Measurement(**measurement) for measurement in data["measurements"]]
+
+
+def compare(
+    baseline: list[Measurement], current: list[Measurement], threshold: float
+) -> list[Comparison]:
+    """Compare the measurements taken in both runs, in the current run's order."""
+    before = {measurement.name: measurement for measurement in baseline}
+    comparisons = []
+    for measurement in current:
+        old = before.get(measurement.name)
+        if old is None or old.value <= 0 or measurement.value <= 0:
+            continue
+        if measurement.higher_is_better:
+            improvement = measurement.value / old.value - 1
+        else:
+            improvement = old.value / measurement.value - 1
+        comparisons.append(
+            Comparison(
+                name=measurement.name,
+                baseline=old.value,
+                current=measurement.value,
+                unit=measurement.unit,
+                improvement=improvement,
+                regressed=improvement < -threshold,
+            )
+        )
+    return comparisons
+
+
+_COLUMNS = "{:<50} {:>14} {:>14} {:>9}  {}"
+
+
+def format_comparisons(comparisons: list[Comparison]) -> str:
+    """Format comparisons as a table, marking regressions."""
+    rows = [_COLUMNS.format("MEASUREMENT", "BASELINE", "CURRENT", "CHANGE", "")]
+    for comparison in comparisons:
+        rows.append(
+            _COLUMNS.format(
+                comparison.name,
+                f"{comparison.baseline:.4g}",
+                f"{comparison.current:.4g} {comparison.unit}",
+                f"{comparison.improvement:+.1%}",
+                "REGRESSED" if comparison.regressed else "",
+            ).rstrip()
+        )
+    return "\n".join(rows)
@@ -0,0 +1,77 @@
+"""Tests for the benchmark suite."""
+
+import pytest
+
+from xyz.human_resource_machine.benchmarks.suite import (
+    Measurement,
+    compare,
+    format_comparisons,
+    load,
+    run_suite,
+    save,
+)
+from xyz.human_resource_machine.benchmarks.workloads import stress_workloads
+from xyz.human_resource_machine.engines import ENGINES
+from xyz.human_resource_machine.interpreter import Interpreter
+from xyz.human_resource_machine.parser import Parser
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_stress_workloads(engine: str):
+    """Test the stress programs compute what they are meant to."""
+    outputs = {}
+    for workload in stress_workloads(scale=0.01):
+        interpreter = Interpreter(
+            instructions=Parser(workload.source).parse(),
+            registers=workload.registers,
+            input=workload.input,
+            engine=ENGINES[engine],
+        )
+        outputs[workload.name] = interpreter.execute_program()
+
+    assert outputs["long_loop"] == [0] * 100
+    assert outputs["indirect"] == [sum(range(50))] * 2
+    assert outputs["large_inbox"] == list(range(2000))
+
+
+def test_run_suite(tmp_path):
+    """Test a quick run measures every workload and survives saving."""
+    measurements = run_suite(engines=["bytecode"], scale=0.001, repeat=1, cli=False)
+    path = str(tmp_path / "results.json")
+    save(measurements, path)
+
+    assert load(path) == measurements
+    names = [measurement.name for measurement in measurements]
+    assert "steps_per_second/bytecode/level_29" in names
+    assert "steps_per_second/bytecode/indirect" in names
+    assert "parse/level_38_speed" in names
+    assert all(measurement.value > 0 for measurement in measurements)
+
+
+def test_compare():
+    """Test regressions are flagged in the direction that is worse."""
+    baseline = [
+        Measurement("steps/a", 100.0, "steps/s", True),
+        Measurement("steps/b", 100.0, "steps/s", True),
+        Measurement("parse/a", 10.0, "us", False),
+        Measurement("parse/b", 10.0, "us", False),
+        Measurement("removed", 1.0, "us", False),
+    ]
+    current = [
+        Measurement("steps/a", 85.0, "steps/s", True),
+        Measurement("steps/b", 95.0, "steps/s", True),
+        Measurement("parse/a", 12.0, "us", False),
+        Measurement("parse/b", 5.0, "us", False),
+        Measurement("added", 1.0, "us", False),
+    ]
+
+    comparisons = compare(baseline, current, threshold=0.1)
+
+    assert [(c.name, c.regressed) for c in comparisons] == [
+        ("steps/a", True),
+        ("steps/b", False),
+        ("parse/a", True),
+        ("parse/b", False),
+    ]
+    assert comparisons[3].improvement == pytest.approx(1.0)
+    assert format_comparisons(comparisons).count("REGRESSED") == 2
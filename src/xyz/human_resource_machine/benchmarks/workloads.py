@@ -0,0 +1,122 @@
+"""Programs and inputs to benchmark the interpreter on.
+
+Each bundled challenge is run on its own input repeated many times, as the
+solutions loop over their inbox. Generated stress programs cover what the
+challenges run little of: long loops over one value, indirect addressing on
+every instruction, and very large inboxes. `scale` multiplies the length of
+every run, so tests can use tiny workloads.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+
+from xyz.human_resource_machine.interpreter import Value
+from xyz.human_resource_machine.level import Level
+
+CHALLENGES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "challenges")
+
+LONG_LOOP = """\
+# Count down from each value in the inbox.
+BEGIN:
+INBOX
+COPYTO 0
+LOOP:
+BUMPDN 0
+JUMPZ END
+JUMP LOOP
+END:
+OUTBOX
+JUMP BEGIN
+"""
+
+INDIRECT = """\
+# Sum the first n tiles through a pointer, reading and writing each one
+# indirectly.
+BEGIN:
+INBOX
+COPYTO 60
+COPYFROM 61
+COPYTO 62
+LOOP:
+BUMPDN 60
+JUMPN DONE
+COPYFROM [60]
+COPYTO [60]
+ADD 62
+COPYTO 62
+ADD [60]
+SUB [60]
+JUMP LOOP
+DONE:
+COPYFROM 62
+OUTBOX
+JUMP BEGIN
+"""
+
+ECHO = """\
+# Copy the inbox to the outbox.
+BEGIN:
+INBOX
+OUTBOX
+JUMP BEGIN
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class Workload:
+    """A program to benchmark, with the registers and input to run it on."""
+
+    name: str
+    source: str
+    registers: dict[Value, Value]
+    input: list[Value]
+
+
+def challenge_workloads(scale: float = 1.0) -> list[Workload]:
+    """Return a workload for each bundled challenge, in name order."""
+    workloads = []
+    for filename in sorted(os.listdir(CHALLENGES)):
+        if not filename.endswith(".yaml"):
+            continue
+        level = Level.from_yaml(os.path.join(CHALLENGES, filename))
+        workloads.append(
+            Workload(
+                name=os.path.splitext(filename)[0],
+                source=level.source,
+                registers=level.registers,
+                input=level.input * max(1, int(2000 * scale)),
+            )
+        )
+    return workloads
+
+
+def stress_workloads(scale: float = 1.0) -> list[Workload]:
+    """Return the generated stress workloads."""
+    runs = max(1, int(200 * scale))
+    return [
+        Workload(
+            name="long_loop",
+            source=LONG_LOOP,
+            registers={},
+            input=[max(1, int(1000 * scale))] * 100,
+        ),
+        Workload(
+            name="indirect",
+            source=INDIRECT,
+            registers={**{tile: tile for tile in range(50)}, 61: 0},
+            input=[50] * runs,
+        ),
+        Workload(
+            name="large_inbox",
+            source=ECHO,
+            registers={},
+            input=list(range(max(1, int(200_000 * scale)))),
+        ),
+    ]
+
+
+def all_workloads(scale: float = 1.0) -> list[Workload]:
+    """Return every workload, challenges first."""
+    return challenge_workloads(scale) + stress_workloads(scale)
@@ -0,0 +1,439 @@
+"""A bytecode compiler and execution loop for the Human Resource Machine.
+
+The parsed program is lowered into parallel tuples of integer opcodes and
+operands. Labels and comments are stripped, jump targets are resolved to
+absolute bytecode indices and register operands are stored directly, so the
+execution loop never inspects instruction objects or looks up labels.
+"""
+
+from __future__ import annotations
+
+import functools
+from collections.abc import Sequence
+from dataclasses import dataclass
+from enum import IntEnum
+
+from xyz.human_resource_machine.interpreter import (
+    _NO_INPUT,
+    Add,
+    AssertValueIs,
+    BumpMinus,
+    BumpPlus,
+    Comment,
+    CopyFrom,
+    CopyTo,
+    Inbox,
+    Instruction,
+    Interpreter,
+    Jump,
+    JumpIfNegative,
+    JumpIfZero,
+    Label,
+    Outbox,
+    Subtract,
+    Value,
+)
+from xyz.human_resource_machine.packed import PackedProgram, fields
+from xyz.human_resource_machine.registers import EMPTY, TILES, RegisterFile
+
+
+class Opcode(IntEnum):
+    """Enumeration of bytecode operations.
+
+    Register instructions have a separate opcode for indirect addressing so the
+    addressing mode is decided at compile time.
+    """
+
+    INBOX = 0
+    OUTBOX = 1
+    COPYFROM = 2
+    COPYFROM_INDIRECT = 3
+    COPYTO = 4
+    COPYTO_INDIRECT = 5
+    ADD = 6
+    ADD_INDIRECT = 7
+    SUB = 8
+    SUB_INDIRECT = 9
+    BUMPUP = 10
+    BUMPUP_INDIRECT = 11
+    BUMPDN = 12
+    BUMPDN_INDIRECT = 13
+    JUMP = 14
+    JUMPZ = 15
+    JUMPN = 16
+    # Jumps to labels that do not exist only fail when they are taken.
+    JUMP_UNDEFINED = 17
+    JUMPZ_UNDEFINED = 18
+    JUMPN_UNDEFINED = 19
+    ASSERT_VALUE = 20
+    ASSERT_REGISTER = 21
+
+
+_REGISTER_OPCODES: dict[type, tuple[Opcode, Opcode]] = {
+    CopyFrom: (Opcode.COPYFROM, Opcode.COPYFROM_INDIRECT),
+    CopyTo: (Opcode.COPYTO, Opcode.COPYTO_INDIRECT),
+    Add: (Opcode.ADD, Opcode.ADD_INDIRECT),
+    Subtract: (Opcode.SUB, Opcode.SUB_INDIRECT),
+    BumpPlus: (Opcode.BUMPUP, Opcode.BUMPUP_INDIRECT),
+    BumpMinus: (Opcode.BUMPDN, Opcode.BUMPDN_INDIRECT),
+}
+
+_JUMP_OPCODES: dict[type, tuple[Opcode, Opcode]] = {
+    Jump: (Opcode.JUMP, Opcode.JUMP_UNDEFINED),
+    JumpIfZero: (Opcode.JUMPZ, Opcode.JUMPZ_UNDEFINED),
+    JumpIfNegative: (Opcode.JUMPN, Opcode.JUMPN_UNDEFINED),
+}
+
+
+# Opcodes whose operand is a register, with a `RegisterFile` address.
+_ADDRESSED_OPCODES = frozenset(
+    opcode for opcodes in _REGISTER_OPCODES.values() for opcode in opcodes
+)
+
+# The value of every opcode, in order, to bind to fast locals.
+_OPCODE_VALUES = tuple(opcode.value for opcode in Opcode)
+
+
+@dataclass(frozen=True, slots=True)
+class Bytecode:
+    """A program lowered to flat opcode and operand arrays."""
+
+    opcodes: tuple[int, ...]
+    # Register key, resolved jump target, or the payload of an assertion.
+    operands: tuple[object, ...]
+    # Index of the source instruction for each opcode, plus one past the end.
+    source_indices: tuple[int, ...]
+    # Bytecode index to resume from for each source instruction index.
+    entry_points: tuple[int, ...]
+    # `RegisterFile` slot of the register operand of each opcode, if any.
+    addresses: tuple[int | None, ...]
+    # Registers named by the program that are not tiles, in slot order.
+    names: tuple[Value, ...]
+
+
+def assemble(program: Sequence[tuple[int, object]]) -> Bytecode:
+    """Build bytecode from `(opcode, operand)` pairs, with no labels.
+
+    Jump operands are the index of the pair jumped to, and each pair stands
+    for the source instruction at the same index. Assertions are not
+    supported.
+    """
+    register_file = RegisterFile()
+    addresses = tuple(
+        register_file.address(operand) if opcode in _ADDRESSED_OPCODES else None
+        for opcode, operand in program
+    )
+    indices = tuple(range(len(program) + 1))
+    return Bytecode(
+        opcodes=tuple(opcode for opcode, _ in program),
+        operands=tuple(operand for _, operand in program),
+        source_indices=indices,
+        entry_points=indices,
+        addresses=addresses,
+        names=tuple(register_file.keys[TILES:]),
+    )
+
+
+def hashable_program(
+    instructions: Sequence[Instruction],
+) -> tuple[Instruction, ...] | PackedProgram:
+    """Return a program in a form usable as a compilation cache key."""
+    # Packed programs are immutable and cache their own hash.
+    if isinstance(instructions, PackedProgram):
+        return instructions
+    return tuple(instructions)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_program(
+    instructions: tuple[Instruction, ...] | PackedProgram,
+) -> Bytecode:
+    """Compile a parsed program into bytecode.
+
+    Packed programs are compiled from their columns, without creating an
+    instruction object for each.
+    """
+    if isinstance(instructions, PackedProgram):
+        rows = list(instructions.fields())
+    else:
+        rows = [fields(instruction) for instruction in instructions]
+
+    # Labels resolve to the next executable instruction, as the reference
+    # interpreter steps over labels and comments without counting them.
+    entry_points: list[int] = []
+    pc = 0
+    for cls, _, _ in rows:
+        entry_points.append(pc)
+        if cls is not Label and cls is not Comment:
+            pc += 1
+    entry_points.append(pc)
+
+    # Later definitions of a label win, matching `Interpreter._jumps`.
+    jumps: dict[str, int] = {}
+    for index, (cls, label, _) in enumerate(rows):
+        if cls is Label:
+            jumps[label] = entry_points[index]
+
+    opcodes: list[int] = []
+    operands: list[object] = []
+    source_indices: list[int] = []
+    addresses: list[int | None] = []
+    register_file = RegisterFile()
+    for index, (cls, operand, indirect) in enumerate(rows):
+        address = None
+        if cls is Label or cls is Comment:
+            continue
+        elif cls is Inbox:
+            opcode = Opcode.INBOX
+        elif cls is Outbox:
+            opcode = Opcode.OUTBOX
+        elif cls in _REGISTER_OPCODES:
+            direct, indirect_opcode = _REGISTER_OPCODES[cls]
+            opcode = indirect_opcode if indirect else direct
+            address = register_file.address(operand)
+        elif cls in _JUMP_OPCODES:
+            defined, undefined = _JUMP_OPCODES[cls]
+            if operand in jumps:
+                opcode, operand = defined, jumps[operand]
+            else:
+                opcode = undefined
+        elif cls is AssertValueIs:
+            opcode = Opcode.ASSERT_VALUE
+        else:
+            opcode = Opcode.ASSERT_REGISTER
+            address = register_file.address(operand[0])
+        opcodes.append(int(opcode))
+        operands.append(operand)
+        source_indices.append(index)
+        addresses.append(address)
+    source_indices.append(len(rows))
+
+    return Bytecode(
+        opcodes=tuple(opcodes),
+        operands=tuple(operands),
+        source_indices=tuple(source_indices),
+        entry_points=tuple(entry_points),
+        addresses=tuple(addresses),
+        names=tuple(register_file.keys[TILES:]),
+    )
+
+
+def execute(interpreter: Interpreter, code: Bytecode | None = None) -> list[Value]:
+    """Run an interpreter's program to completion using compiled bytecode.
+
+    This is an `Engine`: the interpreter's registers, hand, input position,
+    output, execution count and instruction index are updated exactly as the
+    reference `Interpreter.step` loop would update them, including when an
+    error is raised part way through the program. Registers are held in a
+    `RegisterFile` while the program runs. Given `code`, that is run in place
+    of the interpreter's own program.
+    """
+    if code is None:
+        code = compile_program(hashable_program(interpreter.instructions))
+    opcodes = code.opcodes
+    operands = code.operands
+    addresses = code.addresses
+    end = len(opcodes)
+
+    register_file = RegisterFile(interpreter.registers, code.names)
+    slots = register_file.slots
+    keys = register_file.keys
+    address_of = register_file.address
+    inbox = interpreter._inbox()
+    emit = interpreter._emitter()
+    value = interpreter._value
+    input_index = interpreter._input_index
+    executions = interpreter._execution_count
+    pc = code.entry_points[interpreter._instruction_index]
+    watchdog = interpreter._watchdog
+
+    def pointed(pc: int) -> int:
+        """Return the slot of the register a pointer register points at."""
+        pointer = slots[addresses[pc]]
+        if pointer is EMPTY:
+            raise KeyError(operands[pc])
+        if type(pointer) is int and 0 <= pointer < TILES:
+            return pointer
+        return address_of(pointer)
+
+    # Local aliases keep opcode comparisons to fast local loads.
+    (
+        INBOX,
+        OUTBOX,
+        COPYFROM,
+        COPYFROM_INDIRECT,
+        COPYTO,
+        COPYTO_INDIRECT,
+        ADD,
+        ADD_INDIRECT,
+        SUB,
+        SUB_INDIRECT,
+        BUMPUP,
+        BUMPUP_INDIRECT,
+        BUMPDN,
+        BUMPDN_INDIRECT,
+        JUMP,
+        JUMPZ,
+        JUMPN,
+        JUMP_UNDEFINED,
+        JUMPZ_UNDEFINED,
+        JUMPN_UNDEFINED,
+        ASSERT_VALUE,
+        ASSERT_REGISTER,
+    ) = _OPCODE_VALUES
+
+    try:
+        while pc < end:
+            opcode = opcodes[pc]
+            # Ordered roughly by how often each opcode executes in practice. The
+            # watchdog, if any, is checked before every jump.
+            if opcode == COPYFROM:
+                # The hand is left unchanged if the register is empty.
+                copied = slots[addresses[pc]]
+                if copied is EMPTY:
+                    raise KeyError(operands[pc])
+                value = copied
+            elif opcode == COPYTO:
+                slots[addresses[pc]] = value
+            elif opcode == JUMPN:
+                if watchdog is not None:
+                    watchdog.check(pc, value, input_index, slots, executions)
+                pc = operands[pc] if value < 0 else pc + 1
+                executions += 1
+                continue
+            elif opcode == JUMPZ:
+                if watchdog is not None:
+                    watchdog.check(pc, value, input_index, slots, executions)
+                pc = operands[pc] if value == 0 else pc + 1
+                executions += 1
+                continue
+            elif opcode == JUMP:
+                if watchdog is not None:
+                    watchdog.check(pc, value, input_index, slots, executions)
+                executions += 1
+                pc = operands[pc]
+                continue
+            elif opcode == SUB or opcode == SUB_INDIRECT:
+                if type(value) is not int:
+                    raise ValueError(
+                        f"Value {value} must be an integer for subtraction"
+                    )
+                address = addresses[pc] if opcode == SUB else pointed(pc)
+                argument = slots[address]
+                if argument is EMPTY:
+                    raise KeyError(keys[address])
+                if type(argument) is not int:
+                    raise ValueError(
+                        f"Argument {argument} must be an integer for subtraction"
+                    )
+                value -= argument
+            elif opcode == ADD or opcode == ADD_INDIRECT:
+                if type(value) is not int:
+                    raise ValueError(f"Value {value} must be an integer for addition")
+                address = addresses[pc] if opcode == ADD else pointed(pc)
+                argument = slots[address]
+                if argument is EMPTY:
+                    raise KeyError(keys[address])
+                if type(argument) is not int:
+                    raise ValueError(
+                        f"Argument {argument} must be an integer for addition"
+                    )
+                value += argument
+            elif opcode == INBOX:
+                item = next(inbox, _NO_INPUT)
+                if item is _NO_INPUT:
+                    break  # No more input available.
+                value = item
+                input_index += 1
+            elif opcode == OUTBOX:
+                if value is None:
+                    raise ValueError("No value to output")
+                emit(value)
+                value = None
+            elif opcode == BUMPUP or opcode == BUMPDN:
+                address = addresses[pc]
+                bumped = slots[address]
+                if bumped is EMPTY:
+                    raise KeyError(operands[pc])
+                if opcode == BUMPUP:
+                    bumped += 1
+                else:
+                    bumped -= 1
+                slots[address] = value = bumped
+            elif opcode == COPYFROM_INDIRECT:
+                # Pointers to tiles, the common case, are resolved inline.
+                address = slots[addresses[pc]]
+                if type(address) is not int or not 0 <= address < TILES:
+                    address = pointed(pc)
+                copied = slots[address]
+                if copied is EMPTY:
+                    raise KeyError(keys[address])
+                value = copied
+            elif opcode == COPYTO_INDIRECT:
+                address = slots[addresses[pc]]
+                if type(address) is not int or not 0 <= address < TILES:
+                    address = pointed(pc)
+                slots[address] = value
+            elif opcode == BUMPUP_INDIRECT or opcode == BUMPDN_INDIRECT:
+                address = pointed(pc)
+                bumped = slots[address]
+                if bumped is EMPTY:
+                    raise KeyError(keys[address])
+                if opcode == BUMPUP_INDIRECT:
+                    bumped += 1
+                else:
+                    bumped -= 1
+                slots[address] = bumped
+                # The pointer is read again, as it may point at itself.
+                address = pointed(pc)
+                copied = slots[address]
+                if copied is EMPTY:
+                    raise KeyError(keys[address])
+                value = copied
+            elif opcode == JUMP_UNDEFINED:
+                if watchdog is not None:
+                    watchdog.check(pc, value, input_index, slots, executions)
+                raise KeyError(operands[pc])
+            elif opcode == JUMPZ_UNDEFINED:
+                if watchdog is not None:
+                    watchdog.check(pc, value, input_index, slots, executions)
+                if value == 0:
+                    raise KeyError(operands[pc])
+                executions += 1
+                pc += 1
+                continue
+            elif opcode == JUMPN_UNDEFINED:
+                if watchdog is not None:
+                    watchdog.check(pc, value, input_index, slots, executions)
+                if value < 0:
+                    raise KeyError(operands[pc])
+                executions += 1
+                pc += 1
+                continue
+            elif opcode == ASSERT_VALUE:
+                if value != operands[pc]:
+                    raise ValueError(
+                        f"Assertion failed: expected {operands[pc]}, got {value}"
+                    )
+                pc += 1
+                continue  # Assertions are not counted as executions.
+            else:  # ASSERT_REGISTER
+                register, expected = operands[pc]
+                actual = register_file.read(addresses[pc])
+                if actual != expected:
+                    raise ValueError(
+                        f"Assertion failed: expected register '{register}' to be "
+                        f"{expected}, got {actual}"
+                    )
+                pc += 1
+                continue
+            executions += 1
+            pc += 1
+    finally:
+        register_file.store(interpreter.registers)
+        interpreter._value = value
+        interpreter._input_index = input_index
+        interpreter._execution_count = executions
+        interpreter._instruction_index = code.source_indices[pc]
+
+    return interpreter._output
@@ -0,0 +1,170 @@
+"""Tests for the Human Resource Machine bytecode compiler and execution loop."""
+
+import os
+from textwrap import dedent
+
+import pytest
+
+from xyz.human_resource_machine import bytecode
+from xyz.human_resource_machine.bytecode import Opcode, compile_program
+from xyz.human_resource_machine.interpreter import (
+    AssertValueIs,
+    BumpPlus,
+    Comment,
+    CopyFrom,
+    CopyTo,
+    Inbox,
+    Interpreter,
+    Jump,
+    JumpIfZero,
+    Label,
+    Outbox,
+)
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parser import Parser
+from xyz.human_resource_machine.testing import assert_same_behaviour
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+
+def test_compile_strips_labels_and_comments():
+    """Test labels and comments are removed and jumps are resolved."""
+    instructions = (
+        Comment("Start"),
+        Label("BEGIN"),
+        Inbox(),
+        CopyTo(3, indirect=True),
+        JumpIfZero("END"),
+        Jump("BEGIN"),
+        Label("END"),
+    )
+    code = compile_program(instructions)
+
+    assert code.opcodes == (
+        Opcode.INBOX,
+        Opcode.COPYTO_INDIRECT,
+        Opcode.JUMPZ,
+        Opcode.JUMP,
+    )
+    assert code.operands == (None, 3, 4, 0)
+    assert code.source_indices == (2, 3, 4, 5, 7)
+    assert code.entry_points == (0, 0, 0, 1, 2, 3, 4, 4)
+
+
+@pytest.mark.parametrize(
+    "filename", ["level_29.yaml", "level_38_size.yaml", "level_38_speed.yaml"]
+)
+def test_challenges_match_reference(filename: str):
+    """Test the bundled challenges behave identically under both engines."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, filename))
+    assert_same_behaviour(
+        bytecode.execute,
+        instructions=Parser(level.source).parse(),
+        registers=level.registers,
+        input=level.input,
+    )
+
+
+@pytest.mark.parametrize(
+    "source, registers, input",
+    [
+        ("OUTBOX", {}, []),
+        ("INBOX\nADD 0", {0: 1}, ["A"]),
+        ("INBOX\nSUB 0", {0: "B"}, [1]),
+        ("INBOX\nADD [0]", {0: 1}, [1]),
+        ("COPYFROM 7", {}, []),
+        ("INBOX\nJUMPN NOWHERE", {}, ["A"]),
+        ("INBOX\nJUMPZ NOWHERE\nOUTBOX", {}, [0]),
+        ("INBOX\nJUMPZ NOWHERE\nOUTBOX", {}, [1]),
+        ("JUMP NOWHERE", {}, []),
+        ("BUMPUP [0]", {0: 0}, []),
+        ("BUMPDN A", {"A": "Z"}, []),
+    ],
+)
+def test_errors_match_reference(source: str, registers: dict, input: list):
+    """Test runtime errors leave the machine in the reference state."""
+    assert_same_behaviour(
+        bytecode.execute,
+        instructions=Parser(source).parse(),
+        registers=registers,
+        input=input,
+    )
+
+
+@pytest.mark.parametrize(
+    "source, registers, input",
+    [
+        ("INBOX\nCOPYTO [0]\nCOPYFROM [0]\nOUTBOX", {0: 500}, [3]),
+        ("INBOX\nCOPYTO [0]\nBUMPUP [0]\nCOPYFROM x\nOUTBOX", {0: "x"}, [3]),
+        ("INBOX\nCOPYTO [0]\nADD [0]\nSUB [1]\nOUTBOX", {0: -2, 1: 0}, [3]),
+        ("BUMPDN [0]\nCOPYFROM [0]", {0: 1}, []),
+        ("COPYFROM [0]", {0: -1}, []),
+        ("COPYFROM [0]", {0: "x"}, []),
+    ],
+)
+def test_register_addressing_matches_reference(
+    source: str, registers: dict, input: list
+):
+    """Test tiles, names and pointers outside the dense tiles match the reference."""
+    assert_same_behaviour(
+        bytecode.execute,
+        instructions=Parser(source).parse(),
+        registers=registers,
+        input=input,
+    )
+
+
+def test_assertions_match_reference():
+    """Test assertion instructions are checked but not counted."""
+    instructions = [Inbox(), AssertValueIs(1), BumpPlus("A"), AssertValueIs(2)]
+    assert_same_behaviour(
+        bytecode.execute, instructions=instructions, registers={"A": 5}, input=[1]
+    )
+
+
+def test_resume_after_step():
+    """Test the engine resumes from a partially stepped interpreter."""
+    source = dedent("""\
+    BEGIN:
+    INBOX
+    COPYTO 0
+    COPYFROM 0
+    OUTBOX
+    JUMP BEGIN
+    """)
+    interpreter = Interpreter(
+        instructions=Parser(source).parse(),
+        input=[1, 2, 3],
+        engine=bytecode.execute,
+    )
+    interpreter.step()
+    interpreter.step()
+
+    assert interpreter.execute_program() == [1, 2, 3]
+    assert interpreter.executions == 15
+    assert interpreter.instruction_index == 1
+
+
+def test_jump_to_trailing_label():
+    """Test jumping to a label at the end of the program terminates it."""
+    instructions = [CopyFrom("A"), Jump("END"), Outbox(), Label("END")]
+    assert_same_behaviour(
+        bytecode.execute, instructions=instructions, registers={"A": 1}
+    )
+
+
+def test_execute_assembled_code():
+    """Test the engine runs bytecode given in place of the program."""
+    code = bytecode.assemble(
+        [
+            (Opcode.INBOX, None),
+            (Opcode.JUMPZ, 0),
+            (Opcode.OUTBOX, None),
+            (Opcode.JUMP, 0),
+        ]
+    )
+    interpreter = Interpreter(input=[1, 0, 2])
+
+    assert bytecode.execute(interpreter, code) == [1, 2]
+    assert interpreter.executions == 10
+    assert interpreter.instruction_index == 0
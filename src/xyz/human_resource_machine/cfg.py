@@ -0,0 +1,329 @@
+"""The control-flow graph of a Human Resource Machine program.
+
+`build` splits a parsed program into basic blocks, runs of instructions that
+always execute together from the first, and links each block to the blocks
+that can run after it. On top of the graph it finds the blocks reachable from
+the start of the program, the dominators of each block, the natural loops and
+how they nest, and the registers each block reads and writes.
+
+A block starts at the start of the program, at every label and after every
+jump. A jump to a label that does not exist has no successor, as running it
+fails. Comments and the testing-only assertions belong to the block around
+them but never count as instructions.
+"""
+
+from __future__ import annotations
+
+import bisect
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from xyz.human_resource_machine.interpreter import (
+    Add,
+    AssertRegisterIs,
+    AssertValueIs,
+    BumpMinus,
+    BumpPlus,
+    Comment,
+    CopyFrom,
+    CopyTo,
+    Inbox,
+    Instruction,
+    Jump,
+    JumpIfNegative,
+    JumpIfZero,
+    Label,
+    Subtract,
+    Value,
+)
+
+_JUMPS = (Jump, JumpIfZero, JumpIfNegative)
+
+
+@dataclass(frozen=True, slots=True)
+class Block:
+    """A run of instructions only entered at its start."""
+
+    # Indices into the program's instructions, `stop` excluded.
+    start: int
+    stop: int
+    # Indices into `ControlFlowGraph.blocks` of the blocks that can run next.
+    successors: tuple[int, ...]
+    # Whether the program can end in this block, by running off the end of
+    # the program or by an INBOX finding no input left.
+    exits: bool
+    # Executed instructions, counted as `Interpreter.instruction_count` does.
+    size: int
+    # Registers read before the block writes them, and registers it writes,
+    # not counting those read or written through a pointer.
+    uses: frozenset[Value]
+    defs: frozenset[Value]
+    # Whether an instruction reads or writes a register through a pointer,
+    # which may be any register.
+    indirect_uses: bool
+    indirect_defs: bool
+
+
+@dataclass(frozen=True, slots=True)
+class Loop:
+    """A natural loop: blocks that can return to a header dominating them."""
+
+    header: int
+    # Every block in the loop, including the header and any nested loops.
+    blocks: frozenset[int]
+    # Blocks in the loop jumping or falling through back to the header.
+    latches: tuple[int, ...]
+    # Index into `ControlFlowGraph.loops` of the innermost enclosing loop.
+    parent: int | None
+    # 1 for an outermost loop, 2 for a loop nested in it, and so on.
+    depth: int
+
+
+@dataclass(frozen=True, slots=True)
+class ControlFlowGraph:
+    """The basic blocks of a program, with the analyses built on them.
+
+    Blocks are numbered in program order, so block 0 is where the program
+    starts.
+    """
+
+    blocks: tuple[Block, ...]
+    predecessors: tuple[tuple[int, ...], ...]
+    reachable: frozenset[int]
+    # The blocks that every path from the start to a block passes through,
+    # including the block itself. Empty for unreachable blocks.
+    dominators: tuple[frozenset[int], ...]
+    # Outer loops before the loops nested in them.
+    loops: tuple[Loop, ...]
+    # Whether every cycle is a natural loop. A jump into the middle of a loop
+    # makes a cycle with no single header, which `loops` does not include.
+    reducible: bool
+
+    def block_at(self, index: int) -> int:
+        """Return the block holding the instruction at `index`."""
+        if not 0 <= index < (self.blocks[-1].stop if self.blocks else 0):
+            raise IndexError(f"No instruction at index {index}")
+        return bisect.bisect_right(self.blocks, index, key=lambda b: b.start) - 1
+
+    def dominates(self, dominator: int, block: int) -> bool:
+        """Whether every path from the start to `block` passes `dominator`."""
+        return dominator in self.dominators[block]
+
+    def innermost_loop(self, block: int) -> int | None:
+        """Return the index of the innermost loop holding `block`, if any."""
+        found = None
+        for index, loop in enumerate(self.loops):
+            if block in loop.blocks and (
+                found is None or loop.depth > self.loops[found].depth
+            ):
+                found = index
+        return found
+
+
+def def_use(
+    instruction: Instruction,
+) -> tuple[tuple[Value, ...], tuple[Value, ...], bool, bool]:
+    """Return the registers an instruction reads and writes directly.
+
+    The last two items say whether it also reads or writes a register through
+    a pointer. Reading the pointer counts as reading its register.
+    """
+    match instruction:
+        case CopyFrom() | Add() | Subtract():
+            return (instruction.register,), (), instruction.indirect, False
+        case CopyTo(indirect=True):
+            return (instruction.register,), (), False, True
+        case CopyTo():
+            return (), (instruction.register,), False, False
+        case BumpPlus(indirect=True) | BumpMinus(indirect=True):
+            return (instruction.register,), (), True, True
+        case BumpPlus() | BumpMinus():
+            return (instruction.register,), (instruction.register,), False, False
+        case AssertRegisterIs():
+            return (instruction.register,), (), False, False
+    return (), (), False, False
+
+
+def _block(
+    instructions: Sequence[Instruction],
+    start: int,
+    stop: int,
+    successors: tuple[int, ...],
+    exits: bool,
+) -> Block:
+    size = 0
+    uses: set[Value] = set()
+    defs: set[Value] = set()
+    indirect_uses = indirect_defs = False
+    for index in range(start, stop):
+        instruction = instructions[index]
+        if not isinstance(
+            instruction, Label | Comment | AssertValueIs | AssertRegisterIs
+        ):
+            size += 1
+        reads, writes, reads_indirect, writes_indirect = def_use(instruction)
+        uses.update(register for register in reads if register not in defs)
+        defs.update(writes)
+        indirect_uses |= reads_indirect
+        indirect_defs |= writes_indirect
+    return Block(
+        start,
+        stop,
+        successors,
+        exits,
+        size,
+        frozenset(uses),
+        frozenset(defs),
+        indirect_uses,
+        indirect_defs,
+    )
+
+
+def _blocks(instructions: Sequence[Instruction]) -> tuple[Block, ...]:
+    """Split the program into blocks and link them."""
+    # Later definitions of a label win, as when running.
+    labels: dict[str, int] = {}
+    starts = {0} if instructions else set()
+    for index, instruction in enumerate(instructions):
+        if isinstance(instruction, Label):
+            labels[instruction.label] = index
+            starts.add(index)
+        elif isinstance(instruction, _JUMPS) and index + 1 < len(instructions):
+            starts.add(index + 1)
+    ordered = sorted(starts)
+    block_of = {start: number for number, start in enumerate(ordered)}
+
+    blocks = []
+    for number, start in enumerate(ordered):
+        stop = ordered[number + 1] if number + 1 < len(ordered) else len(instructions)
+        last = instructions[stop - 1]
+        successors: list[int] = []
+        falls_through = not isinstance(last, Jump)
+        if isinstance(last, _JUMPS) and last.label in labels:
+            successors.append(block_of[labels[last.label]])
+        if falls_through and stop < len(instructions):
+            successors.append(number + 1)
+        exits = (falls_through and stop == len(instructions)) or any(
+            isinstance(instructions[index], Inbox) for index in range(start, stop)
+        )
+        blocks.append(
+            _block(instructions, start, stop, tuple(dict.fromkeys(successors)), exits)
+        )
+    return tuple(blocks)
+
+
+def _postorder(blocks: Sequence[Block]) -> list[int]:
+    """Return the blocks reachable from the start in depth-first postorder."""
+    order: list[int] = []
+    if not blocks:
+        return order
+    seen = {0}
+    stack = [(0, iter(blocks[0].successors))]
+    while stack:
+        block, successors = stack[-1]
+        for successor in successors:
+            if successor not in seen:
+                seen.add(successor)
+                stack.append((successor, iter(blocks[successor].successors)))
+                break
+        else:
+            stack.pop()
+            order.append(block)
+    return order
+
+
+def _dominators(
+    blocks: Sequence[Block],
+    predecessors: Sequence[Sequence[int]],
+    order: list[int],
+) -> list[frozenset[int]]:
+    """Find the dominators of each block by iterating to a fixed point."""
+    reachable = frozenset(order)
+    dominators = [
+        reachable if block in reachable else frozenset() for block in range(len(blocks))
+    ]
+    if not order:
+        return dominators
+    dominators[0] = frozenset({0})
+    changed = True
+    while changed:
+        changed = False
+        for block in reversed(order):
+            if block == 0:
+                continue
+            incoming = [dominators[p] for p in predecessors[block] if p in reachable]
+            new = frozenset.intersection(*incoming) | {block}
+            if new != dominators[block]:
+                dominators[block] = new
+                changed = True
+    return dominators
+
+
+def _loops(
+    blocks: Sequence[Block],
+    predecessors: Sequence[Sequence[int]],
+    dominators: Sequence[frozenset[int]],
+) -> tuple[Loop, ...]:
+    """Find the natural loops, one per header, and how they nest."""
+    latches: dict[int, list[int]] = {}
+    for block, node in enumerate(blocks):
+        for successor in node.successors:
+            if successor in dominators[block]:
+                latches.setdefault(successor, []).append(block)
+
+    found = []
+    for header, sources in latches.items():
+        body = {header}
+        pending = [source for source in sources if source != header]
+        while pending:
+            block = pending.pop()
+            if block not in body:
+                body.add(block)
+                pending.extend(p for p in predecessors[block] if dominators[p])
+        found.append((header, frozenset(body), tuple(sources)))
+    found.sort(key=lambda loop: (-len(loop[1]), loop[0]))
+
+    loops: list[Loop] = []
+    for header, body, sources in found:
+        # The smallest loop seen so far holding this header encloses it.
+        parent = None
+        for index, outer in enumerate(loops):
+            if header in outer.blocks and body < outer.blocks:
+                parent = index
+        depth = 1 if parent is None else loops[parent].depth + 1
+        loops.append(Loop(header, body, sources, parent, depth))
+    return tuple(loops)
+
+
+def _reducible(
+    blocks: Sequence[Block], dominators: Sequence[frozenset[int]], order: list[int]
+) -> bool:
+    """Whether the graph has no cycle once loops' back edges are removed."""
+    position = {block: index for index, block in enumerate(order)}
+    for block in order:
+        for successor in blocks[block].successors:
+            # In postorder, an edge to a later block closes a cycle.
+            if position[successor] > position[block] and (
+                successor not in dominators[block]
+            ):
+                return False
+    return True
+
+
+def build(instructions: Sequence[Instruction]) -> ControlFlowGraph:
+    """Build the control-flow graph of a parsed program."""
+    blocks = _blocks(instructions)
+    predecessors: list[list[int]] = [[] for _ in blocks]
+    for number, block in enumerate(blocks):
+        for successor in block.successors:
+            predecessors[successor].append(number)
+    order = _postorder(blocks)
+    dominators = _dominators(blocks, predecessors, order)
+    return ControlFlowGraph(
+        blocks=blocks,
+        predecessors=tuple(map(tuple, predecessors)),
+        reachable=frozenset(order),
+        dominators=tuple(dominators),
+        loops=_loops(blocks, predecessors, dominators),
+        reducible=_reducible(blocks, dominators, order),
+    )
@@ -0,0 +1,153 @@
+"""Tests for the control-flow graph of Human Resource Machine programs."""
+
+import os
+
+import pytest
+
+from xyz.human_resource_machine import cfg
+from xyz.human_resource_machine.interpreter import Interpreter
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parser import Parser
+from xyz.human_resource_machine.testing import parse
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+NESTED = """\
+OUTER:
+INBOX
+COPYTO n
+INNER:
+BUMPDN n
+JUMPN NEXT
+OUTBOX
+JUMP INNER
+NEXT:
+JUMP OUTER
+"""
+
+
+def test_blocks():
+    """Test the program is split at labels and after jumps, and linked."""
+    graph = cfg.build(parse(NESTED))
+
+    assert [(block.start, block.stop) for block in graph.blocks] == [
+        (0, 3),
+        (3, 6),
+        (6, 8),
+        (8, 10),
+    ]
+    assert [block.successors for block in graph.blocks] == [
+        (1,),
+        (3, 2),
+        (1,),
+        (0,),
+    ]
+    assert graph.predecessors == ((3,), (0, 2), (1,), (1,))
+    assert [block.size for block in graph.blocks] == [2, 2, 2, 1]
+    assert [block.exits for block in graph.blocks] == [True, False, False, False]
+    assert graph.block_at(4) == 1
+    with pytest.raises(IndexError):
+        graph.block_at(10)
+
+
+def test_def_use():
+    """Test registers read before being written, and written, in each block."""
+    graph = cfg.build(
+        parse("""\
+    COPYTO a
+    COPYFROM a
+    ADD b
+    BUMPUP c
+    COPYTO [d]
+    """)
+    )
+
+    [block] = graph.blocks
+    assert block.uses == {"b", "c", "d"}
+    assert block.defs == {"a", "c"}
+    assert not block.indirect_uses
+    assert block.indirect_defs
+
+
+def test_reachability_and_dominators():
+    """Test unreachable blocks are found and dominate nothing."""
+    graph = cfg.build(
+        parse("""\
+    INBOX
+    JUMPZ ZERO
+    OUTBOX
+    JUMP END
+    OUTBOX
+    ZERO:
+    OUTBOX
+    END:
+    """)
+    )
+
+    assert graph.reachable == {0, 1, 3, 4}
+    assert graph.dominators[2] == frozenset()
+    assert graph.dominators[4] == {0, 4}
+    assert graph.dominates(0, 3)
+    assert not graph.dominates(1, 3)
+    assert graph.blocks[4].exits
+    assert graph.loops == ()
+
+
+def test_nested_loops():
+    """Test loops are found with their nesting."""
+    graph = cfg.build(parse(NESTED))
+
+    assert graph.reducible
+    assert graph.loops == (
+        cfg.Loop(
+            header=0, blocks=frozenset({0, 1, 2, 3}), latches=(3,), parent=None, depth=1
+        ),
+        cfg.Loop(header=1, blocks=frozenset({1, 2}), latches=(2,), parent=0, depth=2),
+    )
+    assert graph.innermost_loop(2) == 1
+    assert graph.innermost_loop(3) == 0
+
+
+def test_irreducible():
+    """Test a jump into the middle of a loop is reported as irreducible."""
+    graph = cfg.build(
+        parse("""\
+    INBOX
+    JUMPZ MIDDLE
+    TOP:
+    OUTBOX
+    MIDDLE:
+    INBOX
+    JUMP TOP
+    """)
+    )
+
+    assert not graph.reducible
+    assert graph.loops == ()
+
+
+def test_missing_label():
+    """Test a jump to a missing label has no successor."""
+    graph = cfg.build(parse("JUMP NOWHERE\nINBOX"))
+
+    assert graph.blocks[0].successors == ()
+    assert graph.reachable == {0}
+
+
+@pytest.mark.parametrize(
+    "filename", sorted(f for f in os.listdir(CHALLENGES) if f.endswith(".yaml"))
+)
+def test_challenges(filename):
+    """Test block sizes add up and every executed instruction is reachable."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, filename))
+    instructions = Parser(level.source).parse()
+    graph = cfg.build(instructions)
+    interpreter = Interpreter(
+        instructions=instructions, registers=level.registers, input=level.input
+    )
+
+    assert sum(block.size for block in graph.blocks) == interpreter.instruction_count
+    executed = set()
+    interpreter.tracer = lambda event: executed.add(event.index)
+    interpreter.execute_program()
+    assert {graph.block_at(index) for index in executed} <= graph.reachable
@@ -0,0 +1,341 @@
+"""A Python code generating execution engine for the Human Resource Machine.
+
+A program is compiled to bytecode, split into basic blocks and emitted as the
+source of a single Python function. Each basic block becomes straight-line
+code, and jumps select the next block inside one `while` loop. The compiled
+function is cached, so re-running a program against many inputs only pays for
+code generation once.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+from collections.abc import Callable
+
+from xyz.human_resource_machine.bytecode import (
+    Bytecode,
+    Opcode,
+    compile_program,
+    hashable_program,
+)
+from xyz.human_resource_machine.interpreter import _NO_INPUT, Interpreter, Value
+
+_JUMPS = {Opcode.JUMP, Opcode.JUMPZ, Opcode.JUMPN}
+
+_UNDEFINED_JUMPS = {
+    Opcode.JUMP_UNDEFINED,
+    Opcode.JUMPZ_UNDEFINED,
+    Opcode.JUMPN_UNDEFINED,
+}
+
+_CAN_RAISE = {
+    Opcode.OUTBOX,
+    Opcode.COPYFROM,
+    Opcode.COPYFROM_INDIRECT,
+    Opcode.COPYTO_INDIRECT,
+    Opcode.ADD,
+    Opcode.ADD_INDIRECT,
+    Opcode.SUB,
+    Opcode.SUB_INDIRECT,
+    Opcode.BUMPUP,
+    Opcode.BUMPUP_INDIRECT,
+    Opcode.BUMPDN,
+    Opcode.BUMPDN_INDIRECT,
+    # Jumps can raise when the watchdog stops the program.
+    Opcode.JUMP,
+    Opcode.JUMPZ,
+    Opcode.JUMPN,
+    Opcode.JUMP_UNDEFINED,
+    Opcode.JUMPZ_UNDEFINED,
+    Opcode.JUMPN_UNDEFINED,
+    Opcode.ASSERT_VALUE,
+    Opcode.ASSERT_REGISTER,
+    # Not an error, but the program stops here when the inbox is empty.
+    Opcode.INBOX,
+}
+
+_ARITHMETIC = {
+    Opcode.ADD: ("+", "addition", False),
+    Opcode.ADD_INDIRECT: ("+", "addition", True),
+    Opcode.SUB: ("-", "subtraction", False),
+    Opcode.SUB_INDIRECT: ("-", "subtraction", True),
+}
+
+
+def _not_an_integer(kind: str, value: object, operation: str) -> ValueError:
+    return ValueError(f"{kind} {value} must be an integer for {operation}")
+
+
+def _assert_value(value: Value | None, expected: Value) -> None:
+    if value != expected:
+        raise ValueError(f"Assertion failed: expected {expected}, got {value}")
+
+
+def _assert_register(registers: dict, register: Value, expected: Value) -> None:
+    if registers[register] != expected:
+        raise ValueError(
+            f"Assertion failed: expected register '{register}' to be {expected}, "
+            f"got {registers[register]}"
+        )
+
+
+def _literal(operand: object) -> str:
+    """Return Python source for an operand embedded in generated code."""
+    if type(operand) not in (int, str):
+        raise ValueError(f"Cannot generate code for operand {operand!r}")
+    return repr(operand)
+
+
+def basic_block_leaders(code: Bytecode) -> list[int]:
+    """Return the sorted bytecode indices that start a basic block."""
+    leaders = {0}
+    for pc, opcode in enumerate(code.opcodes):
+        if opcode in _JUMPS:
+            leaders.add(code.operands[pc])
+            leaders.add(pc + 1)
+    end = len(code.opcodes)
+    return sorted(leader for leader in leaders if leader < end)
+
+
+class _Generator:
+    """Emits the source of the function executing a compiled program."""
+
+    def __init__(self, code: Bytecode, checked: bool = True):
+        self.code = code
+        self.checked = checked
+        self.end = len(code.opcodes)
+        self.leaders = basic_block_leaders(code)
+        # Block index for each leader; falling off the end is its own block.
+        self.blocks = {leader: index for index, leader in enumerate(self.leaders)}
+        self.blocks[self.end] = len(self.leaders)
+        # Executions are added once per block; when the program stops part way
+        # through a block, `counted[pc]` holds the executions it had made.
+        self.counted = [0] * (self.end + 1)
+        for start, stop in zip(self.leaders, self.leaders[1:] + [self.end]):
+            for pc in range(start, stop - 1):
+                self.counted[pc + 1] = self.counted[pc] + self._counts(pc)
+        self.lines: list[str] = []
+
+    def emit(self, indent: int, line: str) -> None:
+        self.lines.append("    " * indent + line)
+
+    def generate(self) -> str:
+        self.emit(0, "def run(interpreter, block):")
+        self.emit(1, "registers = interpreter.registers")
+        self.emit(1, "inbox = interpreter._inbox()")
+        self.emit(1, "emit = interpreter._emitter()")
+        self.emit(1, "value = interpreter._value")
+        self.emit(1, "input_index = interpreter._input_index")
+        self.emit(1, "executions = interpreter._execution_count")
+        self.emit(1, "watchdog = interpreter._watchdog")
+        self.emit(1, "pc = 0")
+        self.emit(1, "try:")
+        self.emit(2, "while True:")
+        self._dispatch(3, 0, len(self.leaders) + 1)
+        self.emit(1, "finally:")
+        self.emit(2, "interpreter._value = value")
+        self.emit(2, "interpreter._input_index = input_index")
+        self.emit(
+            2, f"interpreter._execution_count = executions + {tuple(self.counted)}[pc]"
+        )
+        self.emit(2, f"interpreter._instruction_index = {self.code.source_indices}[pc]")
+        return "\n".join(self.lines) + "\n"
+
+    def _counts(self, pc: int) -> int:
+        """Return how many executions the instruction at `pc` counts for."""
+        opcode = self.code.opcodes[pc]
+        return 0 if opcode in (Opcode.ASSERT_VALUE, Opcode.ASSERT_REGISTER) else 1
+
+    def _dispatch(self, indent: int, low: int, high: int) -> None:
+        """Emit a balanced comparison tree selecting blocks `low` to `high`."""
+        if high - low == 1:
+            self._block(indent, low)
+            return
+        middle = (low + high) // 2
+        self.emit(indent, f"if block < {middle}:")
+        self._dispatch(indent + 1, low, middle)
+        self.emit(indent, "else:")
+        self._dispatch(indent + 1, middle, high)
+
+    def _block(self, indent: int, block: int) -> None:
+        """Emit the straight-line code for one basic block."""
+        if block == len(self.leaders):
+            self.emit(indent, f"pc = {self.end}")
+            self.emit(indent, "break")
+            return
+
+        start = self.leaders[block]
+        stop = self.leaders[block + 1] if block + 1 < len(self.leaders) else self.end
+        executions = sum(self._counts(pc) for pc in range(start, stop))
+        for pc in range(start, stop):
+            opcode = self.code.opcodes[pc]
+            operand = self.code.operands[pc]
+            if opcode in _CAN_RAISE:
+                self.emit(indent, f"pc = {pc}")
+            if opcode in _JUMPS or opcode in _UNDEFINED_JUMPS:
+                self.emit(indent, "if watchdog is not None:")
+                self.emit(
+                    indent + 1,
+                    "watchdog.check(pc, value, input_index, registers, "
+                    f"executions + {self.counted[pc]})",
+                )
+            if opcode in _JUMPS:
+                self._jump(indent, opcode, operand, executions, block + 1)
+                return
+            self._instruction(indent, opcode, operand)
+
+        if executions:
+            self.emit(indent, f"executions += {executions}")
+        self.emit(indent, f"block = {block + 1}")
+
+    def _jump(
+        self, indent: int, opcode: int, target: int, executions: int, next_block: int
+    ) -> None:
+        taken = [f"executions += {executions}", f"block = {self.blocks[target]}"]
+        if opcode == Opcode.JUMP:
+            for line in taken:
+                self.emit(indent, line)
+            return
+        condition = "value == 0" if opcode == Opcode.JUMPZ else "value < 0"
+        self.emit(indent, f"if {condition}:")
+        for line in taken:
+            self.emit(indent + 1, line)
+        self.emit(indent, "else:")
+        self.emit(indent + 1, f"executions += {executions}")
+        self.emit(indent + 1, f"block = {next_block}")
+
+    def _instruction(self, indent: int, opcode: int, operand: object) -> None:
+        """Emit a single non-jump instruction."""
+        emit = functools.partial(self.emit, indent)
+        if opcode in _ARITHMETIC:
+            operator, operation, indirect = _ARITHMETIC[opcode]
+            register = _literal(operand)
+            address = f"registers[{register}]" if indirect else register
+            if not self.checked:
+                emit(f"value {operator}= registers[{address}]")
+                return
+            emit("if not isinstance(value, int):")
+            emit(f"    raise _not_an_integer('Value', value, '{operation}')")
+            emit(f"argument = registers[{address}]")
+            emit("if not isinstance(argument, int):")
+            emit(f"    raise _not_an_integer('Argument', argument, '{operation}')")
+            emit(f"value {operator}= argument")
+            return
+
+        match opcode:
+            case Opcode.INBOX:
+                emit("item = next(inbox, _NO_INPUT)")
+                emit("if item is _NO_INPUT:")
+                emit("    break")
+                emit("value = item")
+                emit("input_index += 1")
+            case Opcode.OUTBOX:
+                if self.checked:
+                    emit("if value is None:")
+                    emit("    raise ValueError('No value to output')")
+                emit("emit(value)")
+                emit("value = None")
+            case Opcode.COPYFROM:
+                emit(f"value = registers[{_literal(operand)}]")
+            case Opcode.COPYFROM_INDIRECT:
+                emit(f"value = registers[registers[{_literal(operand)}]]")
+            case Opcode.COPYTO:
+                emit(f"registers[{_literal(operand)}] = value")
+            case Opcode.COPYTO_INDIRECT:
+                emit(f"registers[registers[{_literal(operand)}]] = value")
+            case Opcode.BUMPUP | Opcode.BUMPDN:
+                operator = "+" if opcode == Opcode.BUMPUP else "-"
+                emit(f"registers[{_literal(operand)}] {operator}= 1")
+                emit(f"value = registers[{_literal(operand)}]")
+            case Opcode.BUMPUP_INDIRECT | Opcode.BUMPDN_INDIRECT:
+                operator = "+" if opcode == Opcode.BUMPUP_INDIRECT else "-"
+                address = f"registers[registers[{_literal(operand)}]]"
+                emit(f"{address} {operator}= 1")
+                emit(f"value = {address}")
+            case Opcode.JUMP_UNDEFINED:
+                emit(f"raise KeyError({_literal(operand)})")
+            case Opcode.JUMPZ_UNDEFINED:
+                emit("if value == 0:")
+                emit(f"    raise KeyError({_literal(operand)})")
+            case Opcode.JUMPN_UNDEFINED:
+                emit("if value < 0:")
+                emit(f"    raise KeyError({_literal(operand)})")
+            case Opcode.ASSERT_VALUE:
+                emit(f"_assert_value(value, {_literal(operand)})")
+            case Opcode.ASSERT_REGISTER:
+                register, expected = operand
+                emit(
+                    f"_assert_register(registers, {_literal(register)}, "
+                    f"{_literal(expected)})"
+                )
+
+
+def generate_source(code: Bytecode, checked: bool = True) -> str:
+    """Return the Python source of the function that executes `code`.
+
+    Without `checked`, ADD and SUB do not check both values are integers and
+    OUTBOX does not check there is a value in hand, which is only correct
+    for programs `typecheck.check` has proven never fail those checks.
+    """
+    return _Generator(code, checked).generate()
+
+
+@functools.lru_cache(maxsize=256)
+def compile_function(
+    code: Bytecode, checked: bool = True
+) -> Callable[[Interpreter, int], None]:
+    """Compile bytecode into a Python function, caching the result."""
+    source = generate_source(code, checked)
+    digest = hashlib.sha256(source.encode()).hexdigest()[:12]
+    namespace = {
+        "_not_an_integer": _not_an_integer,
+        "_assert_value": _assert_value,
+        "_assert_register": _assert_register,
+        "_NO_INPUT": _NO_INPUT,
+    }
+    exec(compile(source, f"<hrm-program-{digest}>", "exec"), namespace)
+    return namespace["run"]
+
+
+@functools.lru_cache(maxsize=256)
+def _leader_blocks(code: Bytecode) -> dict[int, int]:
+    """Return the block index for each bytecode index that starts a block."""
+    return {leader: index for index, leader in enumerate(basic_block_leaders(code))}
+
+
+def execute(interpreter: Interpreter) -> list[Value]:
+    """Run an interpreter's program to completion using generated Python code.
+
+    Like `bytecode.execute`, this is an `Engine` that leaves the interpreter in
+    the state the reference `Interpreter.step` loop would.
+    """
+    return _execute(interpreter, checked=True)
+
+
+def execute_unchecked(interpreter: Interpreter) -> list[Value]:
+    """Run a program proven type safe without checking values' types.
+
+    This is an `Engine` like `execute`, for programs that `typecheck.check`
+    finds `safe` on the interpreter's registers and input. Any other program
+    may produce wrong output rather than raising.
+    """
+    return _execute(interpreter, checked=False)
+
+
+def _execute(interpreter: Interpreter, *, checked: bool) -> list[Value]:
+    code = compile_program(hashable_program(interpreter.instructions))
+    run = compile_function(code, checked)
+    leaders = _leader_blocks(code)
+
+    # Blocks can only be entered at their start, so an interpreter stopped part
+    # way through a block is stepped to the next block boundary first.
+    end = len(code.opcodes)
+    pc = code.entry_points[interpreter._instruction_index]
+    while pc < end and pc not in leaders:
+        if (output := interpreter.step()) is not None:
+            return output
+        pc = code.entry_points[interpreter._instruction_index]
+
+    run(interpreter, leaders.get(pc, len(leaders)))
+    return interpreter._output
@@ -0,0 +1,139 @@
+"""Tests for the Human Resource Machine generated code execution engine."""
+
+import os
+from textwrap import dedent
+
+import pytest
+
+from xyz.human_resource_machine import codegen
+from xyz.human_resource_machine.bytecode import compile_program
+from xyz.human_resource_machine.interpreter import (
+    AssertRegisterIs,
+    AssertValueIs,
+    BumpPlus,
+    Inbox,
+    Interpreter,
+)
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parser import Parser
+from xyz.human_resource_machine.testing import assert_same_behaviour, run
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+LOOP = dedent("""\
+BEGIN:
+INBOX
+COPYTO 0
+LOOP:
+BUMPDN 0
+JUMPN BEGIN
+COPYFROM 0
+OUTBOX
+JUMP LOOP
+""")
+
+
+def test_basic_blocks():
+    """Test programs are split at jump targets and after jumps."""
+    code = compile_program(tuple(Parser(LOOP).parse()))
+
+    assert codegen.basic_block_leaders(code) == [0, 2, 4]
+
+
+def test_compiled_function_is_cached():
+    """Test the same program is only compiled to a function once."""
+    code = compile_program(tuple(Parser(LOOP).parse()))
+
+    assert codegen.compile_function(code) is codegen.compile_function(code)
+
+
+@pytest.mark.parametrize(
+    "filename", ["level_29.yaml", "level_38_size.yaml", "level_38_speed.yaml"]
+)
+def test_challenges_match_reference(filename: str):
+    """Test the bundled challenges behave identically under both engines."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, filename))
+    assert_same_behaviour(
+        codegen.execute,
+        instructions=Parser(level.source).parse(),
+        registers=level.registers,
+        input=level.input,
+    )
+
+
+@pytest.mark.parametrize(
+    "source, registers, input",
+    [
+        (LOOP, {}, [3, 0, 2]),
+        (LOOP, {}, [3, "A"]),
+        ("INBOX\nOUTBOX\nOUTBOX", {}, [1]),
+        ("INBOX\nCOPYTO 0\nADD 0\nSUB [1]", {1: 0}, [4]),
+        ("INBOX\nCOPYTO 0\nSUB [1]\nOUTBOX", {1: 2}, [4]),
+        ("INBOX\nJUMPN NOWHERE", {}, ["A"]),
+        ("INBOX\nJUMPZ NOWHERE\nOUTBOX", {}, [0]),
+        ("INBOX\nJUMPZ NOWHERE\nOUTBOX", {}, [1]),
+        ("INBOX\nJUMP NOWHERE", {}, [1]),
+        ("BUMPUP [0]", {0: 0}, []),
+        ("END:\nINBOX\nJUMPZ END", {}, [0, 0, 1]),
+    ],
+)
+def test_programs_match_reference(source: str, registers: dict, input: list):
+    """Test normal termination and runtime errors match the reference state."""
+    assert_same_behaviour(
+        codegen.execute,
+        instructions=Parser(source).parse(),
+        registers=registers,
+        input=input,
+    )
+
+
+def test_assertions_match_reference():
+    """Test assertion instructions are checked but not counted."""
+    instructions = [
+        Inbox(),
+        AssertValueIs(1),
+        BumpPlus("A"),
+        AssertRegisterIs("A", 7),
+    ]
+    assert_same_behaviour(
+        codegen.execute, instructions=instructions, registers={"A": 5}, input=[1]
+    )
+
+
+def test_resume_part_way_through_block():
+    """Test the engine resumes from an interpreter stopped inside a block."""
+    interpreter = Interpreter(
+        instructions=Parser(LOOP).parse(), input=[2, 1], engine=codegen.execute
+    )
+    interpreter.step()
+    interpreter.step()
+    interpreter.step()
+
+    assert interpreter.execute_program() == [1, 0, 0]
+
+    reference = Interpreter(instructions=Parser(LOOP).parse(), input=[2, 1])
+    reference.execute_program()
+    assert interpreter.executions == reference.executions
+
+
+def test_unchecked_leaves_out_type_checks():
+    """Test programs can run without type checks, which only safe ones may."""
+    instructions = Parser("INBOX\nADD 0\nOUTBOX\nOUTBOX").parse()
+
+    checked, error = run(
+        codegen.execute, instructions=instructions, registers={0: "B"}, input=["A"]
+    )
+    unchecked, unchecked_error = run(
+        codegen.execute_unchecked,
+        instructions=instructions,
+        registers={0: "B"},
+        input=["A"],
+    )
+
+    assert isinstance(error, ValueError)
+    assert checked.output == []
+    assert unchecked_error is None
+    assert unchecked.output == ["AB", None]
+    assert "isinstance" not in codegen.generate_source(
+        compile_program(tuple(instructions)), checked=False
+    )
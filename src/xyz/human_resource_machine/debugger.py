@@ -0,0 +1,66 @@
+"""A time-travel debugger for Human Resource Machine programs.
+
+The debugger runs a program one instruction at a time with `Interpreter.step`,
+keeping a snapshot of the state before each step so it can step backwards as
+well as forwards. Snapshots share registers with the interpreter until either
+changes them, so each step costs one copy of the registers at most.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from xyz.human_resource_machine.interpreter import Interpreter, Snapshot
+
+
+class Debugger:
+    """Step an interpreter forwards and backwards through its program."""
+
+    def __init__(self, interpreter: Interpreter):
+        self.interpreter = interpreter
+        self._history: list[Snapshot] = []
+        # Set when INBOX ends the program by finding the inbox empty.
+        self._inbox_empty = False
+
+    @property
+    def finished(self) -> bool:
+        """Whether the program has run to completion."""
+        interpreter = self.interpreter
+        return self._inbox_empty or interpreter.instruction_index >= len(
+            interpreter.instructions
+        )
+
+    @property
+    def steps(self) -> int:
+        """The number of steps that can be undone."""
+        return len(self._history)
+
+    def step(self) -> bool:
+        """Take one step, returning False if the program had already finished."""
+        if self.finished:
+            return False
+        self._history.append(self.interpreter.snapshot())
+        self._inbox_empty = self.interpreter.step() is not None
+        return True
+
+    def back(self) -> bool:
+        """Undo the last step, returning whether there was one to undo."""
+        if not self._history:
+            return False
+        self.interpreter.restore(self._history.pop())
+        self._inbox_empty = False
+        return True
+
+    def run_until(self, condition: Callable[[Interpreter], bool]) -> bool:
+        """Step until `condition` holds, returning whether it did."""
+        while not condition(self.interpreter):
+            if not self.step():
+                return False
+        return True
+
+    def rewind_until(self, condition: Callable[[Interpreter], bool]) -> bool:
+        """Step backwards until `condition` holds, returning whether it did."""
+        while not condition(self.interpreter):
+            if not self.back():
+                return False
+        return True
@@ -0,0 +1,69 @@
+"""Tests for the Human Resource Machine time-travel debugger."""
+
+from xyz.human_resource_machine.debugger import Debugger
+from xyz.human_resource_machine.interpreter import Interpreter
+from xyz.human_resource_machine.parser import Parser
+
+SOURCE = """\
+BEGIN:
+INBOX
+COPYTO 0
+BUMPUP 0
+OUTBOX
+JUMP BEGIN
+"""
+
+
+def make_debugger() -> Debugger:
+    interpreter = Interpreter(
+        instructions=Parser(SOURCE).parse(), registers={0: 0}, input=[1, 5]
+    )
+    return Debugger(interpreter)
+
+
+def test_step_forwards_and_backwards():
+    """Test stepping back undoes each step exactly."""
+    debugger = make_debugger()
+    interpreter = debugger.interpreter
+    states = []
+    while not debugger.finished:
+        states.append(
+            (interpreter.instruction_index, interpreter.value, interpreter.output)
+        )
+        assert debugger.step()
+
+    assert interpreter.output == [2, 6]
+    assert not debugger.step()
+    while debugger.back():
+        assert (
+            interpreter.instruction_index,
+            interpreter.value,
+            interpreter.output,
+        ) == states.pop()
+    assert states == []
+    assert interpreter.register(0) == 0
+    assert interpreter.executions == 0
+
+
+def test_run_and_rewind_until():
+    """Test running to and rewinding to a condition."""
+    debugger = make_debugger()
+    interpreter = debugger.interpreter
+
+    assert debugger.run_until(lambda i: i.output == [2, 6])
+    assert interpreter.executions == 9
+    assert debugger.rewind_until(lambda i: i.register(0) == 2)
+    assert interpreter.executions == 6
+    assert interpreter.output == [2]
+    assert not debugger.run_until(lambda i: i.executions > 100)
+    assert debugger.finished
+
+
+def test_resume_after_rewind():
+    """Test running the program again after rewinding gives the same result."""
+    debugger = make_debugger()
+    debugger.run_until(lambda i: False)
+    debugger.rewind_until(lambda i: i.executions == 5)
+
+    assert debugger.interpreter.execute_program() == [2, 6]
+    assert debugger.interpreter.executions == 10
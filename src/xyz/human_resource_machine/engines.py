@@ -0,0 +1,12 @@
+"""Execution engines for the Human Resource Machine interpreter, by name."""
+
+import xyz.human_resource_machine.bytecode as bytecode
+import xyz.human_resource_machine.codegen as codegen
+from xyz.human_resource_machine.interpreter import Engine
+
+# `None` selects the reference `Interpreter.step` loop.
+ENGINES: dict[str, Engine | None] = {
+    "step": None,
+    "bytecode": bytecode.execute,
+    "generated": codegen.execute,
+}
@@ -0,0 +1,512 @@
+"""Bound the executions a program takes on a level without running it.
+
+The program is explored as a graph of states: an instruction, with how many
+values it has read from the inbox and written to the outbox. Every
+conditional jump may go either way, so every run of the program follows a
+path through the graph, and the graph only has cycles where the program
+loops without reading or writing a value. A run ends by running off the end
+of the program, or by an INBOX with no input left, and a run solving the
+level has by then written exactly as many values as the level expects.
+
+The shortest path to an end is a lower bound on the executions of any run
+solving the level. Without cycles, the longest path is an upper bound, and
+the estimate is exact when the two agree, as for straight-line programs.
+Loops that neither read nor write, like counting down a register, run as
+often as the values in registers allow. When those values are known on
+entering the loop, such as a counter copied from one of the level's
+registers, the loop is followed to its end and counted exactly. Otherwise,
+as for a counter read from the inbox, their back edges are removed, which
+leaves an upper bound of `base + per_trip * trips`, for a run that jumps
+back to the start of such a loop `trips` times in all.
+"""
+
+from __future__ import annotations
+
+import heapq
+from collections.abc import Sequence
+from dataclasses import dataclass
+from enum import StrEnum
+
+import xyz.human_resource_machine.cfg as cfg
+from xyz.human_resource_machine.interpreter import (
+    Add,
+    AssertRegisterIs,
+    AssertValueIs,
+    BumpMinus,
+    BumpPlus,
+    Comment,
+    CopyFrom,
+    CopyTo,
+    Inbox,
+    Instruction,
+    Jump,
+    JumpIfNegative,
+    JumpIfZero,
+    Label,
+    Outbox,
+    Subtract,
+    Value,
+)
+from xyz.human_resource_machine.level import Level
+
+# The most states explored before giving up on counting outputs, and then on
+# estimating at all.
+MAX_STATES = 1_000_000
+
+# The most executions followed through a loop counting known values.
+MAX_COUNTED = 10_000
+
+# An instruction's index, with how many values have been read and written.
+State = tuple[int, int, int]
+
+
+class _Unknown:
+    def __repr__(self) -> str:
+        return "UNKNOWN"
+
+
+# A hand whose value is not known; registers not known are left out.
+_UNKNOWN = _Unknown()
+
+# The hand and the registers known to hold the same values on every path.
+_Known = tuple[object, dict[Value, Value | None]]
+
+
+class Verdict(StrEnum):
+    """Whether a program can meet a level's speed challenge."""
+
+    MEETS = "meets"
+    MISSES = "misses"
+    UNKNOWN = "unknown"
+
+
+@dataclass(frozen=True, slots=True)
+class Estimate:
+    """Bounds on the executions of any run of a program solving a level."""
+
+    # None if no run can end having written the expected number of values.
+    low: int | None
+    # None if loops that neither read nor write may run any number of times.
+    high: int | None
+    # Bound the executions as `base + per_trip * trips`, with `base` None if
+    # even that bound cannot be found.
+    base: int | None
+    per_trip: int
+    # Indices into the instructions of the start of every loop counted by
+    # `trips`.
+    loops: tuple[int, ...]
+
+    @property
+    def exact(self) -> bool:
+        """Whether every run solving the level takes the same executions."""
+        return self.low is not None and self.low == self.high
+
+    def verdict(self, target: int) -> Verdict:
+        """Decide whether runs solving the level take at most `target`."""
+        if self.low is None or self.low > target:
+            return Verdict.MISSES
+        if self.high is not None and self.high <= target:
+            return Verdict.MEETS
+        return Verdict.UNKNOWN
+
+    def format(self, target: int) -> str:
+        """Describe the bounds against a speed target."""
+        if self.low is None:
+            bounds = "no run writes the expected output"
+        elif self.exact:
+            bounds = f"exactly {self.low}"
+        elif self.high is not None:
+            bounds = f"{self.low} to {self.high}"
+        elif self.base is not None:
+            bounds = (
+                f"at least {self.low}, at most {self.base} + {self.per_trip} "
+                f"per iteration of the loops at instruction index {', '.join(map(str, self.loops))}"
+            )
+        else:
+            bounds = f"at least {self.low}"
+        return f"Estimated execution count: {bounds} target: {target} " + (
+            f"({self.verdict(target)})"
+        )
+
+
+def _successors(
+    instructions: Sequence[Instruction], labels: dict[str, int], index: int
+) -> list[int]:
+    instruction = instructions[index]
+    targets = []
+    if isinstance(instruction, Jump | JumpIfZero | JumpIfNegative):
+        if instruction.label in labels:
+            targets.append(labels[instruction.label])
+        if isinstance(instruction, Jump):
+            return targets
+    targets.append(index + 1)
+    return targets
+
+
+def _value_loops(
+    instructions: Sequence[Instruction], graph: cfg.ControlFlowGraph
+) -> list[tuple[int, frozenset[int], set[tuple[int, int]]]]:
+    """Find the loops that neither read nor write.
+
+    Returns the index of each loop's start, the indices of its instructions
+    and its back edges.
+    """
+    loops = []
+    for loop in graph.loops:
+        body = frozenset(
+            index
+            for block in loop.blocks
+            for index in range(graph.blocks[block].start, graph.blocks[block].stop)
+        )
+        if any(isinstance(instructions[index], Inbox | Outbox) for index in body):
+            continue
+        header = graph.blocks[loop.header].start
+        back_edges = {(graph.blocks[latch].stop - 1, header) for latch in loop.latches}
+        loops.append((header, body, back_edges))
+    return sorted(loops, key=lambda loop: loop[0])
+
+
+def _transfer(instruction: Instruction, known: _Known) -> _Known:
+    """Return the values known after an instruction, whichever way it jumps."""
+    hand, registers = known[0], dict(known[1])
+
+    def read(register: Value, indirect: bool) -> object:
+        value = registers.get(register, _UNKNOWN)
+        if indirect:
+            if value is _UNKNOWN or value is None:
+                return _UNKNOWN
+            return registers.get(value, _UNKNOWN)
+        return value
+
+    def store(register: object, value: object) -> None:
+        if register is _UNKNOWN or register is None:
+            # A pointer that is not known may change any register.
+            registers.clear()
+        elif value is _UNKNOWN:
+            registers.pop(register, None)
+        else:
+            registers[register] = value
+
+    match instruction:
+        case Inbox():
+            hand = _UNKNOWN
+        case Outbox():
+            hand = None
+        case CopyFrom():
+            hand = read(instruction.register, instruction.indirect)
+        case CopyTo():
+            target: object = instruction.register
+            if instruction.indirect:
+                target = registers.get(instruction.register, _UNKNOWN)
+            store(target, hand)
+        case Add() | Subtract():
+            argument = read(instruction.register, instruction.indirect)
+            if isinstance(hand, int) and isinstance(argument, int):
+                hand = (
+                    hand + argument if isinstance(instruction, Add) else hand - argument
+                )
+            else:
+                hand = _UNKNOWN
+        case BumpPlus() | BumpMinus():
+            target = instruction.register
+            if instruction.indirect:
+                target = registers.get(instruction.register, _UNKNOWN)
+            value = _UNKNOWN if target is _UNKNOWN else registers.get(target, _UNKNOWN)
+            if isinstance(value, int):
+                value += 1 if isinstance(instruction, BumpPlus) else -1
+            else:
+                value = _UNKNOWN
+            store(target, value)
+            hand = read(instruction.register, instruction.indirect)
+    return hand, registers
+
+
+def _join(a: _Known, b: _Known) -> _Known:
+    def same(x: object, y: object) -> bool:
+        return type(x) is type(y) and x == y
+
+    return (
+        a[0] if same(a[0], b[0]) else _UNKNOWN,
+        {
+            register: value
+            for register, value in a[1].items()
+            if register in b[1] and same(value, b[1][register])
+        },
+    )
+
+
+def _counted_loops(
+    instructions: Sequence[Instruction],
+    labels: dict[str, int],
+    weights: list[int],
+    registers: dict[Value, Value],
+    loops: list[tuple[int, frozenset[int], set[tuple[int, int]]]],
+) -> dict[int, tuple[int, int]]:
+    """Count the executions of loops that always start from the same values.
+
+    A loop that neither reads nor writes, entered with every value its jumps
+    depend on known, such as a counter set from a level's register and
+    stepped by BUMPUP or BUMPDN, takes the same path every time. Returns the
+    index the loop leaves to and its executions, keyed by the loop's start.
+    """
+    # The values known before each instruction, on every path reaching it.
+    before: list[_Known | None] = [None] * len(instructions)
+    if instructions:
+        before[0] = (None, dict(registers))
+    pending = [0] if instructions else []
+    while pending:
+        index = pending.pop()
+        after = _transfer(instructions[index], before[index])
+        for target in _successors(instructions, labels, index):
+            if target >= len(instructions):
+                continue
+            current = before[target]
+            joined = after if current is None else _join(current, after)
+            if current is None or joined != current:
+                before[target] = joined
+                pending.append(target)
+
+    counted = {}
+    for header, body, _ in loops:
+        # Only the values on entering the loop, not those jumping back.
+        entries = [
+            _transfer(instructions[index], before[index])
+            for index in range(len(instructions))
+            if index not in body
+            and before[index] is not None
+            and header in _successors(instructions, labels, index)
+        ]
+        if header == 0:
+            entries.append((None, dict(registers)))
+        if not entries:
+            continue
+        known = entries[0]
+        for entry in entries[1:]:
+            known = _join(known, entry)
+
+        index, executions = header, 0
+        # The values at the start of each trip, to stop at a loop never left.
+        trips: set[tuple[object, frozenset]] = set()
+        while index in body and executions <= MAX_COUNTED:
+            instruction = instructions[index]
+            if index == header:
+                trip = (known[0], frozenset(known[1].items()))
+                if trip in trips:
+                    break
+                trips.add(trip)
+            hand = known[0]
+            if isinstance(instruction, JumpIfZero | JumpIfNegative):
+                if hand is _UNKNOWN or (
+                    isinstance(instruction, JumpIfNegative)
+                    and not isinstance(hand, int)
+                ):
+                    break
+                taken = hand == 0 if isinstance(instruction, JumpIfZero) else hand < 0
+                following = labels.get(instruction.label) if taken else index + 1
+            elif isinstance(instruction, Jump):
+                following = labels.get(instruction.label)
+            else:
+                following = index + 1
+            if following is None:
+                break
+            known = _transfer(instruction, known)
+            executions += weights[index]
+            index = following
+        else:
+            if index not in body:
+                counted[header] = (index, executions)
+    return counted
+
+
+def _longest(
+    order: list[State],
+    forward: dict[State, list[State]],
+    weight: dict[State, int],
+    stops: set[State],
+) -> dict[State, int]:
+    """Find the longest path from each state to one of `stops`, if any.
+
+    `order` is a topological order of `forward`, which has no cycles.
+    """
+    longest: dict[State, int] = {}
+    for state in reversed(order):
+        reaching = [longest[t] for t in forward[state] if t in longest]
+        if state in stops:
+            reaching.append(0)
+        if reaching:
+            longest[state] = weight[state] + max(reaching)
+    return longest
+
+
+def estimate(
+    instructions: Sequence[Instruction],
+    level: Level,
+    *,
+    max_states: int = MAX_STATES,
+) -> Estimate:
+    """Bound the executions of a program solving `level` on its input.
+
+    Raises `ValueError` if the level's input is too long to explore within
+    `max_states`.
+    """
+    length = len(instructions)
+    inputs = len(level.input)
+    outputs = len(level.output) if level.output is not None else None
+    if outputs is not None and (length + 1) * (inputs + 1) * (outputs + 1) > max_states:
+        # Still a bound, only a looser one.
+        outputs = None
+    if (length + 1) * (inputs + 1) > max_states:
+        raise ValueError(f"An input of {inputs} values is too long to estimate")
+
+    labels: dict[str, int] = {}
+    weights = []
+    for index, instruction in enumerate(instructions):
+        if isinstance(instruction, Label):
+            labels[instruction.label] = index
+        weights.append(
+            0
+            if isinstance(
+                instruction, Label | Comment | AssertValueIs | AssertRegisterIs
+            )
+            else 1
+        )
+    loops = _value_loops(instructions, cfg.build(instructions))
+    counted = _counted_loops(instructions, labels, weights, level.registers, loops)
+    # Loops within a counted loop are counted with it.
+    loops = [
+        loop
+        for loop in loops
+        if not any(
+            loop[0] in body and loop[0] != header
+            for header, body, _ in loops
+            if header in counted
+        )
+        and loop[0] not in counted
+    ]
+    headers = tuple(header for header, _, _ in loops)
+    back_edges = set().union(*(edges for _, _, edges in loops))
+
+    # States are (index, values read, values written), with the end of a run
+    # as END. Edges leaving a state weigh 1 if its instruction is executed.
+    END = (-1, 0, 0)
+    edges: dict[State, list[tuple[State, bool]]] = {}
+    weight: dict[State, int] = {END: 0}
+    start = (0, 0, 0)
+    pending = [start]
+    while pending:
+        state = pending.pop()
+        if state in edges:
+            continue
+        index, read, written = state
+        targets: list[tuple[State, bool]] = []
+        edges[state] = targets
+        weight[state] = 0
+        if index == length:
+            if outputs is None or written == outputs:
+                targets.append((END, False))
+            continue
+        instruction = instructions[index]
+        if isinstance(instruction, Inbox) and read == inputs:
+            if outputs is None or written == outputs:
+                targets.append((END, False))
+            continue
+        if index in counted:
+            # The loop runs the same way every time it is entered.
+            following, weight[state] = counted[index]
+            targets.append(((following, read, written), False))
+            pending.append((following, read, written))
+            continue
+        weight[state] = weights[index]
+        if isinstance(instruction, Inbox):
+            read += 1
+        elif isinstance(instruction, Outbox) and outputs is not None:
+            if written == outputs:
+                continue
+            written += 1
+        for target in _successors(instructions, labels, index):
+            following = (target, read, written)
+            targets.append((following, (index, target) in back_edges))
+            pending.append(following)
+
+    # Only states on some path from the start to an end matter.
+    incoming: dict[State, list[State]] = {END: []}
+    for state, targets in edges.items():
+        for target, _ in targets:
+            incoming.setdefault(target, []).append(state)
+    useful = {END}
+    pending = [END]
+    while pending:
+        for source in incoming.get(pending.pop(), []):
+            if source not in useful:
+                useful.add(source)
+                pending.append(source)
+    if start not in useful:
+        return Estimate(None, None, None, 0, headers)
+
+    # Shortest path to an end; only the edges leaving counted loops weigh
+    # more than 1.
+    distance = {END: 0}
+    queue = [(0, END)]
+    while queue:
+        length_to_end, state = heapq.heappop(queue)
+        if length_to_end > distance[state]:
+            continue
+        for source in incoming.get(state, []):
+            if source not in useful:
+                continue
+            candidate = length_to_end + weight[source]
+            if candidate < distance.get(source, candidate + 1):
+                distance[source] = candidate
+                heapq.heappush(queue, (candidate, source))
+    low = distance[start]
+
+    # Longest paths once the back edges of loops counting registers are cut,
+    # taking states in reverse topological order.
+    forward = {
+        state: [t for t, cut in edges[state] if not cut and t in useful]
+        for state in useful
+        if state != END
+    }
+    forward[END] = []
+    remaining = {state: 0 for state in forward}
+    for targets in forward.values():
+        for target in targets:
+            remaining[target] += 1
+    order = [state for state, count in remaining.items() if count == 0]
+    for state in order:
+        for target in forward[state]:
+            remaining[target] -= 1
+            if remaining[target] == 0:
+                order.append(target)
+    if len(order) < len(forward):
+        return Estimate(low, None, None, 0, headers)
+
+    # Each jump back to the start of a loop ends an iteration, a path through
+    # the loop from its start, which always holds the same number of values
+    # read and written. Taking every iteration out of a run leaves a path
+    # with no such jump, so each trip adds at most the longest iteration.
+    latches = {
+        state
+        for state in useful
+        if state != END
+        for target, cut in edges[state]
+        if cut and target in useful
+    }
+    to_end = _longest(order, forward, weight, {END})
+    if not latches:
+        return Estimate(low, to_end[start], to_end[start], 0, ())
+    per_trip = 0
+    for header, body, _ in loops:
+        inside = {
+            state: [t for t in targets if t[0] in body]
+            for state, targets in forward.items()
+            if state[0] in body
+        }
+        iterations = _longest(
+            [state for state in order if state in inside], inside, weight, latches
+        )
+        per_trip = max(
+            [per_trip]
+            + [length for state, length in iterations.items() if state[0] == header]
+        )
+    return Estimate(low, None, to_end[start], per_trip, headers)
@@ -0,0 +1,160 @@
+"""Tests for the static execution count estimator."""
+
+import os
+import random
+
+from xyz.human_resource_machine.estimator import Estimate, Verdict, estimate
+from xyz.human_resource_machine.fuzzer import random_program
+from xyz.human_resource_machine.interpreter import Interpreter
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parser import Parser
+from xyz.human_resource_machine.testing import parse
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+
+def level(input, output, speed_challenge=0, registers=None):
+    return Level("", input, registers or {}, speed_challenge, 0, output)
+
+
+def test_straight_line_is_exact():
+    """Test a program without branches has an exact estimate."""
+    instructions = parse("""\
+    INBOX
+    # Comments and labels are free.
+    A:
+    OUTBOX
+    INBOX
+    OUTBOX
+    """)
+
+    result = estimate(instructions, level([1, 2], [1, 2], speed_challenge=4))
+
+    assert result == Estimate(low=4, high=4, base=4, per_trip=0, loops=())
+    assert result.exact
+    assert result.verdict(4) is Verdict.MEETS
+    assert result.verdict(3) is Verdict.MISSES
+
+
+def test_input_loop_is_bounded():
+    """Test loops reading a value on every iteration run once per value."""
+    instructions = parse("""\
+    BEGIN:
+    INBOX
+    JUMPZ BEGIN
+    OUTBOX
+    JUMP BEGIN
+    """)
+
+    # Writing two of the four values fixes how often each branch is taken.
+    result = estimate(instructions, level([0, 1, 0, 2], [1, 2]))
+
+    assert (result.low, result.high) == (12, 12)
+
+
+def test_no_run_writes_the_output():
+    """Test a program that cannot write enough values misses any target."""
+    result = estimate(parse("INBOX\nOUTBOX"), level([1, 2], [1, 2]))
+
+    assert result.low is None
+    assert result.verdict(1000) is Verdict.MISSES
+
+
+def test_counting_loop_is_symbolic():
+    """Test loops counting down a register are bounded per iteration."""
+    instructions = parse("""\
+    BEGIN:
+    INBOX
+    COPYTO 0
+    LOOP:
+    BUMPDN 0
+    JUMPZ END
+    JUMP LOOP
+    END:
+    OUTBOX
+    JUMP BEGIN
+    """)
+
+    result = estimate(instructions, level([3, 5], [0, 0], speed_challenge=100))
+
+    assert result.high is None
+    assert result.loops == (3,)
+    assert result.per_trip == 3
+    assert result.verdict(100) is Verdict.UNKNOWN
+    interpreter = Interpreter(instructions=instructions, input=[3, 5])
+    interpreter.execute_program()
+    # One trip back to LOOP for every count but the last.
+    trips = 2 + 4
+    assert result.low <= interpreter.executions
+    assert interpreter.executions <= result.base + result.per_trip * trips
+    assert "per iteration" in result.format(100)
+
+
+def test_counted_loop_is_exact():
+    """Test loops counting down a register starting from a known value."""
+    instructions = parse("""\
+    COPYFROM three
+    COPYTO n
+    INBOX
+    OUTBOX
+    LOOP:
+    BUMPDN n
+    JUMPZ DONE
+    JUMP LOOP
+    DONE:
+    """)
+    registers = {"three": 3}
+    interpreter = Interpreter(instructions=instructions, registers=registers, input=[5])
+    interpreter.execute_program()
+
+    result = estimate(instructions, level([5], [5], registers=registers))
+
+    assert (result.low, result.high) == (12, 12)
+    assert interpreter.executions == 12
+    assert result.exact
+
+
+def test_challenges():
+    """Test the bounds hold for the bundled solutions."""
+    for filename in sorted(os.listdir(CHALLENGES)):
+        if not filename.endswith(".yaml"):
+            continue
+        challenge = Level.from_yaml(os.path.join(CHALLENGES, filename))
+        instructions = Parser(challenge.source).parse()
+        interpreter = Interpreter(
+            instructions=instructions,
+            registers=challenge.registers,
+            input=challenge.input,
+        )
+        interpreter.execute_program()
+
+        result = estimate(instructions, challenge)
+
+        assert result.low <= interpreter.executions
+        assert result.high is None or interpreter.executions <= result.high
+
+
+def test_random_programs():
+    """Test the bounds hold for random programs on the output they produce."""
+    rng = random.Random(0)
+    for _ in range(2000):
+        source = random_program(rng, [0, 1], rng.randint(1, 10))
+        input = [rng.randint(-3, 9) for _ in range(rng.randint(0, 4))]
+        instructions = Parser(source).parse()
+        interpreter = Interpreter(
+            instructions=instructions,
+            registers={0: 0, 1: 2},
+            input=input,
+            max_executions=500,
+        )
+        try:
+            output = interpreter.execute_program()
+        except Exception:
+            continue
+
+        result = estimate(
+            instructions, level(input, list(output), registers={0: 0, 1: 2})
+        )
+
+        assert result.low is not None and result.low <= interpreter.executions
+        assert result.high is None or interpreter.executions <= result.high
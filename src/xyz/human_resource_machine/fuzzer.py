@@ -0,0 +1,357 @@
+"""Differential fuzzing of the execution engines and of level solutions.
+
+`fuzz_engines` runs random programs, written with the keywords of
+`lexer.Instruction` and parsed like any other, on random inboxes, with every
+engine. Each must produce the same output, execution count and error as the
+reference `Interpreter.step` loop. The generated code without type checks
+joins them on the programs `typecheck` proves safe. `fuzz_solutions` runs
+several solutions to the same level on random inboxes, and expects the same
+output and error from each.
+
+Inboxes are drawn from a level's `Domain`, inferred from its own input, so
+that random inboxes are ones the level's solution is meant to handle. Cases
+are split into batches across a process pool, each batch seeded from its
+index, so a run is reproducible. The first divergence found is shrunk to a
+minimal case that still diverges, by removing instructions, input values and
+registers, and by simplifying operands and values.
+"""
+
+from __future__ import annotations
+
+import itertools
+import random
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+
+import xyz.human_resource_machine.codegen as codegen
+import xyz.human_resource_machine.typecheck as typecheck
+from xyz.human_resource_machine.engines import ENGINES
+from xyz.human_resource_machine.interpreter import Interpreter, Value
+from xyz.human_resource_machine.level import Domain, Level
+from xyz.human_resource_machine.lexer import Instruction
+from xyz.human_resource_machine.parser import Parser
+
+# Cases run by each task given to a worker process.
+BATCH_SIZE = 256
+
+# The generated code without type checks, which is only fuzzed on programs
+# `typecheck` proves safe, as those are the only ones it is meant to run.
+UNCHECKED = "unchecked"
+
+_REGISTER_KEYWORDS = [
+    Instruction.COPYFROM,
+    Instruction.COPYTO,
+    Instruction.ADD,
+    Instruction.SUB,
+    Instruction.BUMPUP,
+    Instruction.BUMPDN,
+]
+_JUMP_KEYWORDS = [Instruction.JUMP, Instruction.JUMPZ, Instruction.JUMPN]
+_LABELS = ["A", "B", "C"]
+
+
+@dataclass(frozen=True, slots=True)
+class Case:
+    """A program to run, with the registers and input to run it on."""
+
+    source: str
+    registers: dict[Value, Value]
+    input: list[Value]
+
+
+@dataclass(frozen=True, slots=True)
+class Outcome:
+    """What running a case produced."""
+
+    output: list[Value]
+    executions: int
+    # The type and message of the error raised, if any.
+    error: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class Divergence:
+    """A case on which engines, or solutions, disagree."""
+
+    case: Case
+    # The outcome of each engine, or of each solution on the case's input.
+    outcomes: dict[str, Outcome]
+
+    def format(self) -> str:
+        """Describe the case and every outcome, to reproduce the divergence."""
+        lines = [
+            "Program:",
+            *(f"  {line}" for line in self.case.source.splitlines()),
+            f"Registers: {self.case.registers}",
+            f"Input: {self.case.input}",
+        ]
+        for name, outcome in self.outcomes.items():
+            lines.append(
+                f"{name}: output={outcome.output} executions={outcome.executions} "
+                f"error={outcome.error}"
+            )
+        return "\n".join(lines)
+
+
+@dataclass(frozen=True, slots=True)
+class FuzzResult:
+    """The outcome of a fuzzing run."""
+
+    cases: int
+    # The first divergence found, shrunk, if any.
+    divergence: Divergence | None
+
+
+def run_case(case: Case, engine: str, max_executions: int) -> Outcome:
+    """Run a case with an engine, recording rather than raising any error."""
+    interpreter = Interpreter(
+        instructions=Parser(case.source).parse(),
+        registers=case.registers,
+        input=case.input,
+        engine=codegen.execute_unchecked if engine == UNCHECKED else ENGINES[engine],
+        max_executions=max_executions,
+    )
+    try:
+        interpreter.execute_program()
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return Outcome(list(interpreter.output), interpreter.executions, error)
+
+
+def random_program(rng: random.Random, registers: Sequence[Value], length: int) -> str:
+    """Write a random program of `length` instructions using `registers`.
+
+    Most programs start with an `INBOX`, as most instructions fail on an
+    empty hand, which would stop nearly every program at its first step.
+    """
+    lines = [Instruction.INBOX.value] if rng.random() < 0.8 else []
+    while len(lines) < length:
+        kind = rng.random()
+        if kind < 0.3:
+            lines.append(rng.choice([Instruction.INBOX, Instruction.OUTBOX]).value)
+        elif kind < 0.75:
+            register = rng.choice(registers)
+            operand = f"[{register}]" if rng.random() < 0.3 else f"{register}"
+            lines.append(f"{rng.choice(_REGISTER_KEYWORDS).value} {operand}")
+        else:
+            lines.append(f"{rng.choice(_JUMP_KEYWORDS).value} {rng.choice(_LABELS)}")
+    # Most jumps have a label to go to, some do not.
+    for label in _LABELS:
+        if rng.random() < 0.8:
+            lines.insert(rng.randint(0, len(lines)), f"{label}:")
+    return "\n".join(lines)
+
+
+def _diverges(
+    case: Case, engines: Sequence[str], max_executions: int
+) -> Divergence | None:
+    """Run a case with every engine, returning their outcomes if they differ."""
+    if UNCHECKED in engines and not _safe(case):
+        engines = [engine for engine in engines if engine != UNCHECKED]
+    outcomes = {engine: run_case(case, engine, max_executions) for engine in engines}
+    if len(set(map(_key, outcomes.values()))) > 1:
+        return Divergence(case, outcomes)
+    return None
+
+
+def _safe(case: Case) -> bool:
+    """Return whether a case's program never fails a type check on its input."""
+    kinds = typecheck.Kind(0)
+    for value in case.input:
+        kinds |= typecheck.kind_of(value)
+    instructions = Parser(case.source).parse()
+    return typecheck.check(instructions, case.registers, kinds).safe
+
+
+def _key(outcome: Outcome) -> tuple:
+    return (tuple(outcome.output), outcome.executions, outcome.error)
+
+
+def _simpler_cases(case: Case, domain: Domain) -> Iterator[Case]:
+    """Yield cases one step simpler than `case`, smallest changes last."""
+    lines = case.source.splitlines()
+    for index in range(len(lines)):
+        yield replace(case, source="\n".join(lines[:index] + lines[index + 1 :]))
+    for index in range(len(case.input)):
+        yield replace(case, input=case.input[:index] + case.input[index + 1 :])
+    for key in case.registers:
+        registers = {k: v for k, v in case.registers.items() if k != key}
+        yield replace(case, registers=registers)
+    for index, line in enumerate(lines):
+        if "[" in line:
+            simpler = line.replace("[", "").replace("]", "")
+            yield replace(
+                case, source="\n".join(lines[:index] + [simpler] + lines[index + 1 :])
+            )
+    simplest = domain.simplest()
+    for index, value in enumerate(case.input):
+        if value != simplest:
+            input = case.input[:index] + [simplest] + case.input[index + 1 :]
+            yield replace(case, input=input)
+
+
+def shrink(case: Case, still_diverges: Callable[[Case], bool], domain: Domain) -> Case:
+    """Simplify a case for as long as it keeps diverging."""
+    while True:
+        for candidate in _simpler_cases(case, domain):
+            if still_diverges(candidate):
+                case = candidate
+                break
+        else:
+            return case
+
+
+def _engine_batch(
+    level: Level,
+    domain: Domain,
+    engines: tuple[str, ...],
+    max_length: int,
+    max_executions: int,
+    seed: int,
+    batch: int,
+    size: int,
+) -> tuple[int, Case | None]:
+    """Run a batch of random cases, returning how many ran and any divergence."""
+    rng = random.Random(f"{seed}:{batch}")
+    free = (tile for tile in itertools.count() if tile not in level.registers)
+    registers = [*level.registers, *itertools.islice(free, 3)]
+    for count in range(1, size + 1):
+        source = random_program(rng, registers, rng.randint(1, max_length))
+        input = [domain.sample(rng) for _ in range(rng.randint(0, 8))]
+        case = Case(source, level.registers, input)
+        if _diverges(case, engines, max_executions) is not None:
+            return count, case
+    return size, None
+
+
+def _solution_batch(
+    levels: tuple[Level, ...],
+    domain: Domain,
+    max_executions: int,
+    seed: int,
+    batch: int,
+    size: int,
+) -> tuple[int, list[Value] | None]:
+    """Run a batch of random inputs, returning how many ran and any divergence."""
+    rng = random.Random(f"{seed}:{batch}")
+    for count in range(1, size + 1):
+        input = [domain.sample(rng) for _ in range(rng.randint(0, 8))]
+        if _solutions_diverge(levels, input, max_executions) is not None:
+            return count, input
+    return size, None
+
+
+def _solutions_diverge(
+    levels: Sequence[Level], input: list[Value], max_executions: int
+) -> Divergence | None:
+    """Run every solution on an input, returning their outcomes if they differ.
+
+    Solutions may take different numbers of steps, so only their output and
+    error are compared.
+    """
+    outcomes = {
+        f"solution {index}": run_case(
+            Case(level.source, level.registers, input), "bytecode", max_executions
+        )
+        for index, level in enumerate(levels)
+    }
+    if len({(tuple(o.output), o.error) for o in outcomes.values()}) > 1:
+        first = levels[0]
+        return Divergence(Case(first.source, first.registers, input), outcomes)
+    return None
+
+
+def _run_batches(
+    task: Callable, args: tuple, cases: int, seed: int, workers: int | None
+) -> tuple[int, object]:
+    """Run batches of `task` until `cases` have run or one finds a divergence.
+
+    Results are taken in batch order, so the divergence found does not depend
+    on how the batches were scheduled. With `workers` of 1 the batches run in
+    this process.
+    """
+    sizes = [min(BATCH_SIZE, cases - start) for start in range(0, cases, BATCH_SIZE)]
+    calls = [(*args, seed, batch, size) for batch, size in enumerate(sizes)]
+    executor = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    try:
+        results = (
+            executor.map(task, *zip(*calls))
+            if executor
+            else (task(*call) for call in calls)
+        )
+        total = 0
+        for count, found in results:
+            total += count
+            if found is not None:
+                return total, found
+        return total, None
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+
+def fuzz_engines(
+    level: Level,
+    cases: int,
+    *,
+    engines: Sequence[str] = (*ENGINES, UNCHECKED),
+    domain: Domain | None = None,
+    seed: int = 0,
+    max_length: int = 12,
+    max_executions: int = 1000,
+    workers: int | None = None,
+) -> FuzzResult:
+    """Check every engine agrees on random programs using a level's registers.
+
+    Programs have up to `max_length` instructions and are stopped after
+    `max_executions`, which every engine must also agree on.
+    """
+    domain = Domain.infer(level) if domain is None else domain
+    engines = tuple(engines)
+    total, case = _run_batches(
+        _engine_batch,
+        (level, domain, engines, max_length, max_executions),
+        cases,
+        seed,
+        workers,
+    )
+    if case is None:
+        return FuzzResult(total, None)
+
+    def still_diverges(candidate: Case) -> bool:
+        return _diverges(candidate, engines, max_executions) is not None
+
+    case = shrink(case, still_diverges, domain)
+    return FuzzResult(total, _diverges(case, engines, max_executions))
+
+
+def fuzz_solutions(
+    levels: Sequence[Level],
+    cases: int,
+    *,
+    domain: Domain | None = None,
+    seed: int = 0,
+    max_executions: int = 100_000,
+    workers: int | None = None,
+) -> FuzzResult:
+    """Check solutions to the same level agree on random inputs.
+
+    The domain is inferred from the first level by default.
+    """
+    levels = tuple(levels)
+    domain = Domain.infer(levels[0]) if domain is None else domain
+    total, input = _run_batches(
+        _solution_batch, (levels, domain, max_executions), cases, seed, workers
+    )
+    if input is None:
+        return FuzzResult(total, None)
+
+    def still_diverges(candidate: Case) -> bool:
+        return _solutions_diverge(levels, candidate.input, max_executions) is not None
+
+    # Only the input is shrunk, as each solution's program and registers
+    # belong to it.
+    case = shrink(Case("", {}, input), still_diverges, domain)
+    return FuzzResult(total, _solutions_diverge(levels, case.input, max_executions))
@@ -0,0 +1,94 @@
+"""Tests for differential fuzzing of engines and solutions."""
+
+import os
+import random
+
+import xyz.human_resource_machine.bytecode as bytecode
+from xyz.human_resource_machine.engines import ENGINES
+from xyz.human_resource_machine.fuzzer import (
+    UNCHECKED,
+    fuzz_engines,
+    fuzz_solutions,
+    random_program,
+)
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parser import Parser
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+
+def load(filename: str) -> Level:
+    return Level.from_yaml(os.path.join(CHALLENGES, filename))
+
+
+def test_random_programs_parse():
+    """Test random programs are valid source using only the given registers."""
+    rng = random.Random(0)
+    for _ in range(100):
+        for instruction in Parser(random_program(rng, [0, "x"], 10)).parse():
+            assert getattr(instruction, "register", 0) in (0, "x")
+
+
+def test_engines_agree():
+    """Test the engines agree with the reference on random programs."""
+    for filename in ["level_29.yaml", "level_38_speed.yaml"]:
+        result = fuzz_engines(load(filename), 300, workers=1)
+
+        assert result.cases == 300
+        assert result.divergence is None
+
+
+def test_unchecked_engine_agrees_on_safe_programs():
+    """Test the unchecked engine is only compared on programs proven safe."""
+    result = fuzz_engines(
+        load("level_29.yaml"), 300, engines=["step", UNCHECKED], workers=1
+    )
+
+    assert result.cases == 300
+    assert result.divergence is None
+
+
+def test_shrinks_engine_divergence(monkeypatch):
+    """Test a divergence is found and shrunk to a small repro."""
+
+    def broken(interpreter):
+        output = bytecode.execute(interpreter)
+        if len(output) > 1:
+            output.pop()
+        return output
+
+    monkeypatch.setitem(ENGINES, "broken", broken)
+    result = fuzz_engines(
+        load("level_38_speed.yaml"), 1000, engines=["step", "broken"], workers=1
+    )
+
+    divergence = result.divergence
+    assert divergence is not None
+    assert len(divergence.case.source.splitlines()) <= 4
+    assert len(divergence.outcomes["step"].output) == 2
+    assert len(divergence.outcomes["broken"].output) == 1
+    assert "Program:" in divergence.format()
+
+
+def test_solutions_diverge():
+    """Test solutions disagreeing on some inputs are caught, with a minimal input."""
+    echo = Level("A:\nINBOX\nOUTBOX\nJUMP A", [-1, 2], {}, 1, 1)
+    positives = Level("A:\nINBOX\nJUMPN A\nOUTBOX\nJUMP A", [-1, 2], {}, 1, 1)
+
+    assert fuzz_solutions([echo, echo], 200, workers=1).divergence is None
+    divergence = fuzz_solutions([echo, positives], 200, workers=1).divergence
+    assert divergence is not None
+    [value] = divergence.case.input
+    assert value < 0
+
+
+def test_parallel_runs_match():
+    """Test running across processes finds the same divergence."""
+    echo = Level("A:\nINBOX\nOUTBOX\nJUMP A", [-1, 2], {}, 1, 1)
+    odd = Level("A:\nINBOX\nJUMPZ A\nOUTBOX\nJUMP A", [-1, 2], {}, 1, 1)
+
+    serial = fuzz_solutions([echo, odd], 2000, seed=3, workers=1)
+    parallel = fuzz_solutions([echo, odd], 2000, seed=3, workers=2)
+
+    assert serial == parallel
+    assert serial.divergence.case.input == [0]
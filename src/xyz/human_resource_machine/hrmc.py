@@ -0,0 +1,149 @@
+"""A binary file format for levels with precompiled programs.
+
+An `.hrmc` file holds a level with its program already parsed, laid out so
+that loading it maps the file into memory and reads the program's columns in
+place:
+
+    offset  size       contents
+    0       4          magic, b"HRMC"
+    4       2          format version
+    6       2          reserved, zero
+    8       4          number of instructions, n
+    12      4          length of the metadata, m
+    16      4 * n      operand ids, signed
+    16+4n   n          opcodes, signed
+    16+5n   n          addressing modes
+    16+6n   m          metadata, as UTF-8 JSON
+
+Integers are little-endian, and each column has the layout of the matching
+`PackedProgram` column. The metadata holds the program's symbol table and the
+rest of the level. Processes loading the same file share its pages, and the
+bytecode engine compiles the program without creating an instruction object
+for each.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+from xyz.human_resource_machine.interpreter import Instruction
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.packed import PackedProgram
+
+EXTENSION = ".hrmc"
+
+_MAGIC = b"HRMC"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHII")
+
+
+def _encode_symbol(symbol: object) -> object:
+    # Only `AssertRegisterIs` has a tuple operand, which JSON cannot hold.
+    if isinstance(symbol, tuple):
+        return {"pair": list(symbol)}
+    return symbol
+
+
+def _decode_symbol(symbol: object) -> object:
+    if isinstance(symbol, dict):
+        return tuple(symbol["pair"])
+    return symbol
+
+
+def dumps(level: Level, instructions: Sequence[Instruction]) -> bytes:
+    """Serialize a level and its parsed program."""
+    program = (
+        instructions
+        if isinstance(instructions, PackedProgram)
+        else PackedProgram(instructions)
+    )
+    operands = array("i", program.operands)
+    if sys.byteorder == "big":
+        operands.byteswap()
+    metadata = json.dumps(
+        {
+            "symbols": [_encode_symbol(symbol) for symbol in program.symbols],
+            "source": level.source,
+            "input": level.input,
+            # JSON object keys are strings, so keep register keys as values.
+            "registers": list(level.registers.items()),
+            "speed-challenge": level.speed_challenge,
+            "size-challenge": level.size_challenge,
+            "output": level.output,
+        },
+        separators=(",", ":"),
+    ).encode()
+    return b"".join(
+        [
+            _HEADER.pack(_MAGIC, _VERSION, 0, len(program), len(metadata)),
+            operands.tobytes(),
+            bytes(program.opcodes),
+            bytes(program.modes),
+            metadata,
+        ]
+    )
+
+
+def save(path: str, level: Level, instructions: Sequence[Instruction]) -> None:
+    """Write a level and its parsed program to an `.hrmc` file."""
+    with open(path, "wb") as file:
+        file.write(dumps(level, instructions))
+
+
+def loads(buffer: bytes | mmap.mmap) -> tuple[Level, PackedProgram]:
+    """Load a level and its program from a buffer, viewing its columns in place.
+
+    Raises `ValueError` if the buffer does not hold a valid `.hrmc` file.
+    """
+    if len(buffer) < _HEADER.size:
+        raise ValueError("Not an .hrmc file: too short")
+    magic, version, _, count, metadata_length = _HEADER.unpack_from(buffer)
+    if magic != _MAGIC:
+        raise ValueError("Not an .hrmc file: bad magic number")
+    if version != _VERSION:
+        raise ValueError(f"Unsupported .hrmc version {version}")
+    start = _HEADER.size
+    end = start + 6 * count
+    if len(buffer) != end + metadata_length:
+        raise ValueError("Truncated .hrmc file")
+
+    view = memoryview(buffer)
+    operands = view[start : start + 4 * count].cast("i")
+    if sys.byteorder == "big":
+        operands = array("i", operands)
+        operands.byteswap()
+    opcodes = view[start + 4 * count : start + 5 * count].cast("b")
+    modes = view[start + 5 * count : end].cast("b")
+    metadata = json.loads(bytes(view[end:]))
+
+    program = PackedProgram.from_columns(
+        opcodes,
+        operands,
+        modes,
+        tuple(_decode_symbol(symbol) for symbol in metadata["symbols"]),
+    )
+    level = Level(
+        source=metadata["source"],
+        input=metadata["input"],
+        registers=dict(map(tuple, metadata["registers"])),
+        speed_challenge=metadata["speed-challenge"],
+        size_challenge=metadata["size-challenge"],
+        output=metadata["output"],
+    )
+    return level, program
+
+
+def load(path: str) -> tuple[Level, PackedProgram]:
+    """Memory-map an `.hrmc` file and load the level and program in it."""
+    with open(path, "rb") as file:
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            buffer = file.read()
+    return loads(buffer)
@@ -0,0 +1,79 @@
+"""Tests for the binary .hrmc level format."""
+
+import os
+
+import pytest
+
+import xyz.human_resource_machine.hrmc as hrmc
+from xyz.human_resource_machine.engines import ENGINES
+from xyz.human_resource_machine.interpreter import (
+    AssertRegisterIs,
+    AssertValueIs,
+    Inbox,
+    Interpreter,
+)
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parser import Parser
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+FILENAMES = ["level_29.yaml", "level_38_size.yaml", "level_38_speed.yaml"]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("filename", FILENAMES)
+def test_round_trip(tmp_path, engine: str, filename: str):
+    """Test a saved level loads with the same program and runs the same."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, filename))
+    instructions = Parser(level.source).parse()
+    path = str(tmp_path / ("level" + hrmc.EXTENSION))
+    hrmc.save(path, level, instructions)
+
+    loaded, program = hrmc.load(path)
+
+    assert loaded == level
+    assert list(program) == instructions
+    kwargs = dict(registers=level.registers, input=level.input, engine=ENGINES[engine])
+    original = Interpreter(instructions=instructions, **kwargs)
+    mapped = Interpreter(instructions=program, **kwargs)
+    assert mapped.instruction_count == original.instruction_count
+    assert mapped.execute_program() == original.execute_program()
+    assert mapped.executions == original.executions
+
+
+def test_assertions_and_letters():
+    """Test operands of every type survive the metadata encoding."""
+    level = Level(
+        source="",
+        input=["A", 1],
+        registers={0: "B", "x": 2},
+        speed_challenge=1,
+        size_challenge=1,
+    )
+    instructions = [Inbox(), AssertValueIs("1"), AssertRegisterIs("x", 2)]
+
+    loaded, program = hrmc.loads(hrmc.dumps(level, instructions))
+
+    assert loaded == level
+    assert list(program) == instructions
+
+
+@pytest.mark.parametrize(
+    "corrupt",
+    [
+        lambda data: data[:10],
+        lambda data: b"XXXX" + data[4:],
+        lambda data: data[:4] + b"\x09" + data[5:],
+        lambda data: data[:-1],
+        # An opcode past the last instruction type.
+        lambda data: data[:20] + b"\x7f" + data[21:],
+    ],
+)
+def test_invalid(corrupt):
+    """Test damaged files are rejected rather than loaded."""
+    level = Level(
+        source="", input=[], registers={}, speed_challenge=1, size_challenge=1
+    )
+    data = hrmc.dumps(level, [Inbox()])
+
+    with pytest.raises(ValueError):
+        hrmc.loads(corrupt(data))
@@ -1,6 +1,9 @@
+import copy
 import logging
+import time
 import typing
 from dataclasses import dataclass
+from enum import StrEnum
 
 logger = logging.getLogger(__name__)
 
@@ -119,39 +122,312 @@ Instruction = typing.Union[
 ]
 
 
+def _layout(instructions: typing.Iterable[Instruction]) -> tuple[int, dict[str, int]]:
+    """Count the instructions that run and find the index of each label."""
+    count = 0
+    jumps: dict[str, int] = {}
+    for index, instruction in enumerate(instructions):
+        match instruction:
+            case Label():
+                jumps[instruction.label] = index
+            case Comment():
+                pass
+            case _:
+                count += 1
+    return count, jumps
+
+
+class Program(typing.Sequence[Instruction]):
+    """A program held in some other form than a list of instructions."""
+
+    __slots__ = ()
+
+    def layout(self) -> tuple[int, dict[str, int]]:
+        """Count the instructions that run and find the index of each label.
+
+        Subclasses may override this to avoid creating every instruction.
+        """
+        return _layout(self)
+
+
+class AbortReason(StrEnum):
+    """Enumeration of reasons for stopping a program before it completes."""
+
+    MAX_EXECUTIONS = "max-executions"
+    TIMEOUT = "timeout"
+    CYCLE = "cycle"
+
+
+class ExecutionAborted(RuntimeError):
+    """Raised when a program exceeds its limits or is stuck in a loop."""
+
+    def __init__(self, reason: AbortReason, executions: int):
+        super().__init__(f"Execution aborted ({reason}) after {executions} executions")
+        self.reason = reason
+        self.executions = executions
+
+    def __reduce__(self):
+        # Recreated from its own arguments when sent between processes.
+        return ExecutionAborted, (self.reason, self.executions)
+
+
+class Watchdog:
+    """Enforces the execution limits of a single run of a program.
+
+    Engines call `check` before executing each jump instruction, as only jumps
+    can make a program run indefinitely. A program is stuck in a loop if the
+    whole machine state is the same at two checks, which is detected with
+    Brent's algorithm by comparing against a state saved at doubling intervals.
+    """
+
+    # How many checks pass between reads of the clock.
+    _CLOCK_INTERVAL = 256
+
+    def __init__(
+        self,
+        *,
+        max_executions: int | None = None,
+        timeout: float | None = None,
+        detect_cycles: bool = False,
+    ):
+        self.max_executions = max_executions
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.detect_cycles = detect_cycles
+        self._checks = 0
+        self._saved: tuple | None = None
+        self._since_saved = 0
+        self._interval = 1
+
+    def check(
+        self,
+        pc: int,
+        value: Value | None,
+        input_index: int,
+        registers: dict[Value, Value] | list[object],
+        executions: int,
+    ) -> None:
+        """Raise `ExecutionAborted` if the program should be stopped.
+
+        `registers` may be any copyable and comparable register state, such
+        as the slots of a register file.
+        """
+        self._checks += 1
+        if self.max_executions is not None and executions >= self.max_executions:
+            raise ExecutionAborted(AbortReason.MAX_EXECUTIONS, executions)
+        if (
+            self.deadline is not None
+            and self._checks % self._CLOCK_INTERVAL == 0
+            and time.monotonic() > self.deadline
+        ):
+            raise ExecutionAborted(AbortReason.TIMEOUT, executions)
+        if not self.detect_cycles:
+            return
+
+        saved = self._saved
+        if (
+            saved is not None
+            and saved[0] == pc
+            and saved[1] == value
+            and saved[2] == input_index
+            and saved[3] == registers
+        ):
+            raise ExecutionAborted(AbortReason.CYCLE, executions)
+        self._since_saved += 1
+        if self._since_saved >= self._interval:
+            self._saved = (pc, value, input_index, registers.copy())
+            self._interval *= 2
+            self._since_saved = 0
+
+
+@dataclass(frozen=True, slots=True)
+class TraceEvent:
+    """A record of one executed instruction, passed to a tracer."""
+
+    # Index into `Interpreter.instructions`.
+    index: int
+    instruction: Instruction
+    # The value in hand after the instruction.
+    value: Value | None
+    # The register the instruction wrote to, if any.
+    register: Value | None
+
+
+Tracer = typing.Callable[[TraceEvent], None]
+
+
+def log_event(event: TraceEvent) -> None:
+    """A tracer logging every executed instruction at debug level."""
+    if event.register is None:
+        logger.debug(
+            "Instruction %d: %s hand=%s", event.index, event.instruction, event.value
+        )
+    else:
+        logger.debug(
+            "Instruction %d: %s hand=%s register %s=%s",
+            event.index,
+            event.instruction,
+            event.value,
+            event.register,
+            event.value,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Snapshot:
+    """The state of an interpreter part way through running its program."""
+
+    instruction_index: int
+    value: Value | None
+    input_index: int
+    execution_count: int
+    # Shared with the interpreter, which copies them before changing them.
+    registers: dict[Value, Value]
+    # Only a sequence can be read again from `input_index` on restoring.
+    input: typing.Iterable[Value]
+    # Output only ever grows, so the first `output_length` items stay valid.
+    output: list[Value]
+    output_length: int
+
+
+# Marks the end of the inbox when reading from it.
+_NO_INPUT = object()
+
+# An engine runs an interpreter's program to completion from its current state,
+# leaving the interpreter in the same state the reference `step` loop would,
+# and returns the interpreter's own output list.
+Engine = typing.Callable[["Interpreter"], list[Value]]
+
+
 class Interpreter:
     def __init__(
         self,
         *,
         registers: dict[Value, Value] | None = None,
         instructions: list[Instruction] | None = None,
-        input: list[Value] | None = None,
+        input: typing.Iterable[Value] | None = None,
+        outbox: typing.Callable[[Value], object] | None = None,
+        engine: Engine | None = None,
+        max_executions: int | None = None,
+        timeout: float | None = None,
+        detect_cycles: bool = False,
+        tracer: Tracer | None = None,
     ):
+        self.engine = engine
+        self.tracer = tracer
+        self.max_executions = max_executions
+        self.timeout = timeout
+        self.detect_cycles = detect_cycles
+        self._watchdog: Watchdog | None = None
         self.instructions = [] if instructions is None else instructions.copy()
         self.registers = {} if registers is None else registers.copy()
+        # Whether `registers` is shared with a snapshot and must be copied
+        # before it is changed.
+        self._registers_shared = False
         self.instruction_count: int = 0
         self._value: int | None = None
-        self._input = [] if input is None else input
+        self._input: typing.Iterable[Value] = [] if input is None else input
+        # Iterates over the rest of the input, shared by every engine.
+        self._reader: typing.Iterator[Value] | None = None
         self._input_index: int = 0
+        # Called with each value sent to the outbox, in place of collecting
+        # them in `output`.
+        self.outbox = outbox
         self._execution_count: int = 0
         self._instruction_index: int = 0
         self._output: list[Value] = []
 
-        self.instruction_count = 0
-        for instruction in self.instructions:
-            match instruction:
-                case Label() | Comment():
-                    pass
-                case _:
-                    self.instruction_count += 1
+        self._jumps: dict[str, int]
+        if isinstance(self.instructions, Program):
+            self.instruction_count, self._jumps = self.instructions.layout()
+        else:
+            self.instruction_count, self._jumps = _layout(self.instructions)
 
-        self._jumps: dict[str, int] = {}
-        for index, instruction in enumerate(self.instructions):
-            match instruction:
-                case Label():
-                    self._jumps[instruction.label] = index
-                case _:
-                    pass
+    def reset(
+        self,
+        *,
+        registers: dict[Value, Value] | None = None,
+        input: typing.Iterable[Value] | None = None,
+    ) -> None:
+        """Reset the machine to run the same program again on a new input."""
+        self.registers = {} if registers is None else registers.copy()
+        self._registers_shared = False
+        self._value = None
+        self._input = [] if input is None else input
+        self._reader = None
+        self._input_index = 0
+        self._execution_count = 0
+        self._instruction_index = 0
+        self._output = []
+
+    def snapshot(self) -> Snapshot:
+        """Capture the current state without copying registers or output."""
+        self._registers_shared = True
+        return Snapshot(
+            instruction_index=self._instruction_index,
+            value=self._value,
+            input_index=self._input_index,
+            execution_count=self._execution_count,
+            registers=self.registers,
+            input=self._input,
+            output=self._output,
+            output_length=len(self._output),
+        )
+
+    def restore(self, snapshot: Snapshot) -> None:
+        """Return to the state captured by `snapshot`, which can be reused.
+
+        Registers stay shared with the snapshot until the program next runs,
+        so they should not be changed directly before then.
+        """
+        self.registers = snapshot.registers
+        self._registers_shared = True
+        self._instruction_index = snapshot.instruction_index
+        self._value = snapshot.value
+        self._input = snapshot.input
+        self._reader = None
+        self._input_index = snapshot.input_index
+        self._execution_count = snapshot.execution_count
+        self._output = snapshot.output[: snapshot.output_length]
+
+    def fork(self, snapshot: Snapshot | None = None) -> "Interpreter":
+        """Return a new interpreter for the same program, from `snapshot`.
+
+        Without a snapshot the new interpreter continues from the current
+        state. Either interpreter may then run without affecting the other.
+        """
+        forked = copy.copy(self)
+        forked.restore(self.snapshot() if snapshot is None else snapshot)
+        forked._own_registers()
+        return forked
+
+    def _inbox(self) -> typing.Iterator[Value]:
+        """Return an iterator over the input not yet read by INBOX.
+
+        Sequences are read by index from `_input_index`, so they can be read
+        again after `reset` or `restore`; any other iterable is read lazily,
+        once. Engines read from the same iterator and keep `_input_index`
+        counting the values read.
+        """
+        if self._reader is None:
+            if isinstance(self._input, typing.Sequence):
+                self._reader = map(
+                    self._input.__getitem__,
+                    range(self._input_index, len(self._input)),
+                )
+            else:
+                self._reader = iter(self._input)
+        return self._reader
+
+    def _emitter(self) -> typing.Callable[[Value], object]:
+        """Return the function OUTBOX passes each value to."""
+        if self.outbox is not None:
+            return self.outbox
+        return self._output.append
+
+    def _own_registers(self) -> None:
+        """Copy registers shared with a snapshot before they are changed."""
+        self.registers = self.registers.copy()
+        self._registers_shared = False
 
     def _read_register(self, instruction: _UsesRegister) -> Value:
         """Read the value from the register, handling indirect addressing."""
@@ -166,30 +442,125 @@ class Interpreter:
         else:
             self.registers[instruction.register] = self._value
 
-    def execute_program(self) -> list[Value]:
-        """Execute all the instructions in the program until completion."""
+    def execute_program(self, watchdog: Watchdog | None = None) -> list[Value]:
+        """Execute all the instructions in the program until completion.
+
+        Raises `ExecutionAborted` if the program exceeds `max_executions` or
+        `timeout` seconds, or, with `detect_cycles`, can never terminate.
+        The limits are only checked before each jump, so a run may go past
+        `max_executions` by the instructions up to its next jump, and a
+        program without jumps always runs to completion. A `watchdog` given
+        enforces its limits in place of these, and can be passed to each run
+        of a program stopped and resumed in parts, keeping its clock and
+        cycle detection across them.
+
+        With a `tracer`, the program runs on a separate loop that passes it an
+        event for every executed instruction, in place of any `engine`.
+        Without one, nothing is traced and no tracing cost is paid.
+        """
+        # Registers are copied here once, so the loops below step with
+        # `_step` and do not check again.
+        if self._registers_shared:
+            self._own_registers()
+        self._watchdog = watchdog
+        if watchdog is None and (
+            self.max_executions is not None
+            or self.timeout is not None
+            or self.detect_cycles
+        ):
+            self._watchdog = Watchdog(
+                max_executions=self.max_executions,
+                timeout=self.timeout,
+                detect_cycles=self.detect_cycles,
+            )
+        if self.tracer is not None:
+            self._execute_traced(self.tracer, self._watchdog)
+        elif self.engine is not None:
+            self.engine(self)
+        elif self._watchdog is not None:
+            self._execute_watched(self._watchdog)
+        else:
+            while self._instruction_index < len(self.instructions):
+                if self._step() is not None:
+                    break
+        # Engines and the loops return the output list itself, which a later
+        # step or run would change, so it is copied once here.
+        return list(self._output)
+
+    def _execute_watched(self, watchdog: Watchdog) -> list[Value]:
+        """Execute the program, checking its limits before every jump."""
         while self._instruction_index < len(self.instructions):
-            return_value = self.step()
+            instruction = self.instructions[self._instruction_index]
+            if isinstance(instruction, Jump | JumpIfZero | JumpIfNegative):
+                watchdog.check(
+                    self._instruction_index,
+                    self._value,
+                    self._input_index,
+                    self.registers,
+                    self._execution_count,
+                )
+            return_value = self._step()
             if return_value is not None:
                 return return_value
-        return self.output
+        return self._output
+
+    def _execute_traced(self, tracer: Tracer, watchdog: Watchdog | None) -> list[Value]:
+        """Execute the program, reporting each executed instruction to `tracer`."""
+        while self._instruction_index < len(self.instructions):
+            index = self._instruction_index
+            instruction = self.instructions[index]
+            if watchdog is not None and isinstance(
+                instruction, Jump | JumpIfZero | JumpIfNegative
+            ):
+                watchdog.check(
+                    index,
+                    self._value,
+                    self._input_index,
+                    self.registers,
+                    self._execution_count,
+                )
+            register = None
+            if isinstance(instruction, CopyTo | BumpPlus | BumpMinus):
+                register = instruction.register
+                if instruction.indirect:
+                    register = self.registers.get(register)
+            executions = self._execution_count
+            return_value = self._step()
+            if self._execution_count != executions:
+                tracer(TraceEvent(index, instruction, self._value, register))
+            if return_value is not None:
+                return return_value
+        return self._output
 
     def step(self) -> list[Value] | None:
-        """Execute the next instruction in the program."""
+        """Execute the next instruction in the program.
+
+        Returns the output once there is no more input, as the interpreter's
+        own list rather than a copy, and `None` otherwise.
+        """
+        if self._registers_shared:
+            self._own_registers()
+        return self._step()
+
+    def _step(self) -> list[Value] | None:
+        """Execute the next instruction, once registers are not shared."""
         instruction = self.instructions[self._instruction_index]
-        logger.debug("Instruction %d: %s", self._instruction_index, instruction)
         match instruction:
             case Inbox():
-                if self._input_index >= len(self._input):
-                    return self.output  # No more input available.
-                self._value = self._input[self._input_index]
+                value = next(self._inbox(), _NO_INPUT)
+                if value is _NO_INPUT:
+                    return self._output  # No more input available.
+                self._value = value
                 self._input_index += 1
                 self._instruction_index += 1
                 self._execution_count += 1
             case Outbox():
                 if self._value is None:
                     raise ValueError("No value to output")
-                self._output.append(self._value)
+                if self.outbox is None:
+                    self._output.append(self._value)
+                else:
+                    self.outbox(self._value)
                 self._value = None
                 self._instruction_index += 1
                 self._execution_count += 1
@@ -277,11 +648,17 @@ class Interpreter:
                     )
                 self._instruction_index += 1
 
-    def to_str(self) -> str:
+    def to_str(self, annotations: dict[int, str] | None = None) -> str:
+        """Return a numbered listing of the program.
+
+        `annotations`, keyed by index into `instructions`, are added in a
+        column after the instructions they describe.
+        """
         lines: list[str] = []
+        notes: list[str] = []
         index: int = 1
 
-        for instruction in self.instructions:
+        for position, instruction in enumerate(self.instructions):
             match instruction:
                 case AssertValueIs() | AssertRegisterIs():
                     continue
@@ -292,6 +669,13 @@ class Interpreter:
                 case _ as instruction:
                     lines.append(f"{index}: {instruction}")
                     index += 1
+            notes.append(annotations.get(position, "") if annotations else "")
+
+        if annotations:
+            width = max(len(line) for line in lines)
+            lines = [
+                f"{line:<{width}}  {note}".rstrip() for line, note in zip(lines, notes)
+            ]
         return "\n".join(lines)
 
     @property
@@ -303,6 +687,7 @@ class Interpreter:
 
     @property
     def output(self) -> list[Value]:
+        """A copy of the values sent to the outbox, unless `outbox` took them."""
         return self._output.copy()
 
     @property
@@ -1,19 +1,27 @@
 """Unit tests for the Human Resource Machine interpreter."""
 
+import pickle
+
 import pytest
 
+from xyz.human_resource_machine.engines import ENGINES
 from xyz.human_resource_machine.interpreter import (
+    AbortReason,
     Add,
     BumpMinus,
     BumpPlus,
     CopyFrom,
     CopyTo,
+    ExecutionAborted,
     Inbox,
     Interpreter,
     Jump,
+    JumpIfZero,
     Label,
     Outbox,
     Subtract,
+    TraceEvent,
+    log_event,
 )
 
 
@@ -232,3 +240,231 @@ def test_subtract_indirect():
     interpreter.execute_program()
 
     assert interpreter.value == 2
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_detect_cycles(engine):
+    """Test a program looping without changing state is stopped."""
+    instructions = [Inbox(), Label("LOOP"), CopyTo("A"), Jump("LOOP")]
+    interpreter = Interpreter(
+        instructions=instructions,
+        input=[1],
+        engine=ENGINES[engine],
+        detect_cycles=True,
+    )
+
+    with pytest.raises(ExecutionAborted) as error:
+        interpreter.execute_program()
+
+    assert error.value.reason == AbortReason.CYCLE
+    assert error.value.executions == interpreter.executions == 4
+    assert interpreter.instruction_index == 3
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_max_executions(engine):
+    """Test a program exceeding its execution budget is stopped."""
+    instructions = [Label("LOOP"), BumpPlus("A"), Jump("LOOP")]
+    interpreter = Interpreter(
+        instructions=instructions,
+        registers={"A": 0},
+        engine=ENGINES[engine],
+        max_executions=100,
+        detect_cycles=True,
+    )
+
+    with pytest.raises(ExecutionAborted) as error:
+        interpreter.execute_program()
+
+    assert error.value.reason == AbortReason.MAX_EXECUTIONS
+    assert interpreter.executions == 101
+    assert interpreter.register("A") == 51
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_max_executions_checked_at_jumps(engine):
+    """Test the execution budget is only enforced before a jump."""
+    instructions = [Inbox(), Outbox(), Inbox(), Outbox(), Jump("END"), Label("END")]
+    interpreter = Interpreter(
+        instructions=instructions,
+        input=[1, 2],
+        engine=ENGINES[engine],
+        max_executions=2,
+    )
+
+    with pytest.raises(ExecutionAborted):
+        interpreter.execute_program()
+
+    # Stopped at the jump, well past the budget of 2.
+    assert interpreter.executions == 4
+    assert interpreter.output == [1, 2]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_timeout(engine):
+    """Test a program running past its deadline is stopped."""
+    instructions = [Label("LOOP"), BumpPlus("A"), JumpIfZero("LOOP"), Jump("LOOP")]
+    interpreter = Interpreter(
+        instructions=instructions,
+        registers={"A": 0},
+        engine=ENGINES[engine],
+        timeout=0.01,
+    )
+
+    with pytest.raises(ExecutionAborted) as error:
+        interpreter.execute_program()
+
+    assert error.value.reason == AbortReason.TIMEOUT
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_limits_allow_terminating_programs(engine):
+    """Test a program consuming its inbox in a loop is not stopped."""
+    instructions = [Label("BEGIN"), Inbox(), Outbox(), Jump("BEGIN")]
+    interpreter = Interpreter(
+        instructions=instructions,
+        input=[1, 1, 1],
+        engine=ENGINES[engine],
+        max_executions=10,
+        detect_cycles=True,
+    )
+
+    assert interpreter.execute_program() == [1, 1, 1]
+    assert interpreter.executions == 9
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_execute_program_returns_a_copy(engine):
+    """Test the output returned is not the interpreter's own list."""
+    interpreter = Interpreter(
+        instructions=[Inbox(), Outbox()], input=[1], engine=ENGINES[engine]
+    )
+
+    output = interpreter.execute_program()
+    output.append(2)
+
+    assert interpreter.output == [1]
+
+
+def test_tracer():
+    """Test a tracer receives an event for each executed instruction."""
+    instructions = [Label("BEGIN"), Inbox(), CopyTo("P", indirect=True), Jump("BEGIN")]
+    events: list[TraceEvent] = []
+    interpreter = Interpreter(
+        instructions=instructions,
+        registers={"P": "A"},
+        input=[7],
+        engine=ENGINES["bytecode"],
+        tracer=events.append,
+    )
+
+    assert interpreter.execute_program() == []
+    assert events == [
+        TraceEvent(1, Inbox(), 7, None),
+        TraceEvent(2, CopyTo("P", indirect=True), 7, "A"),
+        TraceEvent(3, Jump("BEGIN"), 7, None),
+    ]
+    assert interpreter.register("A") == 7
+
+
+def test_tracer_respects_limits():
+    """Test the watchdog stops a traced program."""
+    interpreter = Interpreter(
+        instructions=[Label("LOOP"), Jump("LOOP")],
+        max_executions=5,
+        tracer=lambda event: None,
+    )
+
+    with pytest.raises(ExecutionAborted):
+        interpreter.execute_program()
+    assert interpreter.executions == 5
+
+
+def test_log_event(caplog):
+    """Test the logging tracer logs instructions at debug level."""
+    interpreter = Interpreter(
+        instructions=[Inbox(), BumpPlus("A")],
+        registers={"A": 1},
+        input=[3],
+        tracer=log_event,
+    )
+
+    with caplog.at_level("DEBUG"):
+        interpreter.execute_program()
+
+    assert caplog.messages == [
+        "Instruction 0: Inbox() hand=3",
+        "Instruction 1: BumpPlus(register='A', indirect=False) hand=2 register A=2",
+    ]
+
+
+def test_no_logging_without_tracer(caplog):
+    """Test running without a tracer logs nothing, even at debug level."""
+    interpreter = Interpreter(instructions=[Inbox(), Outbox()], input=[1])
+
+    with caplog.at_level("DEBUG"):
+        interpreter.execute_program()
+
+    assert caplog.messages == []
+
+
+def test_snapshot_and_restore():
+    """Test restoring a snapshot returns to its state and can be repeated."""
+    instructions = [Label("BEGIN"), Inbox(), BumpPlus("A"), Outbox(), Jump("BEGIN")]
+    interpreter = Interpreter(
+        instructions=instructions, registers={"A": 0}, input=[5, 6, 7]
+    )
+    for _ in range(5):
+        interpreter.step()
+    snapshot = interpreter.snapshot()
+
+    assert interpreter.execute_program() == [1, 2, 3]
+    for _ in range(2):
+        interpreter.restore(snapshot)
+        assert interpreter.output == [1]
+        assert interpreter.register("A") == 1
+        assert interpreter.executions == 4
+        assert interpreter.execute_program() == [1, 2, 3]
+        assert interpreter.register("A") == 3
+    assert snapshot.registers == {"A": 1}
+
+
+def test_step_after_restore():
+    """Test stepping after a restore leaves the snapshot's registers alone."""
+    instructions = [BumpPlus("A"), BumpPlus("A")]
+    interpreter = Interpreter(instructions=instructions, registers={"A": 0})
+    snapshot = interpreter.snapshot()
+
+    interpreter.step()
+    interpreter.restore(snapshot)
+    interpreter.step()
+
+    assert interpreter.register("A") == 1
+    assert snapshot.registers == {"A": 0}
+
+
+def test_fork():
+    """Test forks run independently of each other and of the original."""
+    instructions = [Inbox(), CopyTo("X"), Inbox(), Add("X"), Outbox()]
+    interpreter = Interpreter(instructions=instructions, input=[1, 2])
+    interpreter.step()
+    interpreter.step()
+    snapshot = interpreter.snapshot()
+
+    fork = interpreter.fork()
+    fork.registers["X"] = 10
+    other = interpreter.fork(snapshot)
+
+    assert fork.execute_program() == [12]
+    assert other.execute_program() == [3]
+    assert interpreter.execute_program() == [3]
+    assert snapshot.registers == {"X": 1}
+    assert other.executions == fork.executions == 5
+
+
+def test_execution_aborted_pickles():
+    """Test aborts keep their details when sent between processes."""
+    error = pickle.loads(pickle.dumps(ExecutionAborted(AbortReason.CYCLE, 7)))
+
+    assert (error.reason, error.executions) == (AbortReason.CYCLE, 7)
+    assert str(error) == "Execution aborted (cycle) after 7 executions"
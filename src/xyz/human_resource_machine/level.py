@@ -0,0 +1,100 @@
+"""Levels of the Human Resource Machine game, loaded from YAML files.
+
+A level's `Domain` is the values its inbox may hold, inferred from its input.
+"""
+
+from __future__ import annotations
+
+import random
+import string
+from dataclasses import dataclass
+
+from xyz.human_resource_machine.interpreter import Value, int_or_str
+
+
+def _values(text: str) -> list[Value]:
+    """Parse a block of newline separated values."""
+    return [int_or_str(x) for x in text.splitlines() if x]
+
+
+@dataclass
+class Level:
+    """A class representing a level in the Human Resource Machine game."""
+
+    source: str
+    input: list[Value]
+    registers: dict[Value, Value]
+    speed_challenge: int
+    size_challenge: int
+    # The output the program is expected to produce, if the level specifies it.
+    output: list[Value] | None = None
+
+    @staticmethod
+    def from_yaml(path: str) -> Level:
+        """Load a level from a YAML file."""
+        # Imported here, as importing it takes longer than running most levels.
+        import yaml
+
+        # The LibYAML based loader is much faster, where it is available.
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        with open(path) as i:
+            data = yaml.load(i, Loader=loader)
+
+        return Level(
+            source=data["source"],
+            input=_values(data.get("input", "")),
+            registers={
+                int_or_str(k): int_or_str(v) for k, v in data["registers"].items()
+            },
+            speed_challenge=data["speed-challenge"],
+            size_challenge=data["size-challenge"],
+            output=_values(data["output"]) if "output" in data else None,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Domain:
+    """The values a level's inbox may hold.
+
+    Values are drawn from `choices` if it is given, and otherwise from the
+    integers `low` to `high`, and from the letters if `letters` is set.
+    """
+
+    low: int = -999
+    high: int = 999
+    letters: bool = False
+    choices: tuple[Value, ...] | None = None
+
+    @staticmethod
+    def infer(level: Level) -> Domain:
+        """Guess the domain of a level's inbox from its input and registers.
+
+        An input of only tile numbers holding values is taken to be
+        addresses, as in the "Storage floor" level. Otherwise numbers range
+        from 0, or -999 if any is negative, to 999, and letters are included
+        if the input has any.
+        """
+        values = level.input
+        numbers = [value for value in values if isinstance(value, int)]
+        tiles = tuple(key for key in level.registers if isinstance(key, int))
+        if values and len(numbers) == len(values) and set(numbers) <= set(tiles):
+            return Domain(choices=tiles)
+        return Domain(
+            low=-999 if any(number < 0 for number in numbers) else 0,
+            high=999,
+            letters=len(numbers) < len(values),
+        )
+
+    def sample(self, rng: random.Random) -> Value:
+        """Draw one value."""
+        if self.choices is not None:
+            return rng.choice(self.choices)
+        if self.letters and rng.random() < 0.5:
+            return rng.choice(string.ascii_uppercase)
+        return rng.randint(self.low, self.high)
+
+    def simplest(self) -> Value:
+        """Return the value shrinking moves others towards."""
+        if self.choices is not None:
+            return self.choices[0]
+        return min(max(0, self.low), self.high)
@@ -0,0 +1,22 @@
+"""Tests for loading levels and the values their inboxes hold."""
+
+import os
+
+from xyz.human_resource_machine.level import Domain, Level
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+
+def load(filename: str) -> Level:
+    return Level.from_yaml(os.path.join(CHALLENGES, filename))
+
+
+def test_infer_domain():
+    """Test inboxes are drawn from values like the level's own input."""
+    assert Domain.infer(load("level_29.yaml")).choices == (
+        *range(10),
+        12,
+    )
+    assert Domain.infer(load("level_38_speed.yaml")) == Domain(low=0, high=999)
+    letters = Level("", [-3, "A"], {}, 1, 1)
+    assert Domain.infer(letters) == Domain(low=-999, high=999, letters=True)
@@ -0,0 +1,41 @@
+"""Tests for the command line interface."""
+
+import os
+import subprocess
+import sys
+
+SRC = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Modules only needed by some options, which should be imported on use.
+LAZY_MODULES = [
+    "yaml",
+    "multiprocessing",
+    "concurrent.futures",
+    "tempfile",
+    "xyz.human_resource_machine.runner",
+    "xyz.human_resource_machine.search",
+    "xyz.human_resource_machine.hrmc",
+]
+
+
+def _import_main() -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=SRC)
+    return subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, xyz.human_resource_machine.__main__; "
+            "print(' '.join(sys.modules))",
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_lazy_imports():
+    """Test modules needed only by some options are not imported up front."""
+    modules = set(_import_main().stdout.split())
+
+    assert [module for module in LAZY_MODULES if module in modules] == []
@@ -0,0 +1,217 @@
+"""A peephole optimizer for Human Resource Machine programs.
+
+Each pass rewrites a parsed program without changing the output it produces
+for any input, while never increasing the number of executions or the number
+of instructions. Passes are repeated until none of them changes the program.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from xyz.human_resource_machine.interpreter import (
+    Add,
+    AssertRegisterIs,
+    BumpMinus,
+    BumpPlus,
+    Comment,
+    CopyFrom,
+    CopyTo,
+    Instruction,
+    Jump,
+    JumpIfNegative,
+    JumpIfZero,
+    Label,
+    Subtract,
+)
+
+_JUMPS = (Jump, JumpIfZero, JumpIfNegative)
+
+
+def _is_executable(instruction: Instruction) -> bool:
+    return not isinstance(instruction, Label | Comment)
+
+
+def _labels(instructions: list[Instruction]) -> dict[str, int]:
+    """Map each label to its index; later definitions win, as when running."""
+    return {
+        instruction.label: index
+        for index, instruction in enumerate(instructions)
+        if isinstance(instruction, Label)
+    }
+
+
+def _next_executable(instructions: list[Instruction], index: int) -> int:
+    """Return the index of the first executable instruction at or after `index`."""
+    while index < len(instructions) and not _is_executable(instructions[index]):
+        index += 1
+    return index
+
+
+def _next_in_block(instructions: list[Instruction], index: int) -> int | None:
+    """Return the executable instruction after `index` if no label precedes it.
+
+    Only comments may separate the two instructions, so the second one can
+    only be reached by executing the first.
+    """
+    index += 1
+    while index < len(instructions) and isinstance(instructions[index], Comment):
+        index += 1
+    if index < len(instructions) and not isinstance(instructions[index], Label):
+        return index
+    return None
+
+
+def remove_redundant_copies(instructions: list[Instruction]) -> list[Instruction]:
+    """Remove `COPYFROM x` straight after `COPYTO x`, as x is already in hand."""
+    removed: set[int] = set()
+    for index, instruction in enumerate(instructions):
+        # Indirect copies are kept, as the pointer may point at itself.
+        if not isinstance(instruction, CopyTo) or instruction.indirect:
+            continue
+        following = _next_in_block(instructions, index)
+        if following is not None and instructions[following] == CopyFrom(
+            instruction.register
+        ):
+            removed.add(following)
+    return [x for index, x in enumerate(instructions) if index not in removed]
+
+
+def thread_jumps(instructions: list[Instruction]) -> list[Instruction]:
+    """Retarget jumps to labels that are immediately followed by a `JUMP`."""
+    labels = _labels(instructions)
+
+    def final_target(label: str) -> str:
+        seen = {label}
+        while label in labels:
+            target = _next_executable(instructions, labels[label])
+            if target == len(instructions):
+                break
+            instruction = instructions[target]
+            if not isinstance(instruction, Jump) or instruction.label in seen:
+                break
+            label = instruction.label
+            seen.add(label)
+        return label
+
+    return [
+        type(instruction)(final_target(instruction.label))
+        if isinstance(instruction, _JUMPS)
+        else instruction
+        for instruction in instructions
+    ]
+
+
+def remove_unreachable(instructions: list[Instruction]) -> list[Instruction]:
+    """Remove instructions that no path from the start of the program reaches.
+
+    Labels and comments are kept, as they never count as instructions.
+    """
+    labels = _labels(instructions)
+    reachable: set[int] = set()
+    pending = [0]
+    while pending:
+        index = pending.pop()
+        if index >= len(instructions) or index in reachable:
+            continue
+        reachable.add(index)
+        instruction = instructions[index]
+        if isinstance(instruction, _JUMPS) and instruction.label in labels:
+            pending.append(labels[instruction.label])
+        if not isinstance(instruction, Jump):
+            pending.append(index + 1)
+
+    return [
+        instruction
+        for index, instruction in enumerate(instructions)
+        if index in reachable or not _is_executable(instruction)
+    ]
+
+
+def remove_dead_stores(instructions: list[Instruction]) -> list[Instruction]:
+    """Remove `COPYTO x` where no instruction ever reads register x.
+
+    Any indirect read could read any register, so programs using one are left
+    unchanged.
+    """
+    read: set[object] = set()
+    for instruction in instructions:
+        match instruction:
+            case CopyFrom() | Add() | Subtract() | BumpPlus() | BumpMinus() if (
+                instruction.indirect
+            ):
+                return instructions
+            case CopyFrom() | Add() | Subtract() | BumpPlus() | BumpMinus():
+                read.add(instruction.register)
+            case CopyTo(indirect=True):
+                # The register holding the pointer is still read.
+                read.add(instruction.register)
+            case AssertRegisterIs():
+                read.add(instruction.register)
+
+    return [
+        instruction
+        for instruction in instructions
+        if not (
+            isinstance(instruction, CopyTo)
+            and not instruction.indirect
+            and instruction.register not in read
+        )
+    ]
+
+
+def fold_jumps(instructions: list[Instruction]) -> list[Instruction]:
+    """Remove jumps that cannot change which instruction runs next.
+
+    These are `JUMP` or `JUMPZ` to the label straight after them, a `JUMPZ`
+    followed by a `JUMP` to the same label, and a conditional jump repeating
+    the one before it. `JUMPN` to the next instruction is kept, as it still
+    fails when holding a letter.
+    """
+    labels = _labels(instructions)
+    removed: set[int] = set()
+    for index, instruction in enumerate(instructions):
+        if not isinstance(instruction, _JUMPS):
+            continue
+        target = labels.get(instruction.label)
+        following = _next_executable(instructions, index + 1)
+        if (
+            isinstance(instruction, Jump | JumpIfZero)
+            and target is not None
+            and index < target <= following
+        ):
+            removed.add(index)
+            continue
+
+        next_in_block = _next_in_block(instructions, index)
+        if next_in_block is None or next_in_block in removed:
+            continue
+        after = instructions[next_in_block]
+        if isinstance(instruction, JumpIfZero) and after == Jump(instruction.label):
+            removed.add(index)
+        elif isinstance(instruction, JumpIfZero | JumpIfNegative) and (
+            after == instruction
+        ):
+            removed.add(next_in_block)
+
+    return [x for index, x in enumerate(instructions) if index not in removed]
+
+
+PASSES: list[Callable[[list[Instruction]], list[Instruction]]] = [
+    remove_redundant_copies,
+    thread_jumps,
+    fold_jumps,
+    remove_unreachable,
+    remove_dead_stores,
+]
+
+
+def optimize(instructions: list[Instruction]) -> list[Instruction]:
+    """Apply every optimization pass until the program stops changing."""
+    while True:
+        optimized = instructions
+        for optimization in PASSES:
+            optimized = optimization(optimized)
+        if optimized == instructions:
+            return optimized
+        instructions = optimized
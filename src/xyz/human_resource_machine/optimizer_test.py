@@ -0,0 +1,191 @@
+"""Tests for the Human Resource Machine peephole optimizer."""
+
+import os
+
+import pytest
+
+from xyz.human_resource_machine.interpreter import Interpreter
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.optimizer import (
+    fold_jumps,
+    optimize,
+    remove_dead_stores,
+    remove_redundant_copies,
+    remove_unreachable,
+    thread_jumps,
+)
+from xyz.human_resource_machine.parser import Parser
+from xyz.human_resource_machine.testing import parse
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+
+def test_remove_redundant_copies():
+    """Test a copy back from the register just written is removed."""
+    instructions = parse("""\
+    INBOX
+    COPYTO A
+    # Comments do not separate instructions.
+    COPYFROM A
+    COPYTO [B]
+    COPYFROM [B]
+    """)
+
+    assert remove_redundant_copies(instructions) == parse("""\
+    INBOX
+    COPYTO A
+    # Comments do not separate instructions.
+    COPYTO [B]
+    COPYFROM [B]
+    """)
+
+
+def test_copy_after_label_is_kept():
+    """Test a copy that can be reached by a jump is not removed."""
+    instructions = parse("""\
+    COPYTO A
+    LOOP:
+    COPYFROM A
+    JUMP LOOP
+    """)
+
+    assert remove_redundant_copies(instructions) == instructions
+
+
+def test_thread_jumps():
+    """Test jumps to jumps are retargeted to the final destination."""
+    instructions = parse("""\
+    JUMPZ FIRST
+    FIRST:
+    # Comment
+    JUMP SECOND
+    SECOND:
+    JUMP THIRD
+    THIRD:
+    OUTBOX
+    """)
+
+    assert thread_jumps(instructions) == parse("""\
+    JUMPZ THIRD
+    FIRST:
+    # Comment
+    JUMP THIRD
+    SECOND:
+    JUMP THIRD
+    THIRD:
+    OUTBOX
+    """)
+
+
+def test_thread_jumps_terminates_on_loops():
+    """Test threading stops at a chain of jumps that loops forever."""
+    instructions = parse("FIRST:\nJUMP SECOND\nSECOND:\nJUMP FIRST")
+
+    assert thread_jumps(instructions) == parse(
+        "FIRST:\nJUMP FIRST\nSECOND:\nJUMP SECOND"
+    )
+
+
+def test_remove_unreachable():
+    """Test instructions no path reaches are removed, keeping labels."""
+    instructions = parse("""\
+    BEGIN:
+    INBOX
+    JUMP BEGIN
+    OUTBOX
+    UNUSED:
+    OUTBOX
+    """)
+
+    assert remove_unreachable(instructions) == parse("""\
+    BEGIN:
+    INBOX
+    JUMP BEGIN
+    UNUSED:
+    """)
+
+
+def test_remove_dead_stores():
+    """Test copies to registers that are never read are removed."""
+    instructions = parse("""\
+    INBOX
+    COPYTO A
+    COPYTO B
+    COPYTO [C]
+    ADD B
+    """)
+
+    assert remove_dead_stores(instructions) == parse("""\
+    INBOX
+    COPYTO B
+    COPYTO [C]
+    ADD B
+    """)
+
+
+def test_dead_stores_kept_with_indirect_reads():
+    """Test an indirect read may read any register, so all stores are kept."""
+    instructions = parse("COPYTO A\nCOPYFROM [B]")
+
+    assert remove_dead_stores(instructions) == instructions
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("JUMP NEXT\nNEXT:\nOUTBOX", "NEXT:\nOUTBOX"),
+        ("JUMPZ NEXT\nNEXT:\nOUTBOX", "NEXT:\nOUTBOX"),
+        ("JUMPN NEXT\nNEXT:\nOUTBOX", "JUMPN NEXT\nNEXT:\nOUTBOX"),
+        ("JUMPZ END\nJUMP END\nOUTBOX\nEND:", "JUMP END\nOUTBOX\nEND:"),
+        ("JUMPN END\nJUMPN END\nOUTBOX\nEND:", "JUMPN END\nOUTBOX\nEND:"),
+    ],
+)
+def test_fold_jumps(source: str, expected: str):
+    """Test jumps that cannot change the next instruction are removed."""
+    assert fold_jumps(parse(source)) == parse(expected)
+
+
+def test_optimize_improves_executions_and_size():
+    """Test a program improves while producing the same output."""
+    source = """\
+    BEGIN:
+    INBOX
+    COPYTO A
+    COPYFROM A
+    JUMPZ SKIP
+    COPYTO UNUSED
+    JUMP OUT
+    SKIP:
+    JUMP OUT
+    OUT:
+    OUTBOX
+    JUMP AGAIN
+    COPYFROM A
+    AGAIN:
+    JUMP BEGIN
+    """
+    original = Interpreter(instructions=parse(source), input=[0, 1, 2])
+    optimized = Interpreter(instructions=optimize(parse(source)), input=[0, 1, 2])
+
+    assert optimized.execute_program() == original.execute_program()
+    assert optimized.executions < original.executions
+    assert optimized.instruction_count < original.instruction_count
+
+
+@pytest.mark.parametrize(
+    "filename", ["level_29.yaml", "level_38_size.yaml", "level_38_speed.yaml"]
+)
+def test_optimize_challenges(filename: str):
+    """Test optimized challenges produce the same output no slower."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, filename))
+    program = Parser(level.source).parse()
+    original = Interpreter(
+        instructions=program, registers=level.registers, input=level.input
+    )
+    optimized = Interpreter(
+        instructions=optimize(program), registers=level.registers, input=level.input
+    )
+
+    assert optimized.execute_program() == original.execute_program()
+    assert optimized.executions <= original.executions
+    assert optimized.instruction_count <= original.instruction_count
@@ -0,0 +1,246 @@
+"""A compact, immutable representation of Human Resource Machine programs.
+
+A `PackedProgram` stores a parsed program as three parallel `array` columns
+holding, for each instruction, its type, the id of its operand and whether it
+uses indirect addressing. Operands such as register names and labels are
+interned into one table per program, so a program costs a few bytes per
+instruction rather than an object each.
+
+It is a sequence of instructions, creating them on access, so it can be given
+to `Interpreter` in place of a list and lists the same with `to_str`. The
+bytecode and generated engines compile it once, like any other program.
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from typing import overload
+
+from xyz.human_resource_machine.interpreter import (
+    Add,
+    AssertRegisterIs,
+    AssertValueIs,
+    BumpMinus,
+    BumpPlus,
+    Comment,
+    CopyFrom,
+    CopyTo,
+    Inbox,
+    Instruction,
+    Jump,
+    JumpIfNegative,
+    JumpIfZero,
+    Label,
+    Outbox,
+    Program,
+    Subtract,
+)
+
+# The opcode of an instruction is the index of its type.
+_TYPES: tuple[type, ...] = (
+    Inbox,
+    Outbox,
+    CopyFrom,
+    CopyTo,
+    Add,
+    Subtract,
+    BumpPlus,
+    BumpMinus,
+    Jump,
+    JumpIfZero,
+    JumpIfNegative,
+    Label,
+    Comment,
+    AssertValueIs,
+    AssertRegisterIs,
+)
+_OPCODES = {cls: opcode for opcode, cls in enumerate(_TYPES)}
+_USES_REGISTER = frozenset(
+    _OPCODES[cls] for cls in (CopyFrom, CopyTo, Add, Subtract, BumpPlus, BumpMinus)
+)
+_NO_OPERAND = -1
+
+
+def _operand(instruction: Instruction) -> object:
+    match instruction:
+        case Inbox() | Outbox():
+            return None
+        case Label() | Jump() | JumpIfZero() | JumpIfNegative():
+            return instruction.label
+        case Comment():
+            return instruction.text
+        case AssertValueIs():
+            return instruction.value
+        case AssertRegisterIs():
+            return (instruction.register, instruction.value)
+        case _:
+            return instruction.register
+
+
+def fields(instruction: Instruction) -> tuple[type, object, bool]:
+    """Return the type, operand and addressing mode of an instruction."""
+    if type(instruction) not in _OPCODES:
+        raise ValueError(f"Cannot pack instruction {instruction}")
+    return (
+        type(instruction),
+        _operand(instruction),
+        getattr(instruction, "indirect", False),
+    )
+
+
+class PackedProgram(Program):
+    """A program stored as parallel arrays of opcodes, operand ids and modes.
+
+    The columns are `array`s, or `memoryview`s of the same formats when the
+    program is loaded straight from a buffer such as a memory-mapped file.
+    """
+
+    __slots__ = ("opcodes", "operands", "modes", "symbols", "_hash")
+
+    def __init__(self, instructions: Iterable[Instruction]):
+        self.opcodes = array("b")
+        self.operands = array("i")
+        self.modes = array("b")
+        ids: dict[tuple[type, object], int] = {}
+        symbols: list[object] = []
+        for instruction in instructions:
+            cls, operand, indirect = fields(instruction)
+            opcode = _OPCODES[cls]
+            if operand is None:
+                operand_id = _NO_OPERAND
+            else:
+                # Keyed by type too, so register 1 and the letter "1" differ.
+                key = (type(operand), operand)
+                if key not in ids:
+                    ids[key] = len(symbols)
+                    symbols.append(operand)
+                operand_id = ids[key]
+            self.opcodes.append(opcode)
+            self.operands.append(operand_id)
+            self.modes.append(indirect)
+        self.symbols: tuple[object, ...] = tuple(
+            sys.intern(symbol) if isinstance(symbol, str) else symbol
+            for symbol in symbols
+        )
+        self._hash: int | None = None
+
+    @classmethod
+    def from_columns(
+        cls,
+        opcodes: Sequence[int],
+        operands: Sequence[int],
+        modes: Sequence[int],
+        symbols: tuple[object, ...],
+    ) -> PackedProgram:
+        """Create a program from existing columns, without copying them.
+
+        Raises `ValueError` if the columns do not describe a valid program.
+        """
+        if not len(opcodes) == len(operands) == len(modes):
+            raise ValueError("Columns of a packed program differ in length")
+        if opcodes and not 0 <= min(opcodes) <= max(opcodes) < len(_TYPES):
+            raise ValueError("Unknown opcode in packed program")
+        if operands and not _NO_OPERAND <= min(operands) <= max(operands) < len(
+            symbols
+        ):
+            raise ValueError("Unknown operand in packed program")
+        program = cls.__new__(cls)
+        program.opcodes = opcodes
+        program.operands = operands
+        program.modes = modes
+        program.symbols = symbols
+        program._hash = None
+        return program
+
+    def _instruction(self, index: int) -> Instruction:
+        opcode = self.opcodes[index]
+        cls = _TYPES[opcode]
+        operand_id = self.operands[index]
+        if operand_id == _NO_OPERAND:
+            return cls()
+        operand = self.symbols[operand_id]
+        if opcode in _USES_REGISTER:
+            return cls(operand, bool(self.modes[index]))
+        if cls is AssertRegisterIs:
+            return cls(*operand)
+        return cls(operand)
+
+    @overload
+    def __getitem__(self, index: int) -> Instruction: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Instruction]: ...
+
+    def __getitem__(self, index: int | slice) -> Instruction | list[Instruction]:
+        if isinstance(index, slice):
+            return [self._instruction(i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PackedProgram index out of range")
+        return self._instruction(index)
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+    def fields(self) -> Iterator[tuple[type, object, bool]]:
+        """Yield what `fields` returns for each instruction, without creating it."""
+        symbols = self.symbols
+        for opcode, operand_id, mode in zip(self.opcodes, self.operands, self.modes):
+            operand = None if operand_id == _NO_OPERAND else symbols[operand_id]
+            yield _TYPES[opcode], operand, bool(mode)
+
+    def layout(self) -> tuple[int, dict[str, int]]:
+        """Count the instructions that run and find each label from the columns."""
+        label = _OPCODES[Label]
+        comment = _OPCODES[Comment]
+        count = 0
+        jumps: dict[str, int] = {}
+        for index, opcode in enumerate(self.opcodes):
+            if opcode == label:
+                jumps[self.symbols[self.operands[index]]] = index
+            elif opcode != comment:
+                count += 1
+        return count, jumps
+
+    def __iter__(self) -> Iterator[Instruction]:
+        return (self._instruction(index) for index in range(len(self)))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PackedProgram):
+            return NotImplemented
+        return (
+            self.opcodes == other.opcodes
+            and self.operands == other.operands
+            and self.modes == other.modes
+            and self.symbols == other.symbols
+        )
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(
+                (
+                    self.opcodes.tobytes(),
+                    self.operands.tobytes(),
+                    self.modes.tobytes(),
+                    self.symbols,
+                )
+            )
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"PackedProgram({list(self)!r})"
+
+    def copy(self) -> PackedProgram:
+        """Return the program itself, as it cannot be changed."""
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the instruction columns in bytes."""
+        return sum(
+            column.itemsize * len(column)
+            for column in (self.opcodes, self.operands, self.modes)
+        )
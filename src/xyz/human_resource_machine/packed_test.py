@@ -0,0 +1,93 @@
+"""Tests for the packed Human Resource Machine program format."""
+
+import os
+import sys
+
+import pytest
+
+from xyz.human_resource_machine.engines import ENGINES
+from xyz.human_resource_machine.interpreter import (
+    AssertRegisterIs,
+    AssertValueIs,
+    CopyFrom,
+    Interpreter,
+)
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.packed import PackedProgram
+from xyz.human_resource_machine.parser import Parser
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+FILENAMES = ["level_29.yaml", "level_38_size.yaml", "level_38_speed.yaml"]
+
+
+@pytest.mark.parametrize("filename", FILENAMES)
+def test_round_trip(filename: str):
+    """Test a packed program holds the same instructions and listing."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, filename))
+    instructions = Parser(level.source).parse()
+    packed = PackedProgram(instructions)
+
+    assert list(packed) == instructions
+    assert len(packed) == len(instructions)
+    assert packed[-1] == instructions[-1]
+    assert packed[2:5] == instructions[2:5]
+    assert (
+        Interpreter(instructions=packed).to_str()
+        == Interpreter(instructions=instructions).to_str()
+    )
+
+
+def test_operands_are_interned():
+    """Test each distinct operand is stored once, keeping ints and letters apart."""
+    packed = PackedProgram(
+        [
+            CopyFrom("x"),
+            CopyFrom("x", indirect=True),
+            CopyFrom(1),
+            CopyFrom("1"),
+            AssertValueIs(1),
+            AssertRegisterIs("x", 1),
+        ]
+    )
+
+    assert packed.symbols == ("x", 1, "1", ("x", 1))
+    assert list(packed.operands) == [0, 0, 1, 2, 1, 3]
+    assert list(packed.modes) == [0, 1, 0, 0, 0, 0]
+    assert packed[3] == CopyFrom("1")
+
+
+def test_smaller_than_instruction_list():
+    """Test the packed columns are smaller than a list of instruction objects."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, "level_38_speed.yaml"))
+    instructions = Parser(level.source).parse()
+    packed = PackedProgram(instructions)
+
+    objects = sys.getsizeof(instructions) + sum(map(sys.getsizeof, instructions))
+    assert packed.nbytes * 4 < objects
+
+
+def test_equality_and_hashing():
+    """Test packed programs are equal and hash equally when their code is."""
+    first = PackedProgram(Parser("INBOX\nCOPYTO 1").parse())
+    second = PackedProgram(Parser("INBOX\nCOPYTO 1").parse())
+    third = PackedProgram(Parser("INBOX\nCOPYTO [1]").parse())
+
+    assert first == second
+    assert hash(first) == hash(second)
+    assert first != third
+    assert first.copy() is first
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("filename", FILENAMES)
+def test_execute(engine: str, filename: str):
+    """Test every engine runs a packed program like the original."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, filename))
+    instructions = Parser(level.source).parse()
+    kwargs = dict(registers=level.registers, input=level.input, engine=ENGINES[engine])
+    original = Interpreter(instructions=instructions, **kwargs)
+    packed = Interpreter(instructions=PackedProgram(instructions), **kwargs)
+
+    assert packed.execute_program() == original.execute_program()
+    assert packed.executions == original.executions
+    assert packed.instruction_count == original.instruction_count
@@ -0,0 +1,138 @@
+"""Save parsed programs and levels on disk so each is parsed only once.
+
+Programs are stored as pickled `PackedProgram`s, in a file named after a hash
+of their source, so an edited program is simply a different entry. Unpickling
+a packed program and unpacking it is about twice as fast as parsing, and
+entries are a few bytes per instruction.
+
+Unreadable or outdated entries are parsed again and replaced, and a cache
+directory that cannot be written to only loses the speedup, so a cache never
+changes what a program parses to.
+
+`LevelIndex` keeps levels loaded from YAML together in one file, so a level
+that has not changed since it was last loaded costs one unpickle, without
+importing or running the YAML parser.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import pickle
+
+from xyz.human_resource_machine.interpreter import Instruction
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.packed import PackedProgram
+from xyz.human_resource_machine.parser import Parser
+
+# Part of every key, so entries from an older layout are never loaded.
+# Bumped whenever `Level` or `PackedProgram` change shape.
+_VERSION = b"2"
+
+# Errors from a missing, truncated or stale entry, all treated as a miss.
+_UNREADABLE = (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError)
+
+
+def default_directory() -> str:
+    """Return the per-user cache directory, following the XDG convention."""
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(root, "xyz-human-resource-machine")
+
+
+def _write(path: str, data: object) -> None:
+    """Pickle data to a file atomically, ignoring errors writing it."""
+    # Imported here, as it is slow to import and only needed on a miss.
+    import tempfile
+
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as file:
+            pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.unlink(temporary)
+
+
+class ParseCache:
+    """Parsed programs kept in a directory, keyed by a hash of their source."""
+
+    def __init__(self, directory: str | None = None):
+        self.directory = default_directory() if directory is None else directory
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, source: str) -> str:
+        """Return the file a program's parsed form is kept in."""
+        digest = hashlib.sha256(_VERSION + source.encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.pickle")
+
+    def parse(self, source: str) -> list[Instruction]:
+        """Parse a program, or load it if it has been parsed before."""
+        path = self.path(source)
+        try:
+            with open(path, "rb") as file:
+                program = pickle.load(file)
+        except _UNREADABLE:
+            program = None
+        if isinstance(program, PackedProgram):
+            self.hits += 1
+            return list(program)
+
+        self.misses += 1
+        instructions = Parser(source).parse()
+        _write(path, PackedProgram(instructions))
+        return instructions
+
+
+class LevelIndex:
+    """Levels loaded from YAML files, saved together in one index file.
+
+    Entries are keyed by the absolute path of the level file and checked
+    against its size and modification time, so edited levels are loaded from
+    YAML again. Call `save` to write new entries to the index.
+    """
+
+    def __init__(self, directory: str | None = None):
+        directory = default_directory() if directory is None else directory
+        self.path = os.path.join(directory, f"levels-{_VERSION.decode()}.pickle")
+        self._entries: dict[str, tuple[tuple[int, int], Level]] | None = None
+        self._changed = False
+
+    def _read(self) -> dict[str, tuple[tuple[int, int], Level]]:
+        if self._entries is None:
+            try:
+                with open(self.path, "rb") as file:
+                    entries = pickle.load(file)
+            except _UNREADABLE:
+                entries = None
+            self._entries = entries if isinstance(entries, dict) else {}
+        return self._entries
+
+    def load(self, path: str) -> Level:
+        """Load a level, from the index if the file has not changed."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        entries = self._read()
+        entry = entries.get(path)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        level = Level.from_yaml(path)
+        entries[path] = (version, level)
+        self._changed = True
+        return level
+
+    def save(self) -> None:
+        """Write the index if any level was loaded from YAML."""
+        if self._changed:
+            _write(self.path, self._read())
+            self._changed = False
@@ -0,0 +1,88 @@
+"""Tests for the on-disk cache of parsed Human Resource Machine programs."""
+
+import os
+
+from xyz.human_resource_machine.parse_cache import LevelIndex, ParseCache
+from xyz.human_resource_machine.parser import Parser
+
+SOURCE = """\
+# Double every value.
+BEGIN:
+INBOX
+COPYTO 0
+ADD 0
+OUTBOX
+JUMP BEGIN
+"""
+
+
+def test_parses_once(tmp_path):
+    """Test a program is parsed the first time and loaded after that."""
+    first = ParseCache(str(tmp_path))
+    second = ParseCache(str(tmp_path))
+
+    assert first.parse(SOURCE) == Parser(SOURCE).parse()
+    assert second.parse(SOURCE) == Parser(SOURCE).parse()
+    assert (first.misses, second.hits, second.misses) == (1, 1, 0)
+    assert os.listdir(tmp_path) == [os.path.basename(first.path(SOURCE))]
+
+
+def test_keyed_by_source(tmp_path):
+    """Test an edited program is parsed again rather than loaded."""
+    cache = ParseCache(str(tmp_path))
+    cache.parse(SOURCE)
+    edited = SOURCE.replace("ADD 0", "ADD [0]")
+
+    assert cache.parse(edited) == Parser(edited).parse()
+    assert cache.misses == 2
+
+
+def test_corrupt_entry(tmp_path):
+    """Test an unreadable entry is parsed again and replaced."""
+    cache = ParseCache(str(tmp_path))
+    with open(cache.path(SOURCE), "wb") as file:
+        file.write(b"not a pickle")
+
+    assert cache.parse(SOURCE) == Parser(SOURCE).parse()
+    assert cache.parse(SOURCE) == Parser(SOURCE).parse()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_unwritable_directory(tmp_path):
+    """Test a cache that cannot be written to still parses programs."""
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = ParseCache(str(blocker / "cache"))
+
+    assert cache.parse(SOURCE) == Parser(SOURCE).parse()
+    assert cache.parse(SOURCE) == Parser(SOURCE).parse()
+    assert cache.misses == 2
+
+
+LEVEL = """\
+speed-challenge: 3
+size-challenge: 2
+registers: {}
+input: |
+  1
+source: |
+  INBOX
+  OUTBOX
+"""
+
+
+def test_level_index(tmp_path):
+    """Test levels are loaded from the index until their file changes."""
+    path = tmp_path / "level.yaml"
+    path.write_text(LEVEL)
+    index = LevelIndex(str(tmp_path / "cache"))
+    level = index.load(str(path))
+    index.save()
+
+    reloaded = LevelIndex(str(tmp_path / "cache"))
+    assert reloaded.load(str(path)) == level
+    assert not reloaded._changed
+
+    path.write_text(LEVEL.replace("1\n", "12\n"))
+    assert reloaded.load(str(path)).input == [12]
+    assert reloaded._changed
@@ -1,109 +1,85 @@
-"""A parser for a Human Resource Machine-like language."""
+"""A parser for a Human Resource Machine-like language.
 
-from typing import Type
+Source is parsed line by line in a single pass: each line is split once and
+turned straight into an instruction, without building intermediate tokens.
+The language has one instruction, label or comment per line, so this accepts
+exactly what `lexer.Lexer` tokenizes.
+"""
 
 import xyz.human_resource_machine.interpreter as interpreter
-import xyz.human_resource_machine.lexer as lexer
 from xyz.human_resource_machine.interpreter import int_or_str
 
+# Instructions without an argument.
+_NO_ARGUMENT = {
+    "INBOX": interpreter.Inbox,
+    "OUTBOX": interpreter.Outbox,
+}
+
+# Instructions taking a register, which is indirect when written as `[x]`.
+_REGISTER_ARGUMENT = {
+    "COPYFROM": interpreter.CopyFrom,
+    "COPYTO": interpreter.CopyTo,
+    "ADD": interpreter.Add,
+    "SUB": interpreter.Subtract,
+    "BUMPUP": interpreter.BumpPlus,
+    "BUMPDN": interpreter.BumpMinus,
+}
+
+# Instructions taking a label.
+_LABEL_ARGUMENT = {
+    "JUMP": interpreter.Jump,
+    "JUMPZ": interpreter.JumpIfZero,
+    "JUMPN": interpreter.JumpIfNegative,
+}
+
 
 class Parser:
     """A parser for a Human Resource Machine-like language."""
 
     def __init__(self, source: str):
         """Initialize the parser with the source code."""
-        self.lexer = lexer.Lexer(source)
-        self.tokens = self.lexer.tokenize()
-        self.current_token_index = 0
-
-    def _parse_with_register_arg(
-        self, cls: Type[interpreter.Instruction]
-    ) -> interpreter.Instruction:
-        """Parse a register token into an interpreter register."""
-
-        if self.token is None or self.token.kind != lexer.TokenKind.INSTRUCTION:
-            raise ValueError(f"Expected instruction, but got {self.token}.")
-        self.step()
-        token = self.token
-        if token is None or token.kind != lexer.TokenKind.ARGUMENT:
-            raise ValueError(f"Expected argument, but got {token}.")
-        register = token.value
-        if register.startswith("[") and register.endswith("]"):
-            return cls(int_or_str(register[1:-1]), True)
-        return cls(int_or_str(register), False)
-
-    def _parse_with_label_arg(
-        self, cls: Type[interpreter.Instruction]
-    ) -> interpreter.Instruction:
-        """Parse a label token into an interpreter label."""
-        if self.token is None or self.token.kind != lexer.TokenKind.INSTRUCTION:
-            raise ValueError(f"Expected instruction, but got {self.token}.")
-        self.step()
-        token = self.token
-        if token is None or token.kind != lexer.TokenKind.ARGUMENT:
-            raise ValueError(f"Expected argument, but got {token}.")
-        label = token.value
-        return cls(label)
-
-    def _parse_instruction(self) -> interpreter.Instruction:
-        """Parse one or more tokens into an interpreter instruction."""
-        token = self.token
-        assert token.kind == lexer.TokenKind.INSTRUCTION
-
-        match token.value:
-            case lexer.Instruction.INBOX:
-                return interpreter.Inbox()
-            case lexer.Instruction.OUTBOX:
-                return interpreter.Outbox()
-            case lexer.Instruction.COPYFROM:
-                return self._parse_with_register_arg(interpreter.CopyFrom)
-            case lexer.Instruction.COPYTO:
-                return self._parse_with_register_arg(interpreter.CopyTo)
-            case lexer.Instruction.ADD:
-                return self._parse_with_register_arg(interpreter.Add)
-            case lexer.Instruction.SUB:
-                return self._parse_with_register_arg(interpreter.Subtract)
-            case lexer.Instruction.BUMPUP:
-                return self._parse_with_register_arg(interpreter.BumpPlus)
-            case lexer.Instruction.BUMPDN:
-                return self._parse_with_register_arg(interpreter.BumpMinus)
-            case lexer.Instruction.JUMP:
-                return self._parse_with_label_arg(interpreter.Jump)
-            case lexer.Instruction.JUMPZ:
-                return self._parse_with_label_arg(interpreter.JumpIfZero)
-            case lexer.Instruction.JUMPN:
-                return self._parse_with_label_arg(interpreter.JumpIfNegative)
-            case _:
-                raise ValueError(
-                    f"Unknown instruction at line {getattr(token, 'line', self.current_token_index)}: {token.value}"
-                )
-
-    @property
-    def token(self) -> lexer.Token | None:
-        """Get the current token."""
-        if self.current_token_index < len(self.tokens):
-            return self.tokens[self.current_token_index]
-        return None
-
-    def step(self) -> None:
-        """Advance to the next token."""
-        self.current_token_index += 1
+        self.source = source
 
     def parse(self) -> list[interpreter.Instruction]:
-        """Parse the tokenized source code into a list of instructions."""
+        """Parse the source code into a list of instructions."""
         instructions = []
-        while token := self.token:
-            if token.kind == lexer.TokenKind.INSTRUCTION:
-                instruction = self._parse_instruction()
-                instructions.append(instruction)
-            elif token.kind == lexer.TokenKind.LABEL:
-                instructions.append(interpreter.Label(token.value))
-            elif token.kind == lexer.TokenKind.COMMENT:
-                instructions.append(interpreter.Comment(token.value))
+        append = instructions.append
+        for line_number, line in enumerate(self.source.splitlines(), start=1):
+            words = line.split()
+            if not words:
+                continue
+            keyword = words[0]
+            if keyword[0] == "#":
+                append(interpreter.Comment(line.strip()[1:].strip()))
+                continue
+
+            if (cls := _REGISTER_ARGUMENT.get(keyword)) is not None:
+                register = self._argument(words, line_number)
+                if register[0] == "[" and register[-1] == "]":
+                    append(cls(int_or_str(register[1:-1]), True))
+                else:
+                    append(cls(int_or_str(register), False))
+            elif (cls := _LABEL_ARGUMENT.get(keyword)) is not None:
+                append(cls(self._argument(words, line_number)))
+            elif (cls := _NO_ARGUMENT.get(keyword)) is not None:
+                if len(words) > 1:
+                    raise ValueError(
+                        f"Unexpected argument at line {line_number}: {words[1]}"
+                    )
+                append(cls())
+            elif keyword[-1] == ":":
+                append(interpreter.Label(keyword[:-1]))
             else:
-                raise ValueError(
-                    f"Unknown token at index {self.current_token_index}: {token}"
-                )
-            self.step()
+                raise ValueError(f"Failed to parse line {line_number}: {line.strip()}")
 
         return instructions
+
+    @staticmethod
+    def _argument(words: list[str], line_number: int) -> str:
+        """Return the single argument of an instruction."""
+        if len(words) != 2:
+            raise ValueError(
+                f"Expected one argument for {words[0]} at line {line_number}, "
+                f"but got {len(words) - 1}."
+            )
+        return words[1]
@@ -21,6 +21,7 @@ from xyz.human_resource_machine.interpreter import (
     Outbox,
     Subtract,
 )
+from xyz.human_resource_machine.lexer import Lexer
 from xyz.human_resource_machine.parser import Parser
 
 
@@ -97,3 +98,45 @@ def test_parse_jumps(source: str, instruction: Type[Instruction], label: str):
     assert len(instructions) == 1
     assert isinstance(instructions[0], instruction)
     assert instructions[0].label == label
+
+
+@pytest.mark.parametrize(
+    "source",
+    ["COPYTO", "COPYTO A B", "JUMP", "INBOX 1", "HELLO", "LABEL"],
+)
+def test_parse_errors(source: str):
+    """Test malformed lines are rejected."""
+    with pytest.raises(ValueError, match="line 2"):
+        Parser("INBOX\n" + source).parse()
+
+
+def test_parse_matches_lexer():
+    """Test the parser accepts each line the lexer tokenizes, the same way."""
+    source = dedent("""\
+      #   indented comment
+
+    A:  ignored
+    COPYFROM   [12]
+    ADD -3
+    JUMPN A
+    """)
+    tokens = Lexer(source).tokenize()
+    instructions = Parser(source).parse()
+
+    assert [str(token.value) for token in tokens] == [
+        "indented comment",
+        "A",
+        "COPYFROM",
+        "[12]",
+        "ADD",
+        "-3",
+        "JUMPN",
+        "A",
+    ]
+    assert instructions == [
+        Comment("indented comment"),
+        Label("A"),
+        CopyFrom(12, True),
+        Add(-3, False),
+        JumpIfNegative("A"),
+    ]
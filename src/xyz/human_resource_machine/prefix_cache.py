@@ -0,0 +1,201 @@
+"""Reuse the work of running a shared program prefix across many programs.
+
+Programs produced by a search often share long prefixes, and are evaluated
+on the same inputs from the same registers. Until execution first moves past
+the end of a prefix, it depends only on the prefix, so the state at that
+point can be saved once and restored for every program starting the same way.
+
+`PrefixCache.interpreter` creates an interpreter for a program, restores the
+state after the longest cached prefix of it, and steps on to the end of its
+longest proper prefix, saving a snapshot each time execution first moves past
+another instruction. Any engine can then run the remainder of the program.
+"""
+
+from __future__ import annotations
+
+import sys
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from xyz.human_resource_machine.interpreter import (
+    Instruction,
+    Interpreter,
+    Jump,
+    JumpIfNegative,
+    JumpIfZero,
+    Label,
+    Snapshot,
+    Value,
+)
+
+# Prefixes are recorded for at most this many steps when the interpreter has
+# no `max_executions` of its own, so a loop inside a prefix cannot hang.
+DEFAULT_RECORD_EXECUTIONS = 100_000
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    prefix: tuple[Instruction, ...]
+    snapshot: Snapshot
+    # Labels jumped to while running the prefix.
+    labels: frozenset[str]
+    size: int
+
+
+def _prefix_hashes(instructions: Sequence[Instruction]) -> list[int]:
+    """Return a hash of every prefix, where `hashes[k]` covers `k` instructions."""
+    hashes = [0]
+    for instruction in instructions:
+        hashes.append(hash((hashes[-1], instruction)))
+    return hashes
+
+
+def _size(snapshot: Snapshot) -> int:
+    """Estimate the memory a snapshot keeps alive, in bytes."""
+    return (
+        sys.getsizeof(snapshot)
+        + sys.getsizeof(snapshot.registers)
+        + 8 * snapshot.output_length
+    )
+
+
+class PrefixCache:
+    """A least recently used cache of interpreter states after program prefixes.
+
+    Entries are evicted once there are more than `max_entries` or they use
+    more than about `max_bytes` between them.
+    """
+
+    def __init__(self, *, max_entries: int = 4096, max_bytes: int = 64 * 1024**2):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """The estimated memory used by cached states, in bytes."""
+        return self._bytes
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def interpreter(
+        self,
+        instructions: Sequence[Instruction],
+        registers: dict[Value, Value],
+        input: list[Value],
+        **kwargs,
+    ) -> Interpreter:
+        """Create an interpreter for a program, resuming from cached prefixes.
+
+        Other arguments are passed to `Interpreter`. The interpreter is left
+        where execution first moves to the last instruction or beyond, or
+        earlier if the program ends, fails or runs for too long first, ready
+        for `execute_program` to finish the run.
+        """
+        interpreter = Interpreter(
+            instructions=list(instructions), registers=registers, input=input, **kwargs
+        )
+        instructions = interpreter.instructions
+        hashes = _prefix_hashes(instructions)
+        state_key = (
+            tuple(input),
+            tuple(sorted(registers.items(), key=lambda item: str(item[0]))),
+        )
+
+        frontier = 0
+        labels: set[str] = set()
+        for length in range(len(instructions) - 1, 0, -1):
+            entry = self._entries.get((hashes[length], length, state_key))
+            if entry is None or tuple(instructions[:length]) != entry.prefix:
+                continue
+            # A label defined again later wins, so jumps in the prefix would go
+            # somewhere else in this program.
+            if any(
+                isinstance(instruction, Label) and instruction.label in entry.labels
+                for instruction in instructions[length:]
+            ):
+                continue
+            self._entries.move_to_end((hashes[length], length, state_key))
+            self.hits += 1
+            interpreter.restore(entry.snapshot)
+            # The prefix was cached before execution reached its end.
+            frontier = length - 1
+            labels = set(entry.labels)
+            break
+        else:
+            self.misses += 1
+
+        self._record(interpreter, hashes, state_key, frontier, labels)
+        return interpreter
+
+    def _record(
+        self,
+        interpreter: Interpreter,
+        hashes: list[int],
+        state_key: tuple,
+        frontier: int,
+        labels: set[str],
+    ) -> None:
+        """Step through the program, caching the state before each new prefix.
+
+        `frontier` is the highest instruction index reached so far, and
+        `labels` those jumped to so far.
+        """
+        instructions = interpreter.instructions
+        end = len(instructions) - 1
+        budget = interpreter.max_executions or DEFAULT_RECORD_EXECUTIONS
+        while frontier < end and interpreter.executions < budget:
+            instruction = instructions[interpreter.instruction_index]
+            snapshot = interpreter.snapshot()
+            try:
+                finished = interpreter.step() is not None
+            except Exception:
+                # Leave the failing instruction for the caller to run again.
+                interpreter.restore(snapshot)
+                return
+            if finished:
+                return
+            reached = interpreter.instruction_index
+            if reached > frontier:
+                # Nothing at `frontier + 1` or beyond has run before this step,
+                # so the state before it depends only on those prefixes.
+                for length in range(frontier + 1, min(reached, end) + 1):
+                    self._store(
+                        hashes[length],
+                        tuple(instructions[:length]),
+                        state_key,
+                        snapshot,
+                        frozenset(labels),
+                    )
+                frontier = reached
+            if isinstance(instruction, Jump | JumpIfZero | JumpIfNegative):
+                labels.add(instruction.label)
+
+    def _store(
+        self,
+        prefix_hash: int,
+        prefix: tuple[Instruction, ...],
+        state_key: tuple,
+        snapshot: Snapshot,
+        labels: frozenset[str],
+    ) -> None:
+        key = (prefix_hash, len(prefix), state_key)
+        if key in self._entries:
+            return
+        entry = _Entry(prefix, snapshot, labels, _size(snapshot))
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
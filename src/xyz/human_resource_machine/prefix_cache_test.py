@@ -0,0 +1,115 @@
+"""Tests for the Human Resource Machine prefix cache."""
+
+import itertools
+import random
+
+import pytest
+
+from xyz.human_resource_machine.engines import ENGINES
+from xyz.human_resource_machine.interpreter import Interpreter
+from xyz.human_resource_machine.parser import Parser
+from xyz.human_resource_machine.prefix_cache import PrefixCache
+
+PREFIX = """\
+BEGIN:
+INBOX
+JUMPZ BEGIN
+COPYTO 0
+BUMPDN 0
+"""
+
+LINES = [
+    "INBOX",
+    "OUTBOX",
+    "COPYFROM 0",
+    "COPYTO 1",
+    "ADD 1",
+    "BUMPUP 0",
+    "COPYFROM [2]",
+    "JUMPZ BEGIN",
+    "JUMPN END",
+    "JUMP BEGIN",
+    "BEGIN:",
+    "END:",
+]
+
+
+def run(interpreter: Interpreter) -> tuple:
+    """Finish running an interpreter, returning everything it produced."""
+    try:
+        interpreter.execute_program()
+        error = None
+    except Exception as e:
+        error = (type(e), str(e))
+    return (
+        interpreter.output,
+        interpreter.executions,
+        interpreter.registers,
+        interpreter.value,
+        error,
+    )
+
+
+def test_siblings_reuse_prefix():
+    """Test programs differing only in their last instruction share work."""
+    cache = PrefixCache()
+    registers = {0: 0}
+    input = [0, 3, 5]
+    for last in ["OUTBOX", "COPYFROM 0\nOUTBOX", "BUMPUP 0\nOUTBOX"]:
+        program = Parser(PREFIX + last).parse()
+        interpreter = cache.interpreter(program, registers, input)
+
+        assert run(interpreter) == run(
+            Interpreter(instructions=program, registers=registers, input=input)
+        )
+    assert cache.misses == 1
+    assert cache.hits == 2
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_matches_uncached_runs(engine: str):
+    """Test random programs sharing prefixes behave exactly as without a cache."""
+    rng = random.Random(1)
+    cache = PrefixCache(max_entries=64)
+    registers = {0: 2, 2: 0}
+    inputs = [[3, 0, -1, 4], [1, 1]]
+    prefixes = ["\n".join(rng.choices(LINES, k=4)) for _ in range(8)]
+    for prefix, _ in itertools.product(prefixes, range(10)):
+        source = prefix + "\n" + "\n".join(rng.choices(LINES, k=rng.randint(1, 4)))
+        program = Parser(source).parse()
+        for input in inputs:
+            kwargs = dict(max_executions=200, engine=ENGINES[engine])
+            cached = cache.interpreter(program, registers, input, **kwargs)
+            fresh = Interpreter(
+                instructions=program, registers=registers, input=input, **kwargs
+            )
+
+            assert run(cached) == run(fresh), source
+    assert cache.hits > cache.misses
+
+
+def test_label_defined_again_after_prefix():
+    """Test a prefix is not reused when a later label changes where it jumps."""
+    cache = PrefixCache()
+    first = Parser("INBOX\nJUMP L\nL:\nOUTBOX\nOUTBOX").parse()
+    second = Parser("INBOX\nJUMP L\nL:\nOUTBOX\nL:\nOUTBOX").parse()
+
+    run(cache.interpreter(first, {}, [1]))
+    interpreter = cache.interpreter(second, {}, [1])
+
+    assert run(interpreter) == ([1], 3, {}, None, None)
+    assert cache.hits == 1  # Only the prefix before the jump is reused.
+
+
+def test_eviction():
+    """Test the cache keeps to its entry and memory limits."""
+    program = Parser("INBOX\nOUTBOX\n" * 20).parse()
+
+    by_entries = PrefixCache(max_entries=5)
+    by_entries.interpreter(program, {}, list(range(20)))
+    by_bytes = PrefixCache(max_bytes=1000)
+    by_bytes.interpreter(program, {}, list(range(20)))
+
+    assert len(by_entries) == 5
+    assert 0 < by_bytes.nbytes <= 1000
+    assert len(by_bytes) < 39
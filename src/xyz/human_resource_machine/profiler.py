@@ -0,0 +1,122 @@
+"""Profile where a Human Resource Machine program spends its executions.
+
+`Profile.execute` is an engine that runs the reference `Interpreter.step` loop
+while counting how often each instruction runs, how often each conditional
+jump is taken, and how often each register is read and written. Programs run
+with any other engine pay nothing for profiling.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+
+from xyz.human_resource_machine.interpreter import (
+    Add,
+    BumpMinus,
+    BumpPlus,
+    CopyFrom,
+    CopyTo,
+    Interpreter,
+    Jump,
+    JumpIfNegative,
+    JumpIfZero,
+    Subtract,
+    Value,
+)
+
+_BAR_WIDTH = 20
+
+
+@dataclass(slots=True)
+class Profile:
+    """Execution counts collected while running a program."""
+
+    # Keyed by index into `Interpreter.instructions`.
+    executions: Counter[int] = field(default_factory=Counter)
+    taken: Counter[int] = field(default_factory=Counter)
+    not_taken: Counter[int] = field(default_factory=Counter)
+    # Keyed by register, counting the pointer and the target of indirect access.
+    reads: Counter[Value] = field(default_factory=Counter)
+    writes: Counter[Value] = field(default_factory=Counter)
+
+    def execute(self, interpreter: Interpreter) -> list[Value]:
+        """Run the program to completion, adding its counts to this profile."""
+        watchdog = interpreter._watchdog
+        instructions = interpreter.instructions
+        while interpreter._instruction_index < len(instructions):
+            index = interpreter._instruction_index
+            instruction = instructions[index]
+            if watchdog is not None and isinstance(
+                instruction, Jump | JumpIfZero | JumpIfNegative
+            ):
+                watchdog.check(
+                    index,
+                    interpreter._value,
+                    interpreter._input_index,
+                    interpreter.registers,
+                    interpreter._execution_count,
+                )
+            value = interpreter._value
+            pointer = None
+            if getattr(instruction, "indirect", False):
+                pointer = interpreter.registers.get(instruction.register)
+            executions = interpreter._execution_count
+
+            return_value = interpreter.step()
+            if interpreter._execution_count == executions:
+                # Not an instruction, or INBOX with no input left.
+                if return_value is not None:
+                    return return_value
+                continue
+
+            self.executions[index] += 1
+            match instruction:
+                case JumpIfZero():
+                    (self.taken if value == 0 else self.not_taken)[index] += 1
+                case JumpIfNegative():
+                    (self.taken if value < 0 else self.not_taken)[index] += 1
+                case (
+                    CopyFrom()
+                    | Add()
+                    | Subtract()
+                    | CopyTo()
+                    | BumpPlus()
+                    | BumpMinus()
+                ):
+                    address = instruction.register
+                    if instruction.indirect:
+                        self.reads[address] += 1
+                        address = pointer
+                    if isinstance(instruction, CopyTo | BumpPlus | BumpMinus):
+                        self.writes[address] += 1
+                    if not isinstance(instruction, CopyTo):
+                        self.reads[address] += 1
+        return interpreter._output
+
+    def annotations(self) -> dict[int, str]:
+        """Describe the counts of each instruction that ran, by index."""
+        hottest = max(self.executions.values(), default=0)
+        total = self.executions.total()
+        annotations: dict[int, str] = {}
+        for index, count in self.executions.items():
+            bar = "#" * max(1, round(_BAR_WIDTH * count / hottest))
+            annotation = f"{count:>8} {count / total:>6.1%} {bar:<{_BAR_WIDTH}}"
+            if index in self.taken or index in self.not_taken:
+                annotation += (
+                    f" taken {self.taken[index]}, not taken {self.not_taken[index]}"
+                )
+            annotations[index] = annotation.rstrip()
+        return annotations
+
+    def format_registers(self) -> str:
+        """Return a table of reads and writes for each register used."""
+        lines = [f"{'Register':<10} {'Reads':>8} {'Writes':>8}"]
+        used = {*self.reads, *self.writes}
+        tiles = sorted(register for register in used if isinstance(register, int))
+        names = sorted(register for register in used if not isinstance(register, int))
+        for register in tiles + names:
+            lines.append(
+                f"{register!s:<10} {self.reads[register]:>8} {self.writes[register]:>8}"
+            )
+        return "\n".join(lines)
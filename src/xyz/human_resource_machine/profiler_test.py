@@ -0,0 +1,94 @@
+"""Tests for the Human Resource Machine profiler."""
+
+import os
+from textwrap import dedent
+
+import pytest
+
+from xyz.human_resource_machine.interpreter import ExecutionAborted, Interpreter
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parser import Parser
+from xyz.human_resource_machine.profiler import Profile
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+SOURCE = dedent("""\
+    BEGIN:
+    INBOX
+    JUMPZ ZERO
+    COPYTO [0]
+    JUMP BEGIN
+    ZERO:
+    BUMPUP 1
+    JUMP BEGIN
+    """)
+
+
+def profile(source: str, **kwargs) -> tuple[Interpreter, Profile]:
+    result = Profile()
+    interpreter = Interpreter(
+        instructions=Parser(source).parse(), engine=result.execute, **kwargs
+    )
+    interpreter.execute_program()
+    return interpreter, result
+
+
+def test_counts():
+    """Test instructions, jumps and register accesses are counted."""
+    interpreter, result = profile(SOURCE, registers={0: 5, 1: 0}, input=[3, 0, 4])
+
+    assert result.executions == {1: 3, 2: 3, 3: 2, 4: 2, 6: 1, 7: 1}
+    assert result.executions.total() == interpreter.executions
+    assert result.taken == {2: 1}
+    assert result.not_taken == {2: 2}
+    assert result.reads == {0: 2, 1: 1}
+    assert result.writes == {5: 2, 1: 1}
+
+
+def test_profiled_run_matches_reference():
+    """Test profiling does not change how a level runs."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, "level_38_speed.yaml"))
+    kwargs = dict(registers=level.registers, input=level.input)
+    reference = Interpreter(instructions=Parser(level.source).parse(), **kwargs)
+    reference.execute_program()
+
+    interpreter, result = profile(level.source, **kwargs)
+
+    assert interpreter.output == reference.output
+    assert interpreter.executions == reference.executions
+    assert interpreter.registers == reference.registers
+    assert result.executions.total() == reference.executions
+
+
+def test_profile_respects_limits():
+    """Test the watchdog stops a profiled program at the usual point."""
+    with pytest.raises(ExecutionAborted):
+        profile("LOOP:\nJUMP LOOP", max_executions=10)
+
+
+def test_annotated_listing():
+    """Test the listing is annotated with counts in an aligned column."""
+    interpreter, result = profile(SOURCE, registers={0: 5, 1: 0}, input=[0, 7])
+
+    assert interpreter.to_str(result.annotations()) == dedent("""\
+        LABEL: BEGIN
+        1: Inbox()                                      2  25.0% ####################
+        2: JumpIfZero(label='ZERO')                     2  25.0% #################### taken 1, not taken 1
+        3: CopyTo(register=0, indirect=True)            1  12.5% ##########
+        4: Jump(label='BEGIN')                          1  12.5% ##########
+        LABEL: ZERO
+        5: BumpPlus(register=1, indirect=False)         1  12.5% ##########
+        6: Jump(label='BEGIN')                          1  12.5% ##########""")
+
+
+def test_format_registers():
+    """Test register counts are listed with tiles before named registers."""
+    _, result = profile(
+        "INBOX\nCOPYTO B\nCOPYTO 10\nADD 2", input=[1], registers={2: 1}
+    )
+
+    assert result.format_registers() == dedent("""\
+        Register      Reads   Writes
+        2                 1        0
+        10                0        1
+        B                 0        1""")
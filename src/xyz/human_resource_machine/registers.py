@@ -0,0 +1,73 @@
+"""An array-backed register file for the execution engines.
+
+`Interpreter.registers` is a dict keyed by tile number or name, so indirect
+addressing costs two hash lookups. A `RegisterFile` instead keeps registers in
+one list: tiles `0` to `TILES - 1` are stored at their own index, and named
+registers, along with any other key, are given fixed slots after them. Slots
+for the registers a program names directly are assigned when it is compiled,
+so only indirect access through a pointer to a name needs a dict lookup.
+
+Empty registers hold `EMPTY`, which engines check for on reads so that a
+missing register raises `KeyError` with its key, as the dict would.
+"""
+
+from __future__ import annotations
+
+from xyz.human_resource_machine.interpreter import Value
+
+TILES = 64
+
+
+class _Empty:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "EMPTY"
+
+
+EMPTY = _Empty()
+
+
+class RegisterFile:
+    """Registers held in a list, with a slot for each tile and name."""
+
+    __slots__ = ("slots", "keys", "_addresses")
+
+    def __init__(
+        self,
+        registers: dict[Value, Value] | None = None,
+        names: tuple[Value, ...] = (),
+    ):
+        self.slots: list[object] = [EMPTY] * TILES
+        # The register key held in each slot.
+        self.keys: list[Value] = list(range(TILES))
+        self._addresses: dict[Value, int] = {}
+        for name in names:
+            self.address(name)
+        if registers:
+            for key, value in registers.items():
+                self.slots[self.address(key)] = value
+
+    def address(self, key: Value) -> int:
+        """Return the slot holding a register, allocating one if needed."""
+        if type(key) is int and 0 <= key < TILES:
+            return key
+        address = self._addresses.get(key)
+        if address is None:
+            address = self._addresses[key] = len(self.slots)
+            self.slots.append(EMPTY)
+            self.keys.append(key)
+        return address
+
+    def read(self, address: int) -> Value:
+        """Return the value in a slot, raising `KeyError` if it is empty."""
+        value = self.slots[address]
+        if value is EMPTY:
+            raise KeyError(self.keys[address])
+        return value
+
+    def store(self, registers: dict[Value, Value]) -> None:
+        """Copy every register that holds a value into `registers`."""
+        for key, value in zip(self.keys, self.slots):
+            if value is not EMPTY:
+                registers[key] = value
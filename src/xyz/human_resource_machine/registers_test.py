@@ -0,0 +1,46 @@
+"""Tests for the Human Resource Machine register file."""
+
+import pytest
+
+from xyz.human_resource_machine.registers import EMPTY, TILES, RegisterFile
+
+
+def test_tiles_are_stored_at_their_index():
+    """Test tiles use their own slot and names are given slots after them."""
+    register_file = RegisterFile({3: "A", "x": 1}, names=("digit",))
+
+    assert register_file.address(3) == 3
+    assert register_file.address("digit") == TILES
+    assert register_file.address("x") == TILES + 1
+    assert register_file.slots[3] == "A"
+    assert register_file.slots[TILES] is EMPTY
+
+
+def test_other_keys_are_given_slots():
+    """Test negative and large tile numbers are stored like names."""
+    register_file = RegisterFile()
+
+    assert register_file.address(-1) == TILES
+    assert register_file.address(TILES) == TILES + 1
+    assert register_file.address(-1) == TILES
+    assert register_file.keys[TILES:] == [-1, TILES]
+
+
+def test_read_empty_register():
+    """Test reading an empty register raises `KeyError` with its key."""
+    register_file = RegisterFile({0: 1})
+
+    assert register_file.read(0) == 1
+    with pytest.raises(KeyError, match="'x'"):
+        register_file.read(register_file.address("x"))
+
+
+def test_store():
+    """Test only registers holding a value are copied back."""
+    registers = {0: 1, "x": "A"}
+    register_file = RegisterFile(registers, names=("unused",))
+    register_file.slots[5] = 7
+
+    register_file.store(registers)
+
+    assert registers == {0: 1, "x": "A", 5: 7}
@@ -0,0 +1,161 @@
+"""Run many Human Resource Machine levels in parallel across processes."""
+
+from __future__ import annotations
+
+import os
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import xyz.human_resource_machine.hrmc as hrmc
+import xyz.human_resource_machine.parser as parser
+from xyz.human_resource_machine.engines import ENGINES
+from xyz.human_resource_machine.interpreter import Interpreter
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parse_cache import ParseCache
+
+
+@dataclass(frozen=True, slots=True)
+class LevelResult:
+    """The outcome of running the solution in one level file."""
+
+    path: str
+    passed: bool
+    executions: int
+    speed_challenge: int
+    instruction_count: int
+    size_challenge: int
+    seconds: float
+    error: str | None = None
+
+
+def discover(directories: Iterable[str]) -> list[str]:
+    """Find every level file in the given directories and their subdirectories."""
+    paths: list[str] = []
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            paths.extend(
+                os.path.join(root, name)
+                for name in files
+                if name.endswith((".yaml", ".yml", hrmc.EXTENSION))
+            )
+    return sorted(paths)
+
+
+def run_level(
+    path: str,
+    engine: str | None = None,
+    max_executions: int | None = None,
+    timeout: float | None = None,
+    detect_cycles: bool = False,
+    cache_directory: str | None = None,
+) -> LevelResult:
+    """Load and run one level file, recording rather than raising errors.
+
+    A level passes if its program runs without error and, when the level lists
+    its expected output, produces exactly that output. Programs that run past
+    `max_executions`, `timeout` seconds, or, with `detect_cycles`, loop forever
+    are stopped and fail. Parsed programs are cached in `cache_directory` when
+    one is given. Without an `engine`, `.hrmc` files run on the bytecode
+    engine and other levels on the reference interpreter.
+    """
+    start = time.perf_counter()
+    level = None
+    interpreter = None
+    try:
+        if path.endswith(hrmc.EXTENSION):
+            level, instructions = hrmc.load(path)
+        else:
+            level = Level.from_yaml(path)
+            if cache_directory is None:
+                instructions = parser.Parser(level.source).parse()
+            else:
+                instructions = ParseCache(cache_directory).parse(level.source)
+        if engine is None:
+            engine = "bytecode" if path.endswith(hrmc.EXTENSION) else "step"
+        interpreter = Interpreter(
+            instructions=instructions,
+            registers=level.registers,
+            input=level.input,
+            engine=ENGINES[engine],
+            max_executions=max_executions,
+            timeout=timeout,
+            detect_cycles=detect_cycles,
+        )
+        output = interpreter.execute_program()
+        error = None
+        if level.output is not None and output != level.output:
+            error = f"expected output {level.output}, got {output}"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    return LevelResult(
+        path=path,
+        passed=error is None,
+        executions=interpreter.executions if interpreter else 0,
+        speed_challenge=level.speed_challenge if level else 0,
+        instruction_count=interpreter.instruction_count if interpreter else 0,
+        size_challenge=level.size_challenge if level else 0,
+        seconds=time.perf_counter() - start,
+        error=error,
+    )
+
+
+def run_all(
+    paths: Iterable[str],
+    *,
+    workers: int | None = None,
+    engine: str | None = None,
+    max_executions: int | None = None,
+    timeout: float | None = None,
+    detect_cycles: bool = False,
+    cache_directory: str | None = None,
+) -> Iterator[LevelResult]:
+    """Run level files in a process pool, yielding results as they complete."""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                run_level,
+                path,
+                engine,
+                max_executions,
+                timeout,
+                detect_cycles,
+                cache_directory,
+            )
+            for path in paths
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+_COLUMNS = "{:<40} {:<6} {:>15} {:>11} {:>9}"
+
+
+def format_header() -> str:
+    """Return the header row of the results table."""
+    return _COLUMNS.format("LEVEL", "RESULT", "SPEED", "SIZE", "TIME")
+
+
+def format_result(result: LevelResult, root: str | None = None) -> str:
+    """Format a result as a row of the results table.
+
+    Execution and instruction counts are shown against their targets, marked
+    with `*` when the target is missed.
+    """
+
+    def against(actual: int, target: int) -> str:
+        return f"{actual}/{target}{'*' if actual > target else ' '}"
+
+    name = os.path.relpath(result.path, root) if root else result.path
+    row = _COLUMNS.format(
+        name,
+        "pass" if result.passed else "FAIL",
+        against(result.executions, result.speed_challenge),
+        against(result.instruction_count, result.size_challenge),
+        f"{result.seconds:.3f}s",
+    )
+    if result.error is not None:
+        row += f"\n    {result.error}"
+    return row
@@ -0,0 +1,137 @@
+"""Tests for running Human Resource Machine levels in parallel."""
+
+import os
+from textwrap import dedent
+
+import xyz.human_resource_machine.bytecode as bytecode
+import xyz.human_resource_machine.hrmc as hrmc
+from xyz.human_resource_machine.engines import ENGINES
+from xyz.human_resource_machine.interpreter import Interpreter, Value
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parser import Parser
+from xyz.human_resource_machine.runner import (
+    discover,
+    format_result,
+    run_all,
+    run_level,
+)
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+LEVEL = dedent("""\
+speed-challenge: 3
+size-challenge: 2
+registers: {{}}
+input: |
+  1
+  2
+output: |
+  {output}
+source: |
+  BEGIN:
+  INBOX
+  OUTBOX
+  JUMP BEGIN
+""")
+
+
+def test_discover_finds_bundled_challenges():
+    """Test level files are discovered in sorted order."""
+    paths = discover([CHALLENGES])
+
+    assert [os.path.basename(path) for path in paths] == [
+        "level_29.yaml",
+        "level_38_size.yaml",
+        "level_38_speed.yaml",
+    ]
+
+
+def test_run_level_passes_bundled_challenge():
+    """Test a bundled challenge runs and produces its expected output."""
+    result = run_level(os.path.join(CHALLENGES, "level_29.yaml"), "bytecode")
+
+    assert result.passed
+    assert result.error is None
+    assert result.executions == 25
+    assert result.instruction_count == 5
+
+
+def test_run_level_loads_precompiled_level(tmp_path):
+    """Test .hrmc files are discovered and run like the levels they hold."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, "level_29.yaml"))
+    hrmc.save(str(tmp_path / "level_29.hrmc"), level, Parser(level.source).parse())
+
+    [path] = discover([str(tmp_path)])
+    result = run_level(path, "generated")
+
+    assert result.passed
+    assert result.executions == 25
+
+
+def test_run_level_runs_precompiled_level_as_bytecode(tmp_path, monkeypatch):
+    """Test .hrmc files run on the bytecode engine unless told otherwise."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, "level_29.yaml"))
+    path = str(tmp_path / "level_29.hrmc")
+    hrmc.save(path, level, Parser(level.source).parse())
+    engines = []
+
+    def engine(interpreter: Interpreter) -> list[Value]:
+        engines.append("bytecode")
+        return bytecode.execute(interpreter)
+
+    monkeypatch.setitem(ENGINES, "bytecode", engine)
+
+    assert run_level(path).passed
+    assert run_level(path, "step").passed
+    assert engines == ["bytecode"]
+
+
+def test_run_level_reports_wrong_output(tmp_path):
+    """Test a level producing the wrong output fails with a message."""
+    path = tmp_path / "wrong.yaml"
+    path.write_text(LEVEL.format(output="1\n  3"))
+
+    result = run_level(str(path))
+
+    assert not result.passed
+    assert "expected output [1, 3], got [1, 2]" in result.error
+    assert "FAIL" in format_result(result, str(tmp_path))
+
+
+def test_run_level_reports_errors(tmp_path):
+    """Test a level that cannot be loaded fails rather than raising."""
+    path = tmp_path / "broken.yaml"
+    path.write_text("source: |\n  INBOX\n")
+
+    result = run_level(str(path))
+
+    assert not result.passed
+    assert result.error.startswith("KeyError")
+
+
+def test_run_level_detects_cycles(tmp_path):
+    """Test an endless loop is stopped when cycle detection is enabled."""
+    path = tmp_path / "loop.yaml"
+    path.write_text(
+        "speed-challenge: 1\nsize-challenge: 1\nregisters: {}\n"
+        "source: |\n  LOOP:\n  JUMP LOOP\n"
+    )
+
+    result = run_level(str(path), detect_cycles=True)
+
+    assert not result.passed
+    assert result.error.startswith("ExecutionAborted")
+
+
+def test_run_all_in_process_pool(tmp_path):
+    """Test levels from several directories are run by a process pool."""
+    (tmp_path / "good.yaml").write_text(LEVEL.format(output="1\n  2"))
+    paths = discover([CHALLENGES, str(tmp_path)])
+
+    results = list(run_all(paths, workers=2))
+
+    assert sorted(result.path for result in results) == paths
+    assert all(result.passed for result in results)
+    good = next(result for result in results if result.path.endswith("good.yaml"))
+    assert (good.executions, good.speed_challenge) == (6, 3)
+    assert "6/3*" in format_result(good)
@@ -0,0 +1,396 @@
+"""Search for the shortest program that solves a Human Resource Machine level.
+
+Candidate programs are enumerated in order of increasing length as tuples of
+bytecode `(opcode, operand)` pairs, where jump operands are the index of the
+instruction jumped to. Most candidates are discarded without being run:
+
+* Programs are canonical: scratch registers are introduced in order, and any
+  pattern the peephole optimizer would remove, or that is certain to fail,
+  is rejected, as a shorter equivalent program would already have been found.
+  Programs are built one instruction at a time and each prefix is checked as
+  it is extended, so a prefix that no canonical program starts with is
+  abandoned along with every program extending it.
+* Candidates are run with the bytecode engine, which gives up on a program
+  once it exceeds an execution budget.
+
+The programs of each length are split by their first instruction across a
+process pool. A program that matches is checked again with the reference
+`Interpreter` before it is returned.
+"""
+
+from __future__ import annotations
+
+import functools
+import itertools
+import multiprocessing
+import multiprocessing.synchronize
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import xyz.human_resource_machine.bytecode as bytecode
+from xyz.human_resource_machine.bytecode import Opcode
+from xyz.human_resource_machine.interpreter import (
+    Add,
+    BumpMinus,
+    BumpPlus,
+    CopyFrom,
+    CopyTo,
+    Engine,
+    Inbox,
+    Instruction,
+    Interpreter,
+    Jump,
+    JumpIfNegative,
+    JumpIfZero,
+    Label,
+    Outbox,
+    Subtract,
+    Value,
+)
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parser import Parser
+
+Candidate = tuple[tuple[int, object], ...]
+
+# Set in worker processes to abandon partitions once a solution is known.
+_stop: multiprocessing.synchronize.Event | None = None
+
+_INBOX = Opcode.INBOX.value
+_OUTBOX = Opcode.OUTBOX.value
+_COPYFROM = Opcode.COPYFROM.value
+_COPYFROM_INDIRECT = Opcode.COPYFROM_INDIRECT.value
+_COPYTO = Opcode.COPYTO.value
+_COPYTO_INDIRECT = Opcode.COPYTO_INDIRECT.value
+_ADD = Opcode.ADD.value
+_ADD_INDIRECT = Opcode.ADD_INDIRECT.value
+_SUB = Opcode.SUB.value
+_SUB_INDIRECT = Opcode.SUB_INDIRECT.value
+_BUMPUP = Opcode.BUMPUP.value
+_BUMPUP_INDIRECT = Opcode.BUMPUP_INDIRECT.value
+_BUMPDN = Opcode.BUMPDN.value
+_BUMPDN_INDIRECT = Opcode.BUMPDN_INDIRECT.value
+_JUMP = Opcode.JUMP.value
+_JUMPZ = Opcode.JUMPZ.value
+_JUMPN = Opcode.JUMPN.value
+
+_REGISTER_OPCODES = (
+    (_COPYFROM, _COPYFROM_INDIRECT, CopyFrom),
+    (_COPYTO, _COPYTO_INDIRECT, CopyTo),
+    (_ADD, _ADD_INDIRECT, Add),
+    (_SUB, _SUB_INDIRECT, Subtract),
+    (_BUMPUP, _BUMPUP_INDIRECT, BumpPlus),
+    (_BUMPDN, _BUMPDN_INDIRECT, BumpMinus),
+)
+_JUMP_OPCODES = ((_JUMP, Jump), (_JUMPZ, JumpIfZero), (_JUMPN, JumpIfNegative))
+_JUMPS = {_JUMP, _JUMPZ, _JUMPN}
+
+# Instructions that fail when the hand is empty.
+_NEEDS_VALUE = {_OUTBOX, _ADD, _ADD_INDIRECT, _SUB, _SUB_INDIRECT, _JUMPN}
+# Instructions replacing the hand without reading it or changing registers.
+_LOADS = {_COPYFROM, _COPYFROM_INDIRECT}
+_OVERWRITES_VALUE = _LOADS | {_INBOX}
+
+
+@dataclass(frozen=True, slots=True)
+class Case:
+    """An input and the output a solution must produce for it."""
+
+    input: list[Value]
+    output: list[Value]
+
+
+@dataclass(frozen=True, slots=True)
+class _Problem:
+    """Everything a worker process needs to search part of the space."""
+
+    registers: dict[Value, Value]
+    cases: tuple[Case, ...]
+    operands: tuple[Value, ...]
+    scratch: tuple[Value, ...]
+    max_executions: int
+
+
+def _alphabet(problem: _Problem, length: int) -> list[tuple[int, object]]:
+    """Return every instruction a program of `length` instructions may use."""
+    alphabet: list[tuple[int, object]] = [(_INBOX, None), (_OUTBOX, None)]
+    for direct, indirect, _ in _REGISTER_OPCODES:
+        for register in problem.operands:
+            alphabet.append((direct, register))
+            alphabet.append((indirect, register))
+    for opcode, _ in _JUMP_OPCODES:
+        alphabet.extend((opcode, target) for target in range(length + 1))
+    return alphabet
+
+
+# What the canonical checks need to know of a program's first instructions:
+# the next scratch register it may introduce, the instructions it jumps to,
+# and the instructions it must jump to, as the instruction before each is
+# only canonical if it can be jumped over.
+_Prefix = tuple[int, frozenset[int], frozenset[int]]
+
+_EMPTY_PREFIX: _Prefix = (0, frozenset(), frozenset())
+
+
+def _may_follow(previous: tuple[int, object], following: tuple[int, object]) -> bool:
+    """Return whether `following` may run straight after `previous`."""
+    opcode, operand = previous
+    following_opcode, following_operand = following
+    if opcode == _JUMP:
+        return False  # The following instruction is unreachable.
+    if opcode in _LOADS and following_opcode in _OVERWRITES_VALUE:
+        return False  # The load is overwritten before it is used.
+    if opcode == _OUTBOX and following_opcode in _NEEDS_VALUE:
+        return False  # Fails with an empty hand.
+    if opcode == _COPYTO and following == (_COPYFROM, operand):
+        return False  # The value is already in hand.
+    if opcode in (_JUMPZ, _JUMPN) and previous == following:
+        return False  # Repeats the jump that was just not taken.
+    return True
+
+
+def _extend(
+    prefix: _Prefix,
+    program: Sequence[tuple[int, object]],
+    instruction: tuple[int, object],
+    length: int,
+    scratch: Sequence[Value],
+) -> _Prefix | None:
+    """Check `program` followed by `instruction` as the start of a program.
+
+    Returns `None` if no canonical program of `length` instructions starts
+    this way.
+    """
+    next_scratch, targets, required = prefix
+    index = len(program)
+    opcode, operand = instruction
+    if index == 0:
+        if opcode in _NEEDS_VALUE:
+            return None
+        # Storing the empty hand only matters if later jumps return with a
+        # value.
+        if opcode in (_COPYTO, _COPYTO_INDIRECT):
+            required = required | {0}
+
+    if opcode in _JUMPS:
+        if opcode == _JUMP and operand == index:
+            return None  # Loops forever.
+        if opcode != _JUMPN and operand == index + 1:
+            return None  # Never changes the next instruction.
+        targets = targets | {operand}
+    elif opcode != _INBOX and opcode != _OUTBOX and operand in scratch:
+        # Scratch registers are interchangeable, so they must be used in order.
+        position = scratch.index(operand)
+        if position > next_scratch:
+            return None
+        next_scratch = max(next_scratch, position + 1)
+
+    if index and not _may_follow(program[-1], instruction):
+        required = required | {index}
+    # Each instruction still to come can jump to at most one of them.
+    if len(required - targets) > length - index - 1:
+        return None
+    return next_scratch, targets, required
+
+
+def _is_canonical(program: Candidate, scratch: Sequence[Value]) -> bool:
+    """Return whether no shorter or earlier program is equivalent to `program`."""
+    prefix: _Prefix | None = _EMPTY_PREFIX
+    for index, instruction in enumerate(program):
+        prefix = _extend(prefix, program[:index], instruction, len(program), scratch)
+        if prefix is None:
+            return False
+    return prefix[2] <= prefix[1]
+
+
+class _Mismatch(Exception):
+    """Raised to stop a run as soon as its output is wrong."""
+
+
+class _Outbox:
+    """An outbox that rejects the first value not in the expected output."""
+
+    __slots__ = ("expected", "count")
+
+    def __init__(self, expected: list[Value]):
+        self.expected = expected
+        self.count = 0
+
+    def __call__(self, value: Value) -> None:
+        if self.count == len(self.expected) or value != self.expected[self.count]:
+            raise _Mismatch
+        self.count += 1
+
+
+def _solves(program: Candidate, problem: _Problem, engine: Engine | None) -> bool:
+    """Return whether a program produces the expected output for every case.
+
+    The program is run with `engine`, and each run stops at the first value
+    sent to the outbox that is not expected.
+    """
+    instructions = to_instructions(program) if engine is None else None
+    for case in problem.cases:
+        outbox = _Outbox(case.output)
+        interpreter = Interpreter(
+            instructions=instructions,
+            registers=problem.registers,
+            input=case.input,
+            outbox=outbox,
+            engine=engine,
+            max_executions=problem.max_executions,
+        )
+        try:
+            interpreter.execute_program()
+        except Exception:
+            return False
+        if outbox.count != len(case.output):
+            return False
+    return True
+
+
+def to_instructions(program: Candidate) -> list[Instruction]:
+    """Convert a candidate program to instructions, labelling jump targets."""
+    classes = {direct: cls for direct, _, cls in _REGISTER_OPCODES}
+    classes.update({indirect: cls for _, indirect, cls in _REGISTER_OPCODES})
+    indirect_opcodes = {indirect for _, indirect, _ in _REGISTER_OPCODES}
+    jump_classes = dict(_JUMP_OPCODES)
+    targets = {operand for opcode, operand in program if opcode in _JUMPS}
+
+    instructions: list[Instruction] = []
+    for index, (opcode, operand) in enumerate(program):
+        if index in targets:
+            instructions.append(Label(f"L{index}"))
+        if opcode == _INBOX:
+            instructions.append(Inbox())
+        elif opcode == _OUTBOX:
+            instructions.append(Outbox())
+        elif opcode in jump_classes:
+            instructions.append(jump_classes[opcode](f"L{operand}"))
+        else:
+            instructions.append(classes[opcode](operand, opcode in indirect_opcodes))
+    if len(program) in targets:
+        instructions.append(Label(f"L{len(program)}"))
+    return instructions
+
+
+def _candidates(
+    problem: _Problem, length: int, first: tuple[int, object]
+) -> Iterator[Candidate]:
+    """Yield the canonical programs of `length` starting with `first`, in order."""
+    alphabet = _alphabet(problem, length)
+    scratch = problem.scratch
+    program: list[tuple[int, object]] = []
+
+    def extend(prefix: _Prefix) -> Iterator[Candidate]:
+        if len(program) == length:
+            if prefix[2] <= prefix[1]:
+                yield tuple(program)
+            return
+        for instruction in alphabet:
+            extended = _extend(prefix, program, instruction, length, scratch)
+            if extended is not None:
+                program.append(instruction)
+                yield from extend(extended)
+                program.pop()
+
+    start = _extend(_EMPTY_PREFIX, program, first, length, scratch)
+    if start is not None:
+        program.append(first)
+        yield from extend(start)
+
+
+def _initialize_worker(stop: multiprocessing.synchronize.Event) -> None:
+    global _stop
+    _stop = stop
+
+
+def _search_partition(
+    problem: _Problem, length: int, first: tuple[int, object]
+) -> Candidate | None:
+    """Return the first solution of `length` starting with `first`, if any."""
+    for count, program in enumerate(_candidates(problem, length, first)):
+        if count % 4096 == 0 and _stop is not None and _stop.is_set():
+            return None
+        # Candidates are already bytecode, so need not be compiled.
+        engine = functools.partial(bytecode.execute, code=bytecode.assemble(program))
+        if _solves(program, problem, engine) and _solves(program, problem, None):
+            return program
+    return None
+
+
+def search(
+    level: Level,
+    max_length: int,
+    *,
+    registers: Sequence[Value] | None = None,
+    scratch: int = 1,
+    cases: Sequence[Case] | None = None,
+    max_executions: int = 1000,
+    workers: int | None = None,
+) -> list[Instruction] | None:
+    """Find the shortest program producing a level's expected output.
+
+    Programs may use the `registers` given, by default those named in the
+    level's own solution, and `scratch` further empty registers. The program
+    must match every case, by default only the level's own input and output,
+    so more cases make it less likely to find a program that only works by
+    coincidence. With `workers` of 1 the search runs in this process.
+
+    Returns `None` if no program of at most `max_length` instructions exists.
+    """
+    if cases is None:
+        if level.output is None:
+            raise ValueError("The level does not specify its expected output")
+        cases = [Case(level.input, level.output)]
+    if registers is None:
+        registers = sorted(
+            {
+                instruction.register
+                for instruction in Parser(level.source).parse()
+                if hasattr(instruction, "register")
+            },
+            key=str,
+        )
+
+    used = {*level.registers, *registers}
+    free = (
+        tile for tile in itertools.count() if tile not in used and str(tile) not in used
+    )
+    scratch_registers = tuple(itertools.islice(free, scratch))
+    problem = _Problem(
+        registers=dict(level.registers),
+        cases=tuple(cases),
+        operands=(*registers, *scratch_registers),
+        scratch=scratch_registers,
+        max_executions=max_executions,
+    )
+
+    stop = multiprocessing.Event()
+    executor = (
+        ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_initialize_worker,
+            initargs=(stop,),
+        )
+        if workers != 1
+        else None
+    )
+    try:
+        for length in range(1, max_length + 1):
+            firsts = _alphabet(problem, length)
+            args = ([problem] * len(firsts), [length] * len(firsts), firsts)
+            results = (
+                executor.map(_search_partition, *args)
+                if executor
+                else map(_search_partition, *args)
+            )
+            # Results arrive in order, so every earlier partition has finished
+            # and stopping the later ones cannot change which program is found.
+            for program in results:
+                if program is not None:
+                    return to_instructions(program)
+    finally:
+        stop.set()
+        if executor:
+            executor.shutdown(cancel_futures=True)
+    return None
@@ -0,0 +1,136 @@
+"""Tests for the Human Resource Machine superoptimiser search."""
+
+from textwrap import dedent
+
+import pytest
+
+from xyz.human_resource_machine.bytecode import Opcode
+from xyz.human_resource_machine.interpreter import Interpreter
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parser import Parser
+from xyz.human_resource_machine.search import (
+    Case,
+    _is_canonical,
+    search,
+    to_instructions,
+)
+
+
+def make_level(input: list, output: list | None, registers: dict | None = None):
+    return Level(
+        source="",
+        input=input,
+        registers=registers or {},
+        speed_challenge=0,
+        size_challenge=0,
+        output=output,
+    )
+
+
+def test_to_instructions_labels_jump_targets():
+    """Test jump operands become labels placed before their targets."""
+    program = (
+        (Opcode.INBOX, None),
+        (Opcode.JUMPZ, 3),
+        (Opcode.COPYTO_INDIRECT, 0),
+        (Opcode.JUMP, 0),
+    )
+
+    expected = dedent("""\
+        L0:
+        INBOX
+        JUMPZ L3
+        COPYTO [0]
+        L3:
+        JUMP L0
+        """)
+
+    assert to_instructions(program) == Parser(expected).parse()
+
+
+@pytest.mark.parametrize(
+    "program, canonical",
+    [
+        (((Opcode.INBOX, None), (Opcode.OUTBOX, None)), True),
+        (((Opcode.OUTBOX, None),), False),
+        (((Opcode.INBOX, None), (Opcode.JUMP, 1)), False),
+        (((Opcode.JUMP, 0),), False),
+        (((Opcode.COPYFROM, 0), (Opcode.INBOX, None)), False),
+        (((Opcode.INBOX, None), (Opcode.COPYTO, 0), (Opcode.COPYFROM, 0)), False),
+        (((Opcode.INBOX, None), (Opcode.COPYTO, 1)), False),
+        (((Opcode.INBOX, None), (Opcode.COPYTO, 0), (Opcode.COPYTO, 1)), True),
+        (((Opcode.COPYTO, 0), (Opcode.INBOX, None)), False),
+        # Jumping back to the COPYTO stores a value the second time.
+        (((Opcode.COPYTO, 0), (Opcode.INBOX, None), (Opcode.JUMP, 0)), True),
+    ],
+)
+def test_is_canonical(program, canonical: bool):
+    """Test programs with a shorter or earlier equivalent are rejected."""
+    assert _is_canonical(program, scratch=(0, 1)) is canonical
+
+
+def test_jump_targets_are_not_scratch_registers():
+    """Test jump targets equal to scratch registers do not count as uses."""
+    program = (
+        (Opcode.INBOX, None),
+        (Opcode.JUMPZ, 0),
+        (Opcode.JUMPN, 4),
+        (Opcode.OUTBOX, None),
+        (Opcode.JUMP, 0),
+    )
+
+    assert _is_canonical(program, scratch=(3, 4))
+
+
+def test_search_finds_shortest_program():
+    """Test the shortest program is found and produces the expected output."""
+    level = make_level([1, "A", 3], [1, "A", 3])
+
+    program = search(level, 4, registers=[], scratch=0, workers=1)
+
+    assert Interpreter(instructions=program).to_str() == dedent("""\
+        LABEL: L0
+        1: Inbox()
+        2: Outbox()
+        3: Jump(label='L0')""")
+
+
+def test_search_in_worker_processes():
+    """Test the search gives the same program when run in worker processes."""
+    level = make_level([3, 0, -2], [2, -1, -3], registers={"ONE": 1})
+
+    program = search(level, 5, registers=["ONE"], scratch=0, workers=2)
+
+    interpreter = Interpreter(
+        instructions=program, registers=level.registers, input=level.input
+    )
+    assert interpreter.execute_program() == level.output
+    assert interpreter.instruction_count == 4
+    assert program == search(level, 5, registers=["ONE"], scratch=0, workers=1)
+
+
+def test_search_checks_every_case():
+    """Test a program that only matches the level's own input is not accepted."""
+    level = make_level([2, 2], [4])
+    cases = [Case(level.input, level.output), Case([1, 3], [4])]
+
+    doubled = search(level, 5, registers=[], scratch=1, workers=1)
+    summed = search(level, 5, registers=[], scratch=1, cases=cases, workers=1)
+
+    assert Interpreter(instructions=doubled, input=[1, 3]).execute_program() == [2]
+    for case in cases:
+        interpreter = Interpreter(instructions=summed, input=case.input)
+        assert interpreter.execute_program() == case.output
+
+
+def test_search_gives_up():
+    """Test no program is returned when none is short enough."""
+    level = make_level([1, 2], [3])
+
+    assert search(level, 2, registers=[], workers=1) is None
+
+
+def test_search_requires_expected_output():
+    """Test a level without an expected output cannot be searched."""
+    with pytest.raises(ValueError, match="expected output"):
+        search(make_level([1], None), 3, registers=[], workers=1)
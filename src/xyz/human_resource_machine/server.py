@@ -0,0 +1,172 @@
+"""Evaluate programs for other processes over JSON lines.
+
+A `Server` reads one JSON request per line and writes one JSON response per
+line, in order. A request gives a program as `source` or as the `path` of a
+level file, and optionally `registers`, `input`, `engine`, `max_executions`
+and `timeout`. Registers and input default to the level's when a path is
+given, and to none otherwise. Any `id` is copied to the response:
+
+    {"id": 1, "path": "solutions/level_29.yaml", "input": [3, 0]}
+    {"id": 1, "output": [3, 0], "executions": 10, "instruction_count": 5}
+
+Failures are reported as `{"id": 1, "error": "KeyError: 'A'"}` without
+stopping the server. Parsed programs and levels are kept in memory, so after
+the first request for a program, evaluating it costs only the run itself.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socketserver
+import threading
+from collections import OrderedDict
+from typing import Any, TextIO
+
+from xyz.human_resource_machine.engines import ENGINES
+from xyz.human_resource_machine.interpreter import (
+    Instruction,
+    Interpreter,
+    Value,
+    int_or_str,
+)
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parser import Parser
+
+
+def _value(value: Any) -> Value:
+    # Registers are JSON object keys, so numbers arrive as strings.
+    return int_or_str(value) if isinstance(value, str) else value
+
+
+class Server:
+    """Evaluates requests, keeping parsed programs and levels in memory."""
+
+    def __init__(
+        self,
+        *,
+        engine: str = "bytecode",
+        max_executions: int | None = None,
+        timeout: float | None = None,
+        detect_cycles: bool = False,
+        max_programs: int = 1024,
+    ):
+        self.engine = engine
+        self.max_executions = max_executions
+        self.timeout = timeout
+        self.detect_cycles = detect_cycles
+        self.max_programs = max_programs
+        self._programs: OrderedDict[str, list[Instruction]] = OrderedDict()
+        self._levels: dict[str, tuple[tuple[int, int], Level, list[Instruction]]] = {}
+        self._lock = threading.Lock()
+
+    def _program(self, source: str) -> list[Instruction]:
+        """Parse a program, or reuse it if it was parsed recently."""
+        with self._lock:
+            program = self._programs.get(source)
+            if program is not None:
+                self._programs.move_to_end(source)
+                return program
+        program = Parser(source).parse()
+        with self._lock:
+            self._programs[source] = program
+            while len(self._programs) > self.max_programs:
+                self._programs.popitem(last=False)
+        return program
+
+    def _level(self, path: str) -> tuple[Level, list[Instruction]]:
+        """Load a level and its program, or reuse them if the file is unchanged."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._levels.get(path)
+        if entry is not None and entry[0] == version:
+            return entry[1], entry[2]
+        if path.endswith(".hrmc"):
+            import xyz.human_resource_machine.hrmc as hrmc
+
+            level, packed = hrmc.load(path)
+            program = list(packed)
+        else:
+            level = Level.from_yaml(path)
+            program = self._program(level.source)
+        with self._lock:
+            self._levels[path] = (version, level, program)
+        return level, program
+
+    def evaluate(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Run the program a request describes, returning the response."""
+        response: dict[str, Any] = {}
+        if "id" in request:
+            response["id"] = request["id"]
+        try:
+            if "path" in request:
+                level, program = self._level(request["path"])
+                registers, input = level.registers, level.input
+            elif "source" in request:
+                program = self._program(request["source"])
+                registers, input = {}, []
+            else:
+                raise ValueError("request has neither a source nor a path")
+            if "registers" in request:
+                registers = {
+                    _value(key): _value(value)
+                    for key, value in request["registers"].items()
+                }
+            if "input" in request:
+                input = request["input"]
+            interpreter = Interpreter(
+                instructions=program,
+                registers=registers,
+                input=input,
+                engine=ENGINES[request.get("engine", self.engine)],
+                max_executions=request.get("max_executions", self.max_executions),
+                timeout=request.get("timeout", self.timeout),
+                detect_cycles=self.detect_cycles,
+            )
+            response["output"] = interpreter.execute_program()
+            response["executions"] = interpreter.executions
+            response["instruction_count"] = interpreter.instruction_count
+        except Exception as e:
+            response["error"] = f"{type(e).__name__}: {e}"
+        return response
+
+    def handle_line(self, line: str) -> str:
+        """Evaluate one JSON request line, returning the JSON response line."""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request is not a JSON object")
+        except ValueError as e:
+            response: dict[str, Any] = {"error": f"{type(e).__name__}: {e}"}
+        else:
+            response = self.evaluate(request)
+        return json.dumps(response, separators=(",", ":")) + "\n"
+
+    def serve(self, reader: TextIO, writer: TextIO) -> None:
+        """Answer requests from `reader` on `writer` until `reader` ends."""
+        for line in reader:
+            if line.strip():
+                writer.write(self.handle_line(line))
+                writer.flush()
+
+
+def serve_unix(server: Server, path: str) -> None:
+    """Answer requests on connections to a Unix socket until interrupted.
+
+    Each connection is served on its own thread, with all of them sharing the
+    server's parsed programs and levels.
+    """
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for line in self.rfile:
+                if line.strip():
+                    self.wfile.write(server.handle_line(line.decode()).encode())
+
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as listener:
+        try:
+            listener.serve_forever()
+        finally:
+            os.unlink(path)
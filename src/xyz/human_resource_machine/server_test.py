@@ -0,0 +1,104 @@
+"""Tests for serving program evaluations over JSON lines."""
+
+import io
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from xyz.human_resource_machine.server import Server, serve_unix
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+DOUBLE = "BEGIN:\nINBOX\nCOPYTO 0\nADD 0\nOUTBOX\nJUMP BEGIN"
+
+
+def test_evaluate_level():
+    """Test a level runs with its own registers and input."""
+    response = Server().evaluate(
+        {"id": "a", "path": os.path.join(CHALLENGES, "level_29.yaml")}
+    )
+
+    assert response == {
+        "id": "a",
+        "output": ["O", "A", "N", "E", "R"],
+        "executions": 25,
+        "instruction_count": 5,
+    }
+
+
+@pytest.mark.parametrize("engine", ["step", "bytecode", "generated"])
+def test_evaluate_source(engine: str):
+    """Test a program given as source runs on the request's input."""
+    response = Server().evaluate(
+        {"source": "INBOX\nADD 0\nOUTBOX", "registers": {"0": 4}, "input": [3]}
+        | {"engine": engine}
+    )
+
+    assert response == {"output": [7], "executions": 3, "instruction_count": 3}
+
+
+def test_programs_stay_parsed():
+    """Test a program is parsed once and then reused."""
+    server = Server(max_programs=1)
+    server.evaluate({"source": DOUBLE, "input": [1]})
+    program = server._programs[DOUBLE]
+    server.evaluate({"source": DOUBLE, "input": [2]})
+
+    assert server._programs[DOUBLE] is program
+    server.evaluate({"source": "INBOX", "input": [2]})
+    assert list(server._programs) == ["INBOX"]
+
+
+def test_errors_are_reported():
+    """Test bad requests and failing programs get an error response."""
+    server = Server(max_executions=10)
+    lines = [
+        "not json",
+        "[1]",
+        '{"id": 1}',
+        '{"id": 2, "source": "INBOX\\nADD 0\\nOUTBOX", "input": [1]}',
+        '{"id": 3, "source": "L:\\nJUMP L"}',
+    ]
+    errors = [json.loads(server.handle_line(line))["error"] for line in lines]
+
+    assert errors[0].startswith("JSONDecodeError")
+    assert errors[1] == "ValueError: request is not a JSON object"
+    assert errors[2] == "ValueError: request has neither a source nor a path"
+    assert errors[3] == "KeyError: 0"
+    assert errors[4].startswith("ExecutionAborted")
+
+
+def test_serve():
+    """Test each request line is answered in order."""
+    requests = io.StringIO(
+        "\n".join(
+            json.dumps({"id": i, "source": DOUBLE, "input": [i]}) for i in range(3)
+        )
+    )
+    responses = io.StringIO()
+    Server().serve(requests, responses)
+
+    assert [
+        json.loads(line)["output"] for line in responses.getvalue().splitlines()
+    ] == [[0], [2], [4]]
+
+
+def test_serve_unix(tmp_path):
+    """Test requests are answered over a Unix socket."""
+    path = str(tmp_path / "hrm.sock")
+    thread = threading.Thread(target=serve_unix, args=(Server(), path), daemon=True)
+    thread.start()
+
+    with socket.socket(socket.AF_UNIX) as client:
+        # Wait for the server to start listening.
+        while client.connect_ex(path) != 0:
+            time.sleep(0.01)
+        file = client.makefile("rw")
+        for i in range(2):
+            file.write(json.dumps({"source": DOUBLE, "input": [i + 1]}) + "\n")
+            file.flush()
+            assert json.loads(file.readline())["output"] == [2 * (i + 1)]
@@ -0,0 +1,680 @@
+"""Specialize Human Resource Machine programs to the values held in registers.
+
+`specialize` rewrites a program as copies of its basic blocks, one for each
+combination of values known on entering the block. Values are known from
+the registers a level starts with, such as the constants 0, 10 and 100, and
+from the instructions run since, though never from the inbox. Within each
+copy, conditional jumps on a known hand become `JUMP` or disappear, copies
+of values already in place are dropped, and arithmetic on known values whose
+result is never used is removed.
+
+Only values that can decide a later conditional jump are kept apart, so a
+register counted up for output does not multiply the copies. Loops that
+neither read nor write, which run as often as the values in registers allow,
+are also unrolled: a copy of their body is made for each of up to `unroll`
+iterations, so all but one in `unroll` jumps back to the start of the loop
+are left out. A loop counting a known register down is unrolled completely,
+with its conditional jumps folded away.
+
+Each copy made for values other than those of registers never written
+counts against `budget`. Once it is spent, blocks are entered knowing only
+the registers never written, which leaves the program as it was. Where two
+copies would fall through to the same copy, one of them gets its own copy of
+it instead, even beyond the budget, so no jump is added to run.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import xyz.human_resource_machine.cfg as cfg
+from xyz.human_resource_machine.interpreter import (
+    Add,
+    AssertValueIs,
+    BumpMinus,
+    BumpPlus,
+    Comment,
+    CopyFrom,
+    CopyTo,
+    Inbox,
+    Instruction,
+    Jump,
+    JumpIfNegative,
+    JumpIfZero,
+    Label,
+    Outbox,
+    Subtract,
+    Value,
+)
+
+# The most instructions specialization may add by default.
+DEFAULT_BUDGET = 100
+# How many iterations of a loop that neither reads nor writes run between
+# jumps back to its start, by default.
+DEFAULT_UNROLL = 4
+
+_JUMPS = (Jump, JumpIfZero, JumpIfNegative)
+
+
+class _Unknown:
+    def __repr__(self) -> str:
+        return "UNKNOWN"
+
+
+# A hand or register whose value is not known.
+_UNKNOWN = _Unknown()
+
+
+@dataclass(frozen=True, slots=True)
+class _Key:
+    """A copy of a block, for the values known on entering it."""
+
+    block: int
+    known: frozenset[tuple[Value, Value | None]]
+    hand: Value | None | _Unknown
+    # The iteration of each unrolled loop holding the block, as (loop, trip).
+    trips: tuple[tuple[int, int], ...]
+
+
+# Running off the end of the program.
+_END = _Key(-1, frozenset(), _UNKNOWN, ())
+
+
+@dataclass(frozen=True, slots=True)
+class _Target:
+    """Where a copy of a block starts."""
+
+    key: _Key
+
+
+@dataclass(frozen=True, slots=True)
+class _Goto:
+    """A jump to a copy of a block."""
+
+    kind: type[Jump | JumpIfZero | JumpIfNegative]
+    key: _Key
+
+
+@dataclass(frozen=True, slots=True)
+class _Pure:
+    """An instruction that cannot fail and only sets the hand."""
+
+    instruction: Instruction
+
+
+_Item = Instruction | _Target | _Goto | _Pure
+
+
+def _same(a: object, b: object) -> bool:
+    return type(a) is type(b) and a == b
+
+
+def _labels(instructions: Sequence[Instruction]) -> dict[str, int]:
+    """Map each label to its index; later definitions win, as when running."""
+    return {
+        instruction.label: index
+        for index, instruction in enumerate(instructions)
+        if isinstance(instruction, Label)
+    }
+
+
+def _successors(
+    instructions: Sequence[Instruction], labels: dict[str, int], index: int
+) -> list[int]:
+    instruction = instructions[index]
+    targets = []
+    if isinstance(instruction, _JUMPS):
+        if instruction.label in labels:
+            targets.append(labels[instruction.label])
+        if isinstance(instruction, Jump):
+            return targets
+    targets.append(index + 1)
+    return targets
+
+
+def _relevant_before(
+    instruction: Instruction, registers: frozenset[Value], hand: bool
+) -> tuple[frozenset[Value], bool]:
+    match instruction:
+        case Inbox() | Outbox():
+            return registers, False
+        case CopyFrom():
+            return registers | {instruction.register} if hand else registers, False
+        case CopyTo():
+            return (
+                registers - {instruction.register},
+                hand or instruction.register in registers,
+            )
+        case Add() | Subtract():
+            return registers | {instruction.register} if hand else registers, hand
+        case BumpPlus() | BumpMinus():
+            if hand or instruction.register in registers:
+                return registers | {instruction.register}, False
+            return registers, False
+        case JumpIfZero() | JumpIfNegative():
+            return registers, True
+    return registers, hand
+
+
+def _relevance(
+    instructions: Sequence[Instruction], labels: dict[str, int]
+) -> list[tuple[frozenset[Value], bool]] | None:
+    """Find the registers, and whether the hand, may decide a later jump.
+
+    Returns None if the program reads or writes through a pointer, as any
+    register may then decide one.
+    """
+    if any(getattr(instruction, "indirect", False) for instruction in instructions):
+        return None
+    relevant: list[tuple[frozenset[Value], bool]] = [(frozenset(), False)] * (
+        len(instructions) + 1
+    )
+    changed = True
+    while changed:
+        changed = False
+        for index in reversed(range(len(instructions))):
+            registers: frozenset[Value] = frozenset()
+            hand = False
+            for successor in _successors(instructions, labels, index):
+                registers |= relevant[successor][0]
+                hand |= relevant[successor][1]
+            before = _relevant_before(instructions[index], registers, hand)
+            if before != relevant[index]:
+                relevant[index] = before
+                changed = True
+    return relevant
+
+
+def _reads_hand(instruction: Instruction) -> bool:
+    return isinstance(
+        instruction,
+        Outbox | CopyTo | Add | Subtract | JumpIfZero | JumpIfNegative | AssertValueIs,
+    )
+
+
+def _writes_hand(instruction: Instruction) -> bool:
+    return isinstance(
+        instruction, Inbox | Outbox | CopyFrom | Add | Subtract | BumpPlus | BumpMinus
+    )
+
+
+def _remove_dead_hand(
+    instructions: list[Instruction], pure: set[int]
+) -> list[Instruction]:
+    """Remove the `pure` instructions whose result is never read."""
+    while True:
+        labels = _labels(instructions)
+        live = [False] * (len(instructions) + 1)
+        changed = True
+        while changed:
+            changed = False
+            for index in reversed(range(len(instructions))):
+                instruction = instructions[index]
+                after = any(
+                    live[successor]
+                    for successor in _successors(instructions, labels, index)
+                )
+                before = _reads_hand(instruction) or (
+                    after and not _writes_hand(instruction)
+                )
+                if before != live[index]:
+                    live[index] = before
+                    changed = True
+        dead = {
+            index
+            for index in pure
+            if not any(
+                live[successor]
+                for successor in _successors(instructions, labels, index)
+            )
+        }
+        if not dead:
+            return instructions
+        kept = [index for index in range(len(instructions)) if index not in dead]
+        position = {index: new for new, index in enumerate(kept)}
+        pure = {position[index] for index in pure if index not in dead}
+        instructions = [instructions[index] for index in kept]
+
+
+class _Specializer:
+    def __init__(
+        self,
+        instructions: Sequence[Instruction],
+        registers: dict[Value, Value],
+        budget: int,
+        unroll: int,
+    ):
+        self.instructions = instructions
+        self.graph = cfg.build(instructions)
+        self.labels = _labels(instructions)
+        self.relevant = _relevance(instructions, self.labels)
+        self.budget = budget
+        self.unroll = unroll
+
+        written = set()
+        for instruction in instructions:
+            _, writes, _, writes_indirect = cfg.def_use(instruction)
+            if writes_indirect:
+                written = set(registers)
+                break
+            written.update(writes)
+        self.constants = {
+            register: value
+            for register, value in registers.items()
+            if register not in written
+        }
+
+        self.loops: dict[int, cfg.Loop] = {}
+        if unroll > 1:
+            for number, loop in enumerate(self.graph.loops):
+                if self._counted(loop):
+                    self.loops[number] = loop
+        self.keys: set[_Key] = set()
+        # Blocks copied at least once, which later copies leave comments out of.
+        self.copied: set[int] = set()
+        # Copies that copies placed so far fall through to.
+        self.fallen: set[_Key] = set()
+
+    def _counted(self, loop: cfg.Loop) -> bool:
+        """Whether a loop neither reads nor writes, and jumps back to repeat."""
+        for block in loop.blocks:
+            node = self.graph.blocks[block]
+            if any(
+                isinstance(self.instructions[index], Inbox | Outbox)
+                for index in range(node.start, node.stop)
+            ):
+                return False
+        return all(
+            isinstance(self.instructions[self.graph.blocks[latch].stop - 1], Jump)
+            for latch in loop.latches
+        )
+
+    def _trips(
+        self, block: int, trips: tuple[tuple[int, int], ...], source: int | None
+    ) -> tuple[tuple[int, int], ...]:
+        current = dict(trips)
+        entered = []
+        for number, loop in self.loops.items():
+            if block not in loop.blocks:
+                continue
+            trip = 0
+            if source is not None and source in loop.blocks:
+                trip = current.get(number, 0)
+                if block == loop.header:
+                    trip = (trip + 1) % self.unroll
+            entered.append((number, trip))
+        return tuple(entered)
+
+    def _restrict(
+        self, block: int, known: dict[Value, Value | None], hand: object
+    ) -> tuple[frozenset[tuple[Value, Value | None]], object]:
+        if self.relevant is None:
+            return frozenset(known.items()), hand
+        registers, relevant_hand = self.relevant[self.graph.blocks[block].start]
+        return (
+            frozenset(item for item in known.items() if item[0] in registers),
+            hand if relevant_hand else _UNKNOWN,
+        )
+
+    def generic(self, block: int) -> _Key:
+        """The copy of a block entered knowing only registers never written."""
+        known, hand = self._restrict(block, self.constants, _UNKNOWN)
+        return _Key(block, known, hand, self._trips(block, (), None))
+
+    def enter(
+        self,
+        block: int,
+        known: dict[Value, Value | None],
+        hand: object,
+        trips: tuple[tuple[int, int], ...],
+        source: int | None,
+    ) -> _Key:
+        """Choose the copy of `block` to run next, paying for new copies."""
+        restricted, hand = self._restrict(block, known, hand)
+        key = _Key(block, restricted, hand, self._trips(block, trips, source))
+        generic = self.generic(block)
+        if key == generic or key in self.keys:
+            return key
+        size = self.graph.blocks[block].size
+        if size > self.budget:
+            return generic
+        self.budget -= size
+        self.keys.add(key)
+        return key
+
+    def _read(
+        self, known: dict[Value, Value | None], register: Value, indirect: bool
+    ) -> object:
+        value = known.get(register, _UNKNOWN)
+        if not indirect:
+            return value
+        if value is _UNKNOWN or value is None:
+            return _UNKNOWN
+        return known.get(value, _UNKNOWN)
+
+    def copy(self, key: _Key) -> tuple[list[_Item], _Key | None]:
+        """Copy a block for the values known on entering it.
+
+        Returns the copy, and the copy of the next block it falls through to,
+        which is None if it never does.
+        """
+        block = self.graph.blocks[key.block]
+        known: dict[Value, Value | None] = dict(key.known)
+        hand: object = key.hand
+        comments = key.block not in self.copied
+        self.copied.add(key.block)
+        items: list[_Item] = []
+        for index in range(block.start, block.stop):
+            instruction = self.instructions[index]
+            match instruction:
+                case Label():
+                    continue
+                case Comment():
+                    if comments:
+                        items.append(instruction)
+                    continue
+                case Inbox():
+                    hand = _UNKNOWN
+                case Outbox():
+                    hand = None
+                case CopyFrom():
+                    value = self._read(
+                        known, instruction.register, instruction.indirect
+                    )
+                    if value is not _UNKNOWN and _same(value, hand):
+                        continue
+                    hand = value
+                    if value is not _UNKNOWN and not instruction.indirect:
+                        items.append(_Pure(instruction))
+                        continue
+                case CopyTo(indirect=False):
+                    value = known.get(instruction.register, _UNKNOWN)
+                    if hand is not _UNKNOWN and _same(value, hand):
+                        continue
+                    self._store(known, instruction.register, hand)
+                case CopyTo():
+                    pointer = known.get(instruction.register, _UNKNOWN)
+                    if pointer is _UNKNOWN or pointer is None:
+                        known.clear()
+                    else:
+                        self._store(known, pointer, hand)
+                case Add() | Subtract():
+                    argument = self._read(
+                        known, instruction.register, instruction.indirect
+                    )
+                    if isinstance(hand, int) and isinstance(argument, int):
+                        hand = (
+                            hand + argument
+                            if isinstance(instruction, Add)
+                            else hand - argument
+                        )
+                        if not instruction.indirect:
+                            items.append(_Pure(instruction))
+                            continue
+                    else:
+                        hand = _UNKNOWN
+                case BumpPlus() | BumpMinus():
+                    register: object = instruction.register
+                    if instruction.indirect:
+                        register = known.get(instruction.register, _UNKNOWN)
+                    if register is _UNKNOWN or register is None:
+                        known.clear()
+                        hand = _UNKNOWN
+                    else:
+                        value = known.get(register, _UNKNOWN)
+                        if isinstance(value, int):
+                            value += 1 if isinstance(instruction, BumpPlus) else -1
+                        else:
+                            value = _UNKNOWN
+                        self._store(known, register, value)
+                        hand = self._read(
+                            known, instruction.register, instruction.indirect
+                        )
+                case Jump() | JumpIfZero() | JumpIfNegative():
+                    return self._jump(key, instruction, items, known, hand)
+            items.append(instruction)
+        if block.stop == len(self.instructions):
+            return items, _END
+        following = self.graph.block_at(block.stop)
+        return items, self.enter(following, known, hand, key.trips, key.block)
+
+    def _store(self, known: dict[Value, Value | None], register: Value, value: object):
+        if value is _UNKNOWN:
+            known.pop(register, None)
+        else:
+            known[register] = value
+
+    def _jump(
+        self,
+        key: _Key,
+        instruction: Jump | JumpIfZero | JumpIfNegative,
+        items: list[_Item],
+        known: dict[Value, Value | None],
+        hand: object,
+    ) -> tuple[list[_Item], _Key | None]:
+        block = self.graph.blocks[key.block]
+        taken: bool | None = None
+        if isinstance(instruction, Jump):
+            taken = True
+        elif isinstance(instruction, JumpIfZero) and hand is not _UNKNOWN:
+            taken = hand == 0
+        elif isinstance(instruction, JumpIfNegative) and isinstance(hand, int):
+            taken = hand < 0
+
+        following = None
+        if not taken and block.stop < len(self.instructions):
+            following = self.enter(
+                self.graph.block_at(block.stop), known, hand, key.trips, key.block
+            )
+        elif not taken:
+            following = _END
+        if taken is False:
+            return items, following
+
+        target = self.labels.get(instruction.label)
+        if target is None:
+            # Running it fails, so it is kept to fail the same way.
+            items.append(instruction)
+        else:
+            if isinstance(instruction, JumpIfZero):
+                # Only 0 is equal to 0.
+                hand = 0
+            elif isinstance(instruction, JumpIfNegative):
+                hand = _UNKNOWN
+            destination = self.enter(
+                self.graph.block_at(target), known, hand, key.trips, key.block
+            )
+            items.append(_Goto(Jump if taken else type(instruction), destination))
+        return items, following
+
+    def _jumped_to_only(self, key: _Key) -> bool:
+        """Whether no copy is expected to fall through to `key`.
+
+        Copies for known values are mostly reached one way, while copies for
+        registers never written are where paths meet.
+        """
+        if key in self.fallen:
+            return False
+        if key.block == 0 or key != self.generic(key.block):
+            return True
+        previous = self.graph.blocks[key.block - 1]
+        return key.block - 1 not in self.graph.reachable or isinstance(
+            self.instructions[previous.stop - 1], Jump
+        )
+
+    def layout(self, start: _Key) -> list[list[_Item]]:
+        """Place the copies reachable from `start` in runs ending in a jump.
+
+        Copies fall through to the copy placed after them, so each run can be
+        placed anywhere. A copy falling through to a copy placed in another
+        run gets another copy of it, paid for from the budget. Runs start
+        with copies no other copy can fall through to where possible, so
+        that the others can be placed after the copies falling through.
+        """
+        runs = []
+        placed: set[_Key] = set()
+        jumped, shared = deque([start]), deque[_Key]()
+        while jumped or shared:
+            key = (jumped or shared).popleft()
+            if key in placed:
+                continue
+            run: list[_Item] = []
+            duplicate = False
+            while True:
+                if not duplicate:
+                    placed.add(key)
+                    run.append(_Target(key))
+                items, following = self.copy(key)
+                run.extend(items)
+                for item in items:
+                    if isinstance(item, _Goto):
+                        queue = jumped if self._jumped_to_only(item.key) else shared
+                        queue.append(item.key)
+                last = items[-1] if items else None
+                duplicate = False
+                if following is None:
+                    if (
+                        isinstance(last, _Goto)
+                        and last.kind is Jump
+                        and last.key not in placed
+                        and self._jumped_to_only(last.key)
+                    ):
+                        # Place the copy jumped to next, to fall through.
+                        run.pop()
+                        key = last.key
+                        continue
+                    break
+                if following is _END:
+                    run.append(_Goto(Jump, _END))
+                    break
+                self.fallen.add(following)
+                # A copy already placed elsewhere is copied again rather than
+                # jumped to, even beyond the budget, as the jump would run.
+                if following in placed:
+                    self.budget -= self.graph.blocks[following.block].size
+                    duplicate = True
+                key = following
+            runs.append(run)
+        return runs
+
+
+def _chain(runs: list[list[_Item]]) -> list[list[_Item]]:
+    """Place runs after the runs ending in a jump to them, leaving it out."""
+    starts = {run[0].key: number for number, run in enumerate(runs)}
+    after: dict[int, int] = {}
+    # The first run starts the program, so stays first.
+    placed = {0}
+    for number, run in enumerate(runs):
+        last = run[-1]
+        if not (isinstance(last, _Goto) and last.kind is Jump and last.key in starts):
+            continue
+        target = starts[last.key]
+        # Following the runs placed after the target must not lead back here.
+        current: int | None = target
+        while current is not None and current != number:
+            current = after.get(current)
+        if target not in placed and current is None:
+            after[number] = target
+            placed.add(target)
+    chains = []
+    for number in range(len(runs)):
+        if number and number in placed:
+            continue
+        chain: list[_Item] = []
+        while number in after:
+            chain.extend(runs[number][:-1])
+            number = after[number]
+        chain.extend(runs[number])
+        chains.append(chain)
+    return chains
+
+
+def _assemble(
+    runs: list[list[_Item]],
+    instructions: Sequence[Instruction],
+    graph: cfg.ControlFlowGraph,
+) -> tuple[list[Instruction], set[int]]:
+    """Join the runs into a program, naming the copies jumped to."""
+    runs = _chain(runs)
+    ending = [
+        number
+        for number, run in enumerate(runs)
+        if number and run[-1] == _Goto(Jump, _END)
+    ]
+    if ending:
+        runs = [*runs[: ending[0]], *runs[ending[0] + 1 :], runs[ending[0]]]
+    if runs and runs[-1][-1] == _Goto(Jump, _END):
+        runs[-1] = runs[-1][:-1]
+    items = [item for run in runs for item in run]
+    targets = {item.key for item in items if isinstance(item, _Goto)}
+
+    # Later definitions of a label win, so every name given must be unique,
+    # and differ from labels jumped to that are never defined.
+    reserved = set(_labels(instructions)) | {
+        instruction.label
+        for instruction in instructions
+        if isinstance(instruction, _JUMPS)
+    }
+    used: set[str] = set()
+    names: dict[_Key, str] = {}
+
+    def name(key: _Key) -> str:
+        if key not in names:
+            own = None
+            if key is _END:
+                base = "END"
+            else:
+                first = instructions[graph.blocks[key.block].start]
+                own = first.label if isinstance(first, Label) else None
+                base = own or f"BLOCK-{key.block}"
+            candidate = base
+            suffix = 1
+            while candidate in used or (candidate in reserved and candidate != own):
+                suffix += 1
+                candidate = f"{base}-{suffix}"
+            used.add(candidate)
+            names[key] = candidate
+        return names[key]
+
+    program: list[Instruction] = []
+    pure: set[int] = set()
+    for item in items:
+        match item:
+            case _Target() if item.key in targets:
+                program.append(Label(name(item.key)))
+            case _Target():
+                pass
+            case _Goto():
+                program.append(item.kind(name(item.key)))
+            case _Pure():
+                pure.add(len(program))
+                program.append(item.instruction)
+            case _:
+                program.append(item)
+    if _END in targets:
+        program.append(Label(name(_END)))
+    return program, pure
+
+
+def specialize(
+    instructions: Sequence[Instruction],
+    registers: dict[Value, Value] | None = None,
+    *,
+    budget: int = DEFAULT_BUDGET,
+    unroll: int = DEFAULT_UNROLL,
+) -> list[Instruction]:
+    """Specialize a program to the values its registers start with.
+
+    The program produces the same output, or fails the same way, for any
+    input. It runs no more instructions than the original, save for a jump
+    to its end if a copy ending the program cannot be placed last.
+    """
+    if not instructions:
+        return []
+    specializer = _Specializer(instructions, registers or {}, budget, unroll)
+    start = specializer.enter(0, dict(registers or {}), None, (), None)
+    runs = specializer.layout(start)
+    program, pure = _assemble(runs, instructions, specializer.graph)
+    return _remove_dead_hand(program, pure)
@@ -0,0 +1,185 @@
+"""Tests for specializing programs to the values held in registers."""
+
+import os
+import random
+
+import pytest
+
+from xyz.human_resource_machine.fuzzer import random_program
+from xyz.human_resource_machine.interpreter import ExecutionAborted, Interpreter
+from xyz.human_resource_machine.level import Domain, Level
+from xyz.human_resource_machine.parser import Parser
+from xyz.human_resource_machine.specializer import specialize
+from xyz.human_resource_machine.testing import parse
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+DIVIDE = """\
+BEGIN:
+INBOX
+COPYTO x
+COPYFROM 0
+COPYTO n
+COPYFROM x
+LOOP:
+SUB 7
+JUMPN DONE
+COPYTO x
+BUMPUP n
+COPYFROM x
+JUMP LOOP
+DONE:
+COPYFROM n
+OUTBOX
+JUMP BEGIN
+"""
+
+
+def run(instructions, registers, input):
+    interpreter = Interpreter(
+        instructions=instructions, registers=registers, input=input
+    )
+    output = interpreter.execute_program()
+    return output, interpreter.executions
+
+
+def outcome(instructions, registers, input):
+    interpreter = Interpreter(
+        instructions=instructions,
+        registers=registers,
+        input=input,
+        max_executions=1000,
+    )
+    try:
+        interpreter.execute_program()
+        error = None
+    except Exception as e:
+        error = type(e)
+    return interpreter.output, error, interpreter.executions
+
+
+def test_counted_loop_is_unrolled_completely():
+    """Test a loop counting down a known register loses its jumps."""
+    instructions = parse("""\
+    COPYFROM three
+    COPYTO n
+    LOOP:
+    INBOX
+    OUTBOX
+    BUMPDN n
+    JUMPZ DONE
+    JUMP LOOP
+    DONE:
+    """)
+
+    specialized = specialize(instructions, {"three": 3})
+
+    assert specialized == parse("""\
+    COPYFROM three
+    COPYTO n
+    INBOX
+    OUTBOX
+    BUMPDN n
+    INBOX
+    OUTBOX
+    BUMPDN n
+    INBOX
+    OUTBOX
+    BUMPDN n
+    """)
+
+
+def test_known_jumps_are_folded():
+    """Test jumps on known values are decided, and unused arithmetic removed."""
+    instructions = parse("""\
+    COPYFROM ten
+    SUB ten
+    JUMPZ ZERO
+    OUTBOX
+    ZERO:
+    INBOX
+    OUTBOX
+    """)
+
+    assert specialize(instructions, {"ten": 10}) == parse("""\
+    INBOX
+    OUTBOX
+    """)
+
+
+def test_loop_is_unrolled():
+    """Test a loop neither reading nor writing jumps back once per copies."""
+    instructions = parse(DIVIDE)
+    registers = {0: 0, 7: 7}
+
+    specialized = specialize(instructions, registers, unroll=2)
+
+    assert sum(instruction == parse("JUMP LOOP")[0] for instruction in specialized) == 1
+    assert len(specialized) == len(instructions) + 5
+    # 7 iterations for 50 take 3 jumps back rather than 7.
+    assert run(instructions, registers, [50, 6]) == ([7, 0], 62)
+    assert run(specialized, registers, [50, 6]) == ([7, 0], 58)
+
+
+def test_no_budget():
+    """Test no copies are made without a budget, or unrolled without one."""
+    instructions = parse(DIVIDE)
+
+    assert specialize(instructions, {0: 0, 7: 7}, budget=0) == instructions
+    assert specialize(instructions, {0: 0, 7: 7}, unroll=1) == instructions
+
+
+@pytest.mark.parametrize(
+    "filename", sorted(f for f in os.listdir(CHALLENGES) if f.endswith(".yaml"))
+)
+def test_challenges(filename):
+    """Test specialized solutions solve their levels in no more executions."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, filename))
+    instructions = Parser(level.source).parse()
+    specialized = specialize(instructions, level.registers)
+    domain = Domain.infer(level)
+    rng = random.Random(0)
+
+    output, executions = run(specialized, level.registers, level.input)
+    assert output == level.output
+    assert executions <= run(instructions, level.registers, level.input)[1]
+    for _ in range(50):
+        input = [domain.sample(rng) for _ in range(rng.randint(0, 5))]
+        expected = run(instructions, level.registers, input)[0]
+        assert run(specialized, level.registers, input)[0] == expected
+
+
+def test_level_38_size():
+    """Test the hundreds and tens of the size solution are told apart."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, "level_38_size.yaml"))
+    instructions = Parser(level.source).parse()
+
+    specialized = specialize(instructions, level.registers)
+
+    assert run(instructions, level.registers, level.input)[1] == 256
+    assert run(specialized, level.registers, level.input)[1] == 218
+
+
+def test_random_programs():
+    """Test specialized programs output the same and fail the same way."""
+    rng = random.Random(0)
+    for _ in range(1000):
+        registers = {0: rng.choice([0, 3, "A"]), 1: rng.choice([1, 10, "B"])}
+        source = random_program(rng, [*registers, "x"], rng.randint(3, 16))
+        instructions = Parser(source).parse()
+        specialized = specialize(
+            instructions,
+            registers,
+            budget=rng.choice([0, 5, 100]),
+            unroll=rng.choice([1, 2, 4]),
+        )
+        input = [rng.choice([*range(-5, 10), "C"]) for _ in range(rng.randint(0, 6))]
+        before, after = (
+            outcome(instructions, registers, input),
+            outcome(specialized, registers, input),
+        )
+        if ExecutionAborted in (before[1], after[1]):
+            continue
+        assert after[:2] == before[:2], source
+        # Only a jump to the end may be added.
+        assert after[2] <= before[2] + (before[1] is None), source
@@ -0,0 +1,30 @@
+"""Stream values into and out of the Human Resource Machine.
+
+These adapt text files, including standard input and output, to the inbox and
+outbox of an `Interpreter`, one value per line, so that neither is ever held
+in memory as a whole.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from typing import TextIO
+
+from xyz.human_resource_machine.interpreter import Value, int_or_str
+
+
+def read_values(file: TextIO) -> Iterator[Value]:
+    """Lazily read one value from each non-empty line, for use as an inbox."""
+    for line in file:
+        line = line.rstrip("\r\n")
+        if line:
+            yield int_or_str(line)
+
+
+def write_values(file: TextIO) -> Callable[[Value], None]:
+    """Return an outbox writing each value to its own line."""
+
+    def write(value: Value) -> None:
+        file.write(f"{value}\n")
+
+    return write
@@ -0,0 +1,84 @@
+"""Tests for streaming values into and out of the Human Resource Machine."""
+
+import io
+
+import pytest
+
+from xyz.human_resource_machine.engines import ENGINES
+from xyz.human_resource_machine.interpreter import Interpreter
+from xyz.human_resource_machine.parser import Parser
+from xyz.human_resource_machine.streams import read_values, write_values
+
+SOURCE = """\
+BEGIN:
+INBOX
+ADD 0
+OUTBOX
+JUMP BEGIN
+"""
+
+
+def test_read_values():
+    """Test values are read lazily, one per non-empty line."""
+    file = io.StringIO("1\n\nA\n-3\nnot read")
+    values = read_values(file)
+
+    assert next(values) == 1
+    assert next(values) == "A"
+    assert next(values) == -3
+    assert file.tell() < len(file.getvalue())
+
+
+def test_write_values():
+    """Test each value is written to its own line."""
+    file = io.StringIO()
+    write = write_values(file)
+    write(1)
+    write("B")
+
+    assert file.getvalue() == "1\nB\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_stream_through_interpreter(engine: str):
+    """Test every engine reads a generator lazily and sends values to a sink."""
+    read: list[int] = []
+
+    def inbox():
+        for value in range(1000):
+            read.append(value)
+            yield value
+
+    written: list[int] = []
+    interpreter = Interpreter(
+        instructions=Parser(SOURCE).parse(),
+        registers={0: 1},
+        input=inbox(),
+        outbox=written.append,
+        engine=ENGINES[engine],
+    )
+    for _ in range(7):
+        interpreter.step()
+
+    assert read == [0, 1]
+    assert interpreter.execute_program() == []
+    assert written == list(range(1, 1001))
+    assert interpreter.output == []
+    assert interpreter.executions == 4000
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_error_keeps_unread_input(engine: str):
+    """Test a failing program has read only the values INBOX took."""
+    values = iter([1, 2, "A", 3, 4])
+    interpreter = Interpreter(
+        instructions=Parser(SOURCE).parse(),
+        registers={0: 1},
+        input=values,
+        engine=ENGINES[engine],
+    )
+
+    with pytest.raises(ValueError):
+        interpreter.execute_program()
+    assert interpreter.output == [2, 3]
+    assert list(values) == [3, 4]
@@ -0,0 +1,35 @@
+"""Helpers shared by the tests."""
+
+from textwrap import dedent
+
+from xyz.human_resource_machine.interpreter import Engine, Instruction, Interpreter
+from xyz.human_resource_machine.parser import Parser
+
+
+def parse(source: str) -> list[Instruction]:
+    """Parse an indented program source."""
+    return Parser(dedent(source)).parse()
+
+
+def run(engine: Engine | None, **kwargs) -> tuple[Interpreter, BaseException | None]:
+    """Run a program with the given engine, capturing any error raised."""
+    interpreter = Interpreter(engine=engine, **kwargs)
+    try:
+        interpreter.execute_program()
+    except Exception as e:
+        return interpreter, e
+    return interpreter, None
+
+
+def assert_same_behaviour(engine: Engine, **kwargs) -> None:
+    """Assert an engine matches the reference step loop."""
+    reference, reference_error = run(None, **kwargs)
+    result, error = run(engine, **kwargs)
+
+    assert type(error) is type(reference_error)
+    assert str(error) == str(reference_error)
+    assert result.output == reference.output
+    assert result.executions == reference.executions
+    assert result.registers == reference.registers
+    assert result.value == reference.value
+    assert result.instruction_index == reference.instruction_index
@@ -0,0 +1,331 @@
+"""Find type errors in Human Resource Machine programs without running them.
+
+`check` follows every path through a program, tracking the kinds of value
+the hand and each register may hold at each instruction: nothing, an
+integer, a letter, or for registers, never having been set. Conditional
+jumps may go either way, and a value read through a pointer may come from
+any register. An instruction is reported when it fails for some of the
+values it may see, and is certain to fail if it fails for all of them.
+
+A program is `safe` when no ADD or SUB can meet a value that is not an
+integer and no OUTBOX can meet an empty hand. Those are the checks
+`codegen.execute_unchecked` leaves out; every other error, like reading a
+register that was never set, still raises as Python runs the program.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from enum import Flag, auto
+
+from xyz.human_resource_machine.interpreter import (
+    Add,
+    AssertRegisterIs,
+    BumpMinus,
+    BumpPlus,
+    CopyFrom,
+    CopyTo,
+    Inbox,
+    Instruction,
+    Jump,
+    JumpIfNegative,
+    JumpIfZero,
+    Label,
+    Outbox,
+    Subtract,
+    Value,
+)
+from xyz.human_resource_machine.level import Domain, Level
+
+
+class Kind(Flag):
+    """The kinds of value a hand or register may hold."""
+
+    EMPTY = auto()
+    INT = auto()
+    LETTER = auto()
+    # Only for registers: never written.
+    UNSET = auto()
+
+
+def kind_of(value: Value | None) -> Kind:
+    """Return the kind of a value."""
+    if value is None:
+        return Kind.EMPTY
+    return Kind.INT if isinstance(value, int) else Kind.LETTER
+
+
+@dataclass(frozen=True, slots=True)
+class Problem:
+    """An instruction that fails for some of the values it may see."""
+
+    # Index into the program's instructions.
+    index: int
+    message: str
+    # Whether it fails whenever it runs.
+    certain: bool
+    # Whether it is one of the checks `codegen.execute_unchecked` leaves out.
+    elidable: bool
+
+
+@dataclass(frozen=True, slots=True)
+class TypeCheck:
+    """The problems found in a program, in instruction order."""
+
+    problems: tuple[Problem, ...]
+    # The kinds the hand may hold before each instruction, or None for
+    # instructions no path reaches.
+    hands: tuple[Kind | None, ...]
+
+    @property
+    def safe(self) -> bool:
+        """Whether the program can run without the elidable checks."""
+        return not any(problem.elidable for problem in self.problems)
+
+    def format(self) -> str:
+        """Describe every problem, one per line."""
+        if not self.problems:
+            return "No type errors found"
+        return "\n".join(
+            f"Instruction {problem.index}: {problem.message}"
+            f"{'' if problem.certain else ' (possibly)'}"
+            for problem in self.problems
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class _State:
+    hand: Kind
+    registers: dict[Value, Kind]
+    # The kinds of every register not in `registers`.
+    default: Kind
+
+    def register(self, register: Value) -> Kind:
+        return self.registers.get(register, self.default)
+
+    def anywhere(self) -> Kind:
+        """The kinds a register chosen by a pointer may hold."""
+        kinds = self.default
+        for kind in self.registers.values():
+            kinds |= kind
+        return kinds
+
+    def join(self, other: _State) -> _State:
+        keys = self.registers.keys() | other.registers.keys()
+        return _State(
+            self.hand | other.hand,
+            {key: self.register(key) | other.register(key) for key in keys},
+            self.default | other.default,
+        )
+
+
+def _describe(kinds: Kind) -> str:
+    names = {Kind.EMPTY: "nothing", Kind.LETTER: "a letter", Kind.UNSET: "unset"}
+    return " or ".join(name for kind, name in names.items() if kind in kinds)
+
+
+class _Checker:
+    def __init__(self, instructions: Sequence[Instruction], input: Kind):
+        self.instructions = instructions
+        self.input = input
+        self.labels = {
+            instruction.label: index
+            for index, instruction in enumerate(instructions)
+            if isinstance(instruction, Label)
+        }
+        # Keyed by instruction index, then message, as problems are found
+        # again each time a state grows.
+        self.problems: dict[tuple[int, str], Problem] = {}
+
+    def report(
+        self, index: int, message: str, certain: bool, elidable: bool = False
+    ) -> None:
+        self.problems[index, message] = Problem(index, message, certain, elidable)
+
+    def read(self, index: int, state: _State, register: Value) -> Kind | None:
+        """Read a register directly, returning None if that always fails."""
+        kinds = state.register(register)
+        if Kind.UNSET in kinds:
+            certain = kinds == Kind.UNSET
+            self.report(index, f"Register {register} may never be set", certain)
+            if certain:
+                return None
+        return kinds & ~Kind.UNSET
+
+    def address(
+        self, index: int, state: _State, register: Value, indirect: bool
+    ) -> Kind | None:
+        """Read a register, through a pointer if `indirect`."""
+        if not indirect:
+            return self.read(index, state, register)
+        # Registers may be named by letters too, so any pointer that is set
+        # may be valid.
+        if self.read(index, state, register) is None:
+            return None
+        kinds = state.anywhere() & ~Kind.UNSET
+        return kinds or None
+
+    def integer(
+        self, index: int, kinds: Kind, what: str, elidable: bool = False
+    ) -> bool:
+        """Report kinds other than integers, returning whether any is one."""
+        wrong = kinds & ~Kind.INT
+        if wrong:
+            self.report(
+                index,
+                f"{what} may hold {_describe(wrong)}",
+                Kind.INT not in kinds,
+                elidable,
+            )
+        return Kind.INT in kinds
+
+    def step(self, index: int, state: _State) -> list[tuple[int, _State]]:
+        """Return the instructions that may run next, with their states."""
+        instruction = self.instructions[index]
+        after = index + 1
+        match instruction:
+            case Inbox():
+                # An empty inbox ends the program without an error.
+                return [(after, _State(self.input, state.registers, state.default))]
+            case Outbox():
+                if Kind.EMPTY in state.hand:
+                    certain = state.hand == Kind.EMPTY
+                    self.report(index, "OUTBOX with an empty hand", certain, True)
+                    if certain:
+                        return []
+                return [(after, _State(Kind.EMPTY, state.registers, state.default))]
+            case Add() | Subtract():
+                name = "ADD" if isinstance(instruction, Add) else "SUB"
+                fine = self.integer(index, state.hand, f"The hand at {name}", True)
+                argument = self.address(
+                    index, state, instruction.register, instruction.indirect
+                )
+                if argument is None:
+                    return []
+                fine &= self.integer(
+                    index, argument, f"The argument of {name}", elidable=True
+                )
+                if not fine:
+                    return []
+                return [(after, _State(Kind.INT, state.registers, state.default))]
+            case CopyFrom():
+                kinds = self.address(
+                    index, state, instruction.register, instruction.indirect
+                )
+                if kinds is None:
+                    return []
+                return [(after, _State(kinds, state.registers, state.default))]
+            case CopyTo(indirect=True):
+                pointer = self.read(index, state, instruction.register)
+                if pointer is None:
+                    return []
+                registers = {
+                    key: kind | state.hand for key, kind in state.registers.items()
+                }
+                return [
+                    (after, _State(state.hand, registers, state.default | state.hand))
+                ]
+            case CopyTo():
+                registers = {**state.registers, instruction.register: state.hand}
+                return [(after, _State(state.hand, registers, state.default))]
+            case BumpPlus() | BumpMinus():
+                kinds = self.address(
+                    index, state, instruction.register, instruction.indirect
+                )
+                name = "BUMPUP" if isinstance(instruction, BumpPlus) else "BUMPDN"
+                if kinds is None or not self.integer(
+                    index, kinds, f"The register at {name}"
+                ):
+                    return []
+                if instruction.indirect:
+                    # The result is read back through the pointer, which may
+                    # have been the register bumped, so may be any register.
+                    hand = kinds | Kind.INT
+                    return [(after, _State(hand, state.registers, state.default))]
+                registers = {**state.registers, instruction.register: Kind.INT}
+                return [(after, _State(Kind.INT, registers, state.default))]
+            case AssertRegisterIs():
+                if self.read(index, state, instruction.register) is None:
+                    return []
+                return [(after, state)]
+            case Jump() | JumpIfZero() | JumpIfNegative():
+                return self.jump(index, instruction, state)
+        return [(after, state)]
+
+    def jump(
+        self,
+        index: int,
+        instruction: Jump | JumpIfZero | JumpIfNegative,
+        state: _State,
+    ) -> list[tuple[int, _State]]:
+        target = self.labels.get(instruction.label)
+        if target is None:
+            self.report(
+                index,
+                f"Label {instruction.label} is not defined",
+                isinstance(instruction, Jump),
+            )
+        if isinstance(instruction, Jump):
+            return [] if target is None else [(target, state)]
+        if isinstance(instruction, JumpIfNegative):
+            # Only integers can be compared with 0.
+            if not self.integer(index, state.hand, "The hand at JUMPN"):
+                return []
+            state = _State(Kind.INT, state.registers, state.default)
+        taken = _State(Kind.INT, state.registers, state.default)
+        following = [(index + 1, state)]
+        if target is not None and Kind.INT in state.hand:
+            following.append((target, taken))
+        return following
+
+
+def check(
+    instructions: Sequence[Instruction],
+    registers: dict[Value, Value] | None = None,
+    input: Kind = Kind.INT | Kind.LETTER,
+) -> TypeCheck:
+    """Find the type errors a program may meet.
+
+    `registers` hold their initial values, and every value in the inbox is
+    one of the kinds in `input`.
+    """
+    checker = _Checker(instructions, input)
+    states: list[_State | None] = [None] * len(instructions)
+    if instructions:
+        initial = {key: kind_of(value) for key, value in (registers or {}).items()}
+        states[0] = _State(Kind.EMPTY, initial, Kind.UNSET)
+    pending = [0] if instructions else []
+    while pending:
+        index = pending.pop()
+        state = states[index]
+        assert state is not None
+        for target, following in checker.step(index, state):
+            if target >= len(instructions):
+                continue
+            current = states[target]
+            joined = following if current is None else current.join(following)
+            if joined != current:
+                states[target] = joined
+                pending.append(target)
+    problems = sorted(checker.problems.values(), key=lambda p: (p.index, p.message))
+    return TypeCheck(
+        tuple(problems),
+        tuple(None if state is None else state.hand for state in states),
+    )
+
+
+def input_kinds(level: Level) -> Kind:
+    """Return the kinds of value a level's inbox may hold."""
+    domain = Domain.infer(level)
+    if domain.choices is not None:
+        kinds = Kind(0)
+        for value in domain.choices:
+            kinds |= kind_of(value)
+        return kinds
+    return Kind.INT | Kind.LETTER if domain.letters else Kind.INT
+
+
+def check_level(instructions: Sequence[Instruction], level: Level) -> TypeCheck:
+    """Find the type errors a program may meet on inputs like the level's."""
+    return check(instructions, level.registers, input_kinds(level))
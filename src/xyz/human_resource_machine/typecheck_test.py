@@ -0,0 +1,140 @@
+"""Tests for finding type errors without running programs."""
+
+import os
+import random
+
+import pytest
+
+from xyz.human_resource_machine import codegen
+from xyz.human_resource_machine.fuzzer import random_program
+from xyz.human_resource_machine.interpreter import Interpreter
+from xyz.human_resource_machine.level import Level
+from xyz.human_resource_machine.parser import Parser
+from xyz.human_resource_machine.testing import parse, run
+from xyz.human_resource_machine.typecheck import (
+    Kind,
+    Problem,
+    check,
+    check_level,
+    input_kinds,
+)
+
+CHALLENGES = os.path.join(os.path.dirname(__file__), "challenges")
+
+
+def test_certain_errors():
+    """Test instructions failing whenever they run are reported as certain."""
+    result = check(parse("OUTBOX"))
+
+    assert result.problems == (Problem(0, "OUTBOX with an empty hand", True, True),)
+    assert not result.safe
+
+    result = check(parse("INBOX\nADD 0"), {0: "A"}, Kind.INT)
+    assert result.problems == (
+        Problem(1, "The argument of ADD may hold a letter", True, True),
+    )
+
+    result = check(parse("COPYFROM 3\nJUMP NOWHERE"))
+    assert result.problems == (Problem(0, "Register 3 may never be set", True, False),)
+    # Nothing runs after an instruction that always fails.
+    assert result.hands == (Kind.EMPTY, None)
+
+
+def test_possible_errors():
+    """Test instructions failing on some paths are reported as possible."""
+    result = check(
+        parse("""\
+        INBOX
+        JUMPZ ZERO
+        COPYTO 0
+        ZERO:
+        COPYFROM 0
+        SUB 1
+        OUTBOX
+        """),
+        {1: 1},
+        Kind.INT | Kind.LETTER,
+    )
+
+    assert result.problems == (
+        Problem(4, "Register 0 may never be set", False, False),
+        Problem(5, "The hand at SUB may hold a letter", False, True),
+    )
+    assert not result.safe
+
+
+def test_branches_refine_the_hand():
+    """Test a taken JUMPZ or JUMPN means the hand holds an integer."""
+    result = check(
+        parse("""\
+        BEGIN:
+        INBOX
+        JUMPN NEGATIVE
+        JUMP BEGIN
+        NEGATIVE:
+        ADD 0
+        OUTBOX
+        JUMP BEGIN
+        """),
+        {0: 1},
+        Kind.INT,
+    )
+
+    assert result.problems == ()
+    assert result.safe
+    assert result.hands[5] == Kind.INT
+
+
+def test_input_kinds():
+    """Test the inbox holds the kinds of value in the level's own input."""
+    assert input_kinds(Level("", [1, 2], {}, 0, 0)) == Kind.INT
+    assert input_kinds(Level("", [1, "A"], {}, 0, 0)) == Kind.INT | Kind.LETTER
+
+
+@pytest.mark.parametrize(
+    "filename", sorted(f for f in os.listdir(CHALLENGES) if f.endswith(".yaml"))
+)
+def test_challenges_are_safe(filename):
+    """Test the bundled solutions are proven safe and run the same unchecked."""
+    level = Level.from_yaml(os.path.join(CHALLENGES, filename))
+    instructions = Parser(level.source).parse()
+
+    assert check_level(instructions, level).safe
+    interpreter = Interpreter(
+        instructions=instructions,
+        registers=level.registers,
+        input=level.input,
+        engine=codegen.execute_unchecked,
+    )
+    assert interpreter.execute_program() == level.output
+
+
+def test_safe_programs_run_the_same_unchecked():
+    """Test random programs proven safe behave the same without checks."""
+    rng = random.Random(0)
+    for _ in range(3000):
+        registers = {0: rng.choice([0, 3, "A"]), 1: rng.choice([1, "B"])}
+        letters = rng.random() < 0.3
+        values = [*range(-5, 10), "C"] if letters else list(range(-5, 10))
+        input = [rng.choice(values) for _ in range(rng.randint(0, 5))]
+        instructions = Parser(
+            random_program(rng, [0, 1, 2], rng.randint(1, 10))
+        ).parse()
+        result = check(
+            instructions, registers, Kind.INT | Kind.LETTER if letters else Kind.INT
+        )
+        if not result.safe:
+            continue
+
+        kwargs = dict(
+            instructions=instructions,
+            registers=registers,
+            input=input,
+            max_executions=300,
+        )
+
+        reference, reference_error = run(None, **kwargs)
+        unchecked, error = run(codegen.execute_unchecked, **kwargs)
+        assert type(error) is type(reference_error)
+        assert unchecked.output == reference.output
+        assert unchecked.executions == reference.executions